@@ -0,0 +1,92 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response as ApiResponse
+
+from . import charts, jobs, routers, views
+from .conditional import conditional, global_data_etag, post_data_etag
+from .filters import ResponseFilters
+from .models import Job, Post
+
+
+# Read-only chart data endpoints. Each returns only the series its chart
+# needs; the templates draw the charts client-side with Plotly.newPlot.
+# Unchanged data is answered with 304 Not Modified (dashboard/conditional.py).
+
+
+@api_view(['GET'])
+@conditional(post_data_etag)
+def post_sentiment(request, post_id):
+    get_object_or_404(Post, postid=post_id)
+    return ApiResponse(charts.sentiment_data(post_id, ResponseFilters.from_request(request)))
+
+
+@api_view(['GET'])
+@conditional(post_data_etag)
+def post_filtered(request, post_id):
+    # The sentiment page's filter changes: chart, total, first page of
+    # responses and (when changed) slicer options in one round trip
+    get_object_or_404(Post, postid=post_id)
+    return ApiResponse(views.filtered_update(
+        post_id, ResponseFilters.from_request(request), request.GET.get('facets', ''),
+    ))
+
+
+@api_view(['GET'])
+@conditional(post_data_etag)
+def post_gender(request, post_id):
+    get_object_or_404(Post, postid=post_id)
+    return ApiResponse(charts.gender_data(post_id))
+
+
+@api_view(['GET'])
+@conditional(post_data_etag)
+def post_agegroups(request, post_id):
+    get_object_or_404(Post, postid=post_id)
+    return ApiResponse(charts.agegroup_data(post_id))
+
+
+@api_view(['GET'])
+@conditional(post_data_etag)
+def post_states(request, post_id):
+    get_object_or_404(Post, postid=post_id)
+    return ApiResponse(charts.state_data(post_id))
+
+
+@api_view(['GET'])
+@conditional(global_data_etag)
+def cluster_posts(request):
+    return ApiResponse(charts.cluster_data())
+
+
+@api_view(['GET'])
+@conditional(global_data_etag)
+def cluster_sentiment(request):
+    return ApiResponse(charts.cluster_sentiment_data())
+
+
+@api_view(['GET'])
+@conditional(global_data_etag)
+def cluster_trends(request):
+    return ApiResponse(charts.cluster_trends_data())
+
+
+@api_view(['GET'])
+@conditional(global_data_etag)
+def compare_posts(request):
+    # Every post of ?posts=... and ?cluster=..., side by side
+    try:
+        post_ids = views.compared_posts(request.GET)
+    except ValueError as error:
+        raise ValidationError({'posts': str(error)})
+    return ApiResponse(charts.comparison_data(post_ids))
+
+
+@api_view(['GET'])
+def job_status(request, job_id):
+    # Polled while a job runs; read from the primary so progress is current
+    with routers.primary():
+        job = get_object_or_404(Job, pk=job_id)
+    if not (request.is_admin or job.username == request.user.username):
+        raise PermissionDenied()
+    return ApiResponse(jobs.status(job))
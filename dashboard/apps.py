@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import metrics, signals  # noqa: F401
+        connection_created.connect(metrics.install_sql_wrapper)
@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import ArchivedMonth, Response, ResponseArchive, ResponseTopic, SentimentCube
+
+
+# Responses are split by month between the `response` table, which holds
+# recent months, and ResponseArchive, which holds older months moved there
+# by `manage.py archive_responses`. Rows keep their ids and dates, so the
+# two tables read as one list, merged by (responsedate, responseid): the
+# hot table also holds rows dated in archived months that arrived after
+# their month was archived, until the next run moves them. Queries whose
+# date filters fall after the boundary skip the archive, and the hot
+# table's indexes and full-text index only cover recent months.
+#
+# Archiving moves rows without going through the rollup signal handlers:
+# the rollups, cube and cluster days keep counting archived responses, so
+# the dashboards do not change.
+#
+# Real partitioning was not an option here. MySQL requires the partition
+# column in every unique key, including the primary key, and partitioned
+# InnoDB tables support neither FULLTEXT indexes (dashboard/search.py) nor
+# foreign keys. SQLite has no partitioning.
+
+BATCH_SIZE = 2000
+
+FIELDS = (
+    'responseid', 'postid_id', 'responsedate', 'responsemessage', 'username', 'agegroupid_id', 'gender',
+    'stateid_id', 'sentiment', 'sentimentmodel',
+)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def months_back(months, today=None):
+    """First day of the month `months` months before the current one."""
+    first = month_start(today or timezone.localdate())
+    for _ in range(months):
+        first = month_start(first - timedelta(days=1))
+    return first
+
+
+def boundary():
+    """The day after the last archived month, or None: earlier responses are read from the archive."""
+    last = ArchivedMonth.objects.aggregate(last=Max('month'))['last']
+    return next_month(last) if last else None
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def segments(filters, hot, archived):
+    """Querysets of the responses matching `filters`, hot table first.
+
+    `hot` and `archived` select the same responses (e.g. a post's) from
+    Response and ResponseArchive. Their dates can overlap, so readers
+    merge them by (responsedate, responseid), see pagination.paginate.
+    The archive is left out when the date filters start at or after the
+    boundary; the hot table never is, as it can hold late rows of any
+    month.
+    """
+    start = boundary()
+    parts = [filters.apply(hot)]
+    date_from = _date(filters.date_from)
+    if start is not None and (date_from is None or date_from < start):
+        parts.append(filters.apply(archived))
+    return parts
+
+
+def post_segments(post_id, filters):
+    return segments(filters, Response.objects.filter(postid=post_id), ResponseArchive.objects.filter(postid=post_id))
+
+
+def months_to_archive(cutoff):
+    """Months before `cutoff` with responses in the response table, oldest first.
+
+    Months with responses are read from the cube, which keeps counting
+    archived rows, so months already archived are skipped unless responses
+    dated in them have arrived since.
+    """
+    months = set(SentimentCube.objects.filter(responsedate__lt=cutoff, total__gt=0).dates('responsedate', 'month'))
+    archived = set(ArchivedMonth.objects.filter(month__lt=cutoff).values_list('month', flat=True))
+    late = set()
+    if archived:
+        end = next_month(max(archived))
+        posts = (
+            SentimentCube.objects.filter(responsedate__lt=end, total__gt=0)
+            .values_list('postid', flat=True).distinct().order_by()
+        )
+        # By post, so the (postid, responsedate) indexes are used
+        late = set(
+            Response.objects.filter(postid__in=list(posts), responsedate__lt=end).dates('responsedate', 'month')
+        ) & archived
+    return sorted((months - archived) | late)
+
+
+def _month_posts(month):
+    return (
+        SentimentCube.objects.filter(responsedate__gte=month, responsedate__lt=next_month(month), total__gt=0)
+        .values_list('postid', flat=True).distinct().order_by('postid')
+    )
+
+
+def hot_responses(month):
+    """Responses of the month starting on `month` still in the response table."""
+    # By post, so the (postid, responsedate) indexes are used
+    return Response.objects.filter(
+        postid__in=list(_month_posts(month)), responsedate__gte=month, responsedate__lt=next_month(month),
+    )
+
+
+def _delete_responses(ids):
+    # A plain DELETE: the rollup signal handlers must not see these rows
+    # go, as archived responses stay counted
+    table = connection.ops.quote_name(Response._meta.db_table)
+    pk = connection.ops.quote_name(Response._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def _move_batch(postid, start, end, batch_size):
+    """Move up to `batch_size` of the post's responses dated in [start, end).
+
+    Returns (rows read, rows moved). A hot row whose id is already archived
+    is a duplicate (e.g. ingested again after archiving): the archived copy
+    is kept and the hot one deleted through the ORM, so the rollups stop
+    counting it twice.
+    """
+    with transaction.atomic():
+        rows = list(
+            Response.objects.select_for_update()
+            .filter(postid=postid, responsedate__gte=start, responsedate__lt=end)
+            .order_by('responsedate', 'responseid')
+            .values_list(*FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        archived = set(
+            ResponseArchive.objects.filter(responseid__in=[row[0] for row in rows]).values_list('responseid', flat=True)
+        )
+        if archived:
+            Response.objects.filter(responseid__in=archived).delete()
+            rows = [row for row in rows if row[0] not in archived]
+        ids = [row[0] for row in rows]
+        if ids:
+            topics = dict(ResponseTopic.objects.filter(responseid__in=ids).values_list('responseid', 'topic'))
+            ResponseArchive.objects.bulk_create(
+                [ResponseArchive(topicid=topics.get(row[0]), **dict(zip(FIELDS, row))) for row in rows],
+                batch_size=1000,
+            )
+            ResponseTopic.objects.filter(responseid__in=ids).delete()
+            _delete_responses(ids)
+    return len(rows) + len(archived), len(ids)
+
+
+def archive_month(month, batch_size=BATCH_SIZE):
+    """Move the responses of the month starting on `month` to the archive; returns how many moved.
+
+    Rows move post by post, in batches of one transaction each. The month
+    counts as archived (and moves the boundary) once all of them have.
+    """
+    end = next_month(month)
+    moved = 0
+    for postid in _month_posts(month):
+        while True:
+            read, count = _move_batch(postid, month, end, batch_size)
+            moved += count
+            if read < batch_size:
+                break
+    with transaction.atomic():
+        ArchivedMonth.objects.get_or_create(month=month, defaults={'archived_at': timezone.now()})
+        ArchivedMonth.objects.filter(month=month).update(responses=F('responses') + moved, archived_at=timezone.now())
+    return moved
@@ -0,0 +1,168 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.shortcuts import get_object_or_404, render
+
+from . import charts, conditional as validators, rollups, views
+from .filters import ResponseFilters
+from .models import Post
+from .pagination import paginate
+
+
+# Async versions of the analytics views, used when ASYNC_VIEWS is on and the
+# site is served through mysentkom/asgi.py. Independent aggregates run
+# concurrently in worker threads and templates render off the event loop;
+# the query and context helpers are shared with the sync views in views.py.
+
+
+def in_thread(func):
+    """Run `func` in a worker thread with its own database connection.
+
+    Connections opened by worker threads are not closed at the end of the
+    request like the main thread's, so close them here once they are no
+    longer usable (immediately, unless CONN_MAX_AGE keeps them alive).
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def login_required(view):
+    # django.contrib.auth.decorators.login_required only supports async
+    # views from Django 5.0
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path(), 'login')
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def conditional(etag_func):
+    # conditional.conditional for async views; the validator's lookups run
+    # in a worker thread
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag = await in_thread(etag_func)(request, *args, **kwargs)
+            response = validators.not_modified(request, etag) or await view(request, *args, **kwargs)
+            return validators.finish(request, response, etag)
+
+        return wrapper
+
+    return decorator
+
+
+@login_required
+@conditional(validators.dashboard_etag)
+async def dashboard(request):
+    posts_data, totals = await asyncio.gather(
+        in_thread(views.dashboard_rows)(),
+        in_thread(rollups.global_totals)(),
+    )
+    context = views.dashboard_context(request, posts_data, totals)
+    return await in_thread(render)(request, 'dashboard.html', context)
+
+
+@login_required
+@conditional(validators.post_page_etag)
+async def sentiment_analysis(request):
+    post_id = request.GET.get('post', None)
+    cursor = request.GET.get('cursor', None)
+
+    if not post_id:
+        context = {
+            'posts': await in_thread(views.post_choices)(),
+            'selected_post': None,
+            'is_admin': request.is_admin,
+        }
+        return await in_thread(render)(request, 'sentiment_analysis.html', context)
+
+    filters = ResponseFilters.from_request(request)
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+    aggregates = [
+        in_thread(get_object_or_404)(Post, postid=post_id),
+        in_thread(charts.sentiment_data)(post_id, filters),
+    ]
+    if not is_ajax:
+        aggregates += [
+            in_thread(views.post_choices)(),
+            in_thread(views.slicer_options)(post_id),
+            in_thread(views.post_topics)(post_id),
+        ]
+    selected_post, sentiment, *page_extras = await asyncio.gather(*aggregates)
+
+    # The page needs the total (for the last page), so it follows the fan-out
+    total_responses = sentiment['total']
+    # filtered_responses reads the archive boundary, so it runs in the thread too
+    responses_page = await in_thread(lambda: paginate(
+        views.filtered_responses(post_id, filters), cursor, views.RESPONSES_PER_PAGE, total_responses
+    ))()
+
+    if is_ajax:
+        return await in_thread(views.responses_list_response)(post_id, responses_page, total_responses)
+
+    posts, options, topics = page_extras
+    context = views.sentiment_context(
+        request, posts, selected_post, post_id, filters, total_responses, responses_page, options, topics
+    )
+    return await in_thread(render)(request, 'sentiment_analysis.html', context)
+
+
+@login_required
+@conditional(validators.cluster_page_etag)
+async def cluster_analysis(request):
+    context = {
+        'is_admin': request.is_admin,
+    }
+    return await in_thread(render)(request, 'cluster_analysis.html', context)
+
+
+@login_required
+@conditional(validators.post_page_etag)
+async def demographic_analysis(request):
+    post_id = request.GET.get('post', None)
+
+    if not post_id:
+        context = {
+            'posts': await in_thread(views.post_choices)(),
+            'selected_post': None,
+            'is_admin': request.is_admin,
+        }
+        return await in_thread(render)(request, 'demographic_analysis.html', context)
+
+    posts, selected_post, state_data = await asyncio.gather(
+        in_thread(views.post_choices)(),
+        in_thread(get_object_or_404)(Post, postid=post_id),
+        in_thread(charts.state_rows)(post_id),
+    )
+    context = {
+        'posts': posts,
+        'selected_post': selected_post,
+        'selected_post_id': post_id,
+        'state_data': state_data,
+        'is_admin': request.is_admin,
+    }
+    return await in_thread(render)(request, 'demographic_analysis.html', context)
+
+
+@login_required
+@conditional(validators.compare_page_etag)
+async def compare_posts(request):
+    posts, clusters = await asyncio.gather(
+        in_thread(views.post_choices)(),
+        in_thread(views.cluster_choices)(),
+    )
+    context = views.comparison_context(request, posts, clusters)
+    return await in_thread(render)(request, 'compare_posts.html', context)
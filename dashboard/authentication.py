@@ -1,9 +1,20 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from .models import AppUser
 
 User = get_user_model()
 
+# Seconds a user loaded for a session stays cached; saves and deletes of the
+# user evict it straight away (see dashboard/signals.py) from the default
+# cache, which is shared by the worker processes (see settings.CACHES).
+USER_CACHE_TIMEOUT = 300
+
+
+def user_cache_key(user_id):
+    return f'dashboard:user:{user_id}'
+
+
 class AppUserBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         try:
@@ -13,13 +24,20 @@ class AppUserBackend(ModelBackend):
                     username=username,
                     defaults={'email': f'{username}@sentiment.local'}
                 )
+                # Lets the login view store the role without looking it up again
+                user.usertype = app_user.usertype
                 return user
         except AppUser.DoesNotExist:
             pass
         return None
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
\ No newline at end of file
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = User.objects.get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,219 @@
+import asyncio
+import re
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from . import pagination
+from .models import AppUser, Post, PostRollup, Response
+
+
+# (name, url, ajax) of every analytics request that is benchmarked and
+# plan-checked. `{post}` is replaced with the id of a post, and `{after}` /
+# `{before}` / `{last}` with responses-list cursors halfway into it.
+REQUESTS = [
+    ('dashboard', '/dashboard/', False),
+    ('sentiment', '/sentiment/?post={post}', False),
+    ('sentiment, gender filter', '/sentiment/?post={post}&gender=F', False),
+    ('sentiment, age group filter', '/sentiment/?post={post}&agegroup=2', False),
+    ('sentiment, state filter', '/sentiment/?post={post}&state=5', False),
+    ('sentiment, date range', '/sentiment/?post={post}&date_from=2025-02-01&date_to=2025-02-28', False),
+    ('sentiment, gender and date range', '/sentiment/?post={post}&gender=M&date_from=2025-02-01', False),
+    ('sentiment, search', '/sentiment/?post={post}&q=kecewa', False),
+    ('sentiment, phrase search', '/sentiment/?post={post}&q=%22waste+of+public%22', False),
+    ('responses page', '/sentiment/?post={post}', True),
+    ('responses next page', '/sentiment/?post={post}&cursor={after}', True),
+    ('responses next page, state filter', '/sentiment/?post={post}&state=5&cursor={after}', True),
+    ('responses next page, search', '/sentiment/?post={post}&q=kecewa&cursor={after}', True),
+    ('responses previous page', '/sentiment/?post={post}&cursor={before}', True),
+    ('responses last page', '/sentiment/?post={post}&cursor={last}', True),
+    ('cluster', '/cluster/', False),
+    ('demographic', '/demographic/?post={post}', False),
+    ('compare', '/compare/?cluster={cluster}', False),
+    ('api sentiment', '/api/posts/{post}/sentiment/?state=5&gender=F', False),
+    ('api filtered', '/api/posts/{post}/filtered/?state=5&gender=F', False),
+    ('api gender', '/api/posts/{post}/gender/', False),
+    ('api age groups', '/api/posts/{post}/agegroups/', False),
+    ('api states', '/api/posts/{post}/states/', False),
+    ('api cluster posts', '/api/clusters/posts/', False),
+    ('api cluster sentiment', '/api/clusters/sentiment/', False),
+    ('api cluster trends', '/api/clusters/trends/', False),
+    ('api compare cluster', '/api/compare/?cluster={cluster}', False),
+]
+
+BENCHMARK_USERNAME = 'benchmark'
+
+
+def busiest_post():
+    return PostRollup.objects.order_by('-total').values_list('postid', flat=True).first()
+
+
+def analytics_client(asgi=False):
+    """A test client logged in as an admin AppUser.
+
+    With `asgi` the client sends requests through Django's ASGI handler, as
+    mysentkom/asgi.py does, instead of the WSGI one.
+    """
+    User = get_user_model()
+    user, created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    AppUser.objects.get_or_create(username=BENCHMARK_USERNAME, defaults={'passwrd': '', 'usertype': 1})
+    client = AsyncClient() if asgi else Client()
+    client.force_login(user)
+    return client
+
+
+def requests_for(post_id):
+    """Return (name, url, headers) for every entry of REQUESTS."""
+    responses = Response.objects.filter(postid=post_id).order_by('-responsedate', '-responseid')
+    depth = responses.count() // 2
+    middle = responses[depth]
+    key = [middle.responsedate.isoformat(), middle.responseid]
+    cluster_id = Post.objects.filter(postid=post_id).values_list('clusterid', flat=True).first()
+    cursors = {
+        'after': pagination.encode_cursor({'after': key, 'start': depth + 2}),
+        'before': pagination.encode_cursor({'before': key, 'start': max(depth - 4, 1)}),
+        'last': pagination.encode_cursor({'last': True}),
+    }
+    return [
+        (name, url.format(post=post_id, cluster=cluster_id, **cursors), {'X-Requested-With': 'XMLHttpRequest'} if ajax else {})
+        for name, url, ajax in REQUESTS
+    ]
+
+
+_event_loop = None
+
+
+def _run_async(coroutine):
+    # async_to_sync would start a new event loop, and so new worker threads
+    # with new database connections, for every request. Keep one loop
+    # running instead, like an ASGI server does.
+    global _event_loop
+    if _event_loop is None:
+        _event_loop = asyncio.new_event_loop()
+        threading.Thread(target=_event_loop.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop).result()
+
+
+def _get(client, url, headers, cold):
+    if cold:
+        caches['charts'].clear()
+    if isinstance(client, AsyncClient):
+        response = _run_async(client.get(url, headers=headers))
+    else:
+        response = client.get(url, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} returned {response.status_code}')
+    return response
+
+
+def _timings(client, url, headers, repeat, cold):
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        _get(client, url, headers, cold)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _p99(samples):
+    if len(samples) < 2:
+        return max(samples)
+    return statistics.quantiles(samples, n=100, method='inclusive')[98]
+
+
+SERVER_TIMING_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def _queries(response):
+    # Async views query from several threads, each with its own connection,
+    # so count through the per-request stats MetricsMiddleware reports
+    # rather than by capturing one connection's queries
+    match = SERVER_TIMING_QUERIES_RE.search(response.get('Server-Timing', ''))
+    if match is None:
+        raise RuntimeError('No query count in Server-Timing; is MetricsMiddleware installed?')
+    return int(match.group(1))
+
+
+def measure(client, url, headers, repeat=5):
+    """Latency, query count and peak Python memory of one request.
+
+    Cold runs clear the chart cache first, warm runs are served from it.
+    Both report the median, the 99th percentile and the best run;
+    regressions are judged on the best run, which is the least sensitive to
+    noise from other processes. Memory is traced in a separate run because
+    tracemalloc slows down the code it traces.
+    """
+    _get(client, url, headers, cold=False)  # warm up imports, templates and connections
+    cold = _timings(client, url, headers, repeat, cold=True)
+    warm = _timings(client, url, headers, repeat, cold=False)
+
+    with override_settings(METRICS_SERVER_TIMING=True):
+        queries = _queries(_get(client, url, headers, cold=True))
+    tracemalloc.start()
+    try:
+        _get(client, url, headers, cold=True)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'cold_ms': round(statistics.median(cold), 2),
+        'cold_p99_ms': round(_p99(cold), 2),
+        'cold_best_ms': round(min(cold), 2),
+        'warm_ms': round(statistics.median(warm), 2),
+        'warm_p99_ms': round(_p99(warm), 2),
+        'warm_best_ms': round(min(warm), 2),
+        'queries': queries,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(post_id=None, repeat=5, on_result=None, asgi=False):
+    """Benchmark every request in REQUESTS; returns {'meta': ..., 'results': {name: measurement}}."""
+    post_id = post_id or busiest_post()
+    client = analytics_client(asgi)
+    results = {}
+    for name, url, headers in requests_for(post_id):
+        results[name] = measure(client, url, headers, repeat)
+        if on_result is not None:
+            on_result(name, results[name])
+    meta = {
+        'vendor': connection.vendor,
+        'responses': Response.objects.count(),
+        'post': post_id,
+        'post_responses': Response.objects.filter(postid=post_id).count(),
+        'repeat': repeat,
+        'handler': 'asgi' if asgi else 'wsgi',
+    }
+    return {'meta': meta, 'results': results}
+
+
+# Latency differences below this are noise and never count as a regression
+NOISE_FLOOR_MS = 3.0
+
+
+def compare(current, baseline, tolerance=0.5):
+    """Return a list of regressions of `current` against a stored `baseline` run."""
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for field in ('cold_best_ms', 'warm_best_ms'):
+            if field not in before:
+                continue
+            limit = max(before[field] * (1 + tolerance), before[field] + NOISE_FLOOR_MS)
+            if now[field] > limit:
+                regressions.append(f'{name}: {field} {before[field]} -> {now[field]}')
+        if now['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {now['queries']}")
+        if now['peak_kib'] > before['peak_kib'] * (1 + tolerance):
+            regressions.append(f"{name}: peak_kib {before['peak_kib']} -> {now['peak_kib']}")
+    return regressions
@@ -0,0 +1,270 @@
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+
+from . import cube, dateindex, geo, metrics, rollups, search
+from .models import AgeGroup, Cluster, ClusterDaily, ClusterRollup, Post, PostRollup, State
+
+
+SENTIMENTS = ('P', 'N', 'U')
+SENTIMENT_LABELS = ['Positive', 'Negative', 'Neutral']
+GENDERS = [('M', 'Male'), ('F', 'Female'), ('O', 'Others'), ('N', 'Not Disclosed')]
+
+MAP_CENTER = {'lat': 4.2105, 'lon': 101.9758}
+MAP_ZOOM = 4.3
+
+_MISSING = object()
+
+
+def chart_key(view, version, post_id=None, filters=None):
+    parts = {
+        'view': view,
+        'post': str(post_id) if post_id is not None else None,
+        'filters': filters.as_dict() if filters is not None else None,
+        'version': version,
+    }
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'chart:{view}:{digest}'
+
+
+def cached_chart(view, version, build, post_id=None, filters=None):
+    """Return the cached result of `build()` for this chart, building it on a miss.
+
+    `version` is the data version of whatever the chart is drawn from (see
+    rollups.post_version / rollups.global_version). Any write bumps it, so
+    stale entries are never looked up again and simply age out of the
+    size-limited, time-limited 'charts' cache.
+    """
+    cache = caches['charts']
+    key = chart_key(view, version, post_id, filters)
+    chart = cache.get(key, _MISSING)
+    if chart is _MISSING:
+        metrics.CHART_CACHE.inc(view, 'miss')
+        with metrics.timed('chart'):
+            chart = build()
+        cache.set(key, chart)
+    else:
+        metrics.CHART_CACHE.inc(view, 'hit')
+    return chart
+
+
+def _grouped(breakdown, keys, labels):
+    return {
+        'labels': labels,
+        'positive': [breakdown[k]['P'] for k in keys],
+        'negative': [breakdown[k]['N'] for k in keys],
+        'neutral': [breakdown[k]['U'] for k in keys],
+    }
+
+
+def _sentiment_chart(counts):
+    return {
+        'labels': SENTIMENT_LABELS,
+        'values': [counts[s] for s in SENTIMENTS],
+        'total': sum(counts.values()),
+    }
+
+
+def sentiment_data(post_id, filters=None, version=None):
+    # Served from the in-memory date index (dashboard/dateindex.py), so
+    # dragging the date range slider does not query the database
+    counts = dateindex.sentiment_counts(post_id, filters)
+    if counts is not None:
+        metrics.CHART_CACHE.inc('sentiment', 'index')
+        return _sentiment_chart(counts)
+
+    def build():
+        if filters is not None and filters.q:
+            return _sentiment_chart(search.sentiment_counts(post_id, filters))
+        return _sentiment_chart(cube.sentiment_counts(post_id, filters))
+
+    if version is None:
+        version = rollups.post_version(post_id)
+    return cached_chart('sentiment', version, build, post_id, filters)
+
+
+def gender_data(post_id, version=None):
+    def build():
+        return _grouped(
+            cube.breakdown(post_id, 'gender'),
+            [code for code, label in GENDERS],
+            [label for code, label in GENDERS],
+        )
+
+    if version is None:
+        version = rollups.post_version(post_id)
+    return cached_chart('gender', version, build, post_id)
+
+
+def agegroup_data(post_id, version=None):
+    def build():
+        age_groups = list(AgeGroup.objects.filter(agegroupid__gt=0).order_by('agegroupid'))
+        return _grouped(
+            cube.breakdown(post_id, 'agegroupid'),
+            [ag.agegroupid for ag in age_groups],
+            [ag.agegroup for ag in age_groups],
+        )
+
+    if version is None:
+        version = rollups.post_version(post_id)
+    return cached_chart('agegroup', version, build, post_id)
+
+
+def state_rows(post_id, version=None):
+    """Per-state counts and percentages, named as in the GeoJSON features."""
+    def build():
+        rows = []
+        state_sentiment = cube.breakdown(post_id, 'stateid')
+        for state in State.objects.filter(stateid__gt=0).order_by('statename'):
+            counts = state_sentiment.get(state.stateid, {})
+            total = sum(counts.values())
+            if total > 0:
+                positive = counts.get('P', 0)
+                negative = counts.get('N', 0)
+                neutral = counts.get('U', 0)
+                rows.append({
+                    'state': geo.GEOJSON_NAMES.get(state.statename, state.statename),
+                    'total': total,
+                    'positive': positive,
+                    'negative': negative,
+                    'neutral': neutral,
+                    'positive_pct': round((positive / total) * 100, 1),
+                    'negative_pct': round((negative / total) * 100, 1),
+                    'neutral_pct': round((neutral / total) * 100, 1),
+                })
+        return rows
+
+    if version is None:
+        version = rollups.post_version(post_id)
+    return cached_chart('states', version, build, post_id)
+
+
+def state_data(post_id, version=None):
+    rows = state_rows(post_id, version)
+    return {
+        'states': [row['state'] for row in rows],
+        'total': [row['total'] for row in rows],
+        'positive': [row['positive'] for row in rows],
+        'negative': [row['negative'] for row in rows],
+        'neutral': [row['neutral'] for row in rows],
+        'geojson': geo.variant_url(geo.level_for_zoom(MAP_ZOOM)),
+        'center': MAP_CENTER,
+        'zoom': MAP_ZOOM,
+    }
+
+
+def _cluster_rollups():
+    # Clusters without posts may not have a rollup row yet
+    rows = []
+    for cluster in Cluster.objects.select_related('rollup').order_by('clusterid'):
+        rollup = getattr(cluster, 'rollup', None)
+        rows.append((cluster, rollup or ClusterRollup(clusterid=cluster)))
+    return rows
+
+
+def cluster_data():
+    def build():
+        rows = _cluster_rollups()
+        return {
+            'labels': [cluster.clustername for cluster, rollup in rows],
+            'values': [rollup.posts for cluster, rollup in rows],
+        }
+
+    return cached_chart('cluster', rollups.global_version(), build)
+
+
+def cluster_sentiment_data():
+    """Responses per sentiment and in total for every cluster."""
+    def build():
+        rows = _cluster_rollups()
+        return {
+            'labels': [cluster.clustername for cluster, rollup in rows],
+            'positive': [rollup.positive for cluster, rollup in rows],
+            'negative': [rollup.negative for cluster, rollup in rows],
+            'neutral': [rollup.neutral for cluster, rollup in rows],
+            'total': [rollup.total for cluster, rollup in rows],
+        }
+
+    return cached_chart('cluster_sentiment', rollups.global_version(), build)
+
+
+def cluster_trends_data():
+    """Weekly responses and net sentiment (positive minus negative, in % of responses) per cluster."""
+    def build():
+        rows = (
+            ClusterDaily.objects
+            .annotate(week=TruncWeek('responsedate'))
+            .values('clusterid', 'week')
+            .annotate(total=Sum('total'), positive=Sum('positive'), negative=Sum('negative'))
+            .order_by()
+        )
+        weekly = {(row['clusterid'], row['week']): row for row in rows}
+        weeks = sorted({week for clusterid, week in weekly})
+        clusters = []
+        for cluster in Cluster.objects.order_by('clusterid'):
+            series = [weekly.get((cluster.clusterid, week)) for week in weeks]
+            if not any(row and row['total'] for row in series):
+                continue
+            clusters.append({
+                'name': cluster.clustername,
+                'total': [row['total'] if row else 0 for row in series],
+                'net': [
+                    round((row['positive'] - row['negative']) / row['total'] * 100, 1)
+                    if row and row['total'] else None
+                    for row in series
+                ],
+            })
+        return {'weeks': [week.isoformat() for week in weeks], 'clusters': clusters}
+
+    return cached_chart('cluster_trends', rollups.global_version(), build)
+
+
+def _split(per_post, post_ids, values):
+    # One list per dimension value, holding each post's responses
+    return [[per_post[post_id][value] for post_id in post_ids] for value in values]
+
+
+def comparison_data(post_ids):
+    """Sentiment mix and demographic split of each of `post_ids`, for the comparison chart.
+
+    Built in a fixed number of grouped queries however many posts are
+    compared: the posts with their rollups, the lookup tables, and one
+    cube query per demographic dimension.
+    """
+    def build():
+        posts = list(Post.objects.filter(postid__in=post_ids).select_related('clusterid', 'rollup').order_by('postid'))
+        ids = [post.postid for post in posts]
+        counts = [getattr(post, 'rollup', None) or PostRollup(postid=post) for post in posts]
+        age_groups = list(AgeGroup.objects.filter(agegroupid__gt=0).order_by('agegroupid'))
+        states = list(State.objects.filter(stateid__gt=0).order_by('statename'))
+        return {
+            'posts': ids,
+            'labels': [f'#{post.postid}' for post in posts],
+            'clusters': [post.clusterid.clustername for post in posts],
+            'total': [rollup.total for rollup in counts],
+            'positive': [rollup.positive for rollup in counts],
+            'negative': [rollup.negative for rollup in counts],
+            'neutral': [rollup.neutral for rollup in counts],
+            'demographics': {
+                'gender': {
+                    'labels': [label for code, label in GENDERS],
+                    'values': _split(cube.post_breakdowns(ids, 'gender'), ids, [code for code, label in GENDERS]),
+                },
+                'agegroup': {
+                    'labels': [ag.agegroup for ag in age_groups],
+                    'values': _split(cube.post_breakdowns(ids, 'agegroupid'), ids,
+                                     [ag.agegroupid for ag in age_groups]),
+                },
+                'state': {
+                    'labels': [geo.GEOJSON_NAMES.get(state.statename, state.statename) for state in states],
+                    'values': _split(cube.post_breakdowns(ids, 'stateid'), ids, [state.stateid for state in states]),
+                },
+            },
+        }
+
+    # Keyed by the global version, which every response and post write bumps
+    selection = ','.join(str(post_id) for post_id in sorted(post_ids))
+    return cached_chart('comparison', rollups.global_version(), build, selection)
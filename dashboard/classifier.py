@@ -0,0 +1,137 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# Bump whenever the lexicon, tokenizer or thresholds change; responses
+# scored by an older version are picked up again by classify_responses.
+MODEL_VERSION = 'lexicon-en-ms-1'
+
+POSITIVE_THRESHOLD = 0.25
+NEGATIVE_THRESHOLD = -0.25
+
+LEXICON = {
+    # English
+    'good': 1.0, 'great': 1.5, 'excellent': 2.0, 'love': 1.5, 'like': 0.5, 'awesome': 1.5,
+    'amazing': 1.5, 'happy': 1.0, 'best': 1.5, 'nice': 1.0, 'support': 1.0, 'agree': 1.0,
+    'thanks': 1.0, 'thank': 1.0, 'wonderful': 1.5, 'fantastic': 1.5, 'proud': 1.0,
+    'congrats': 1.5, 'congratulations': 1.5, 'well': 0.5, 'helpful': 1.0, 'brilliant': 1.5,
+    'bad': -1.0, 'terrible': -2.0, 'awful': -2.0, 'hate': -1.5, 'worst': -2.0, 'poor': -1.0,
+    'sad': -1.0, 'angry': -1.5, 'disappointed': -1.5, 'disappointing': -1.5, 'fail': -1.0,
+    'failed': -1.0, 'failure': -1.5, 'corrupt': -2.0, 'corruption': -2.0, 'stupid': -1.5,
+    'useless': -1.5, 'shame': -1.5, 'disgrace': -2.0, 'wrong': -1.0, 'lies': -1.5,
+    'liar': -1.5, 'scam': -2.0, 'boring': -1.0, 'waste': -1.5, 'pathetic': -2.0,
+    # Malay (including common colloquial spellings)
+    'bagus': 1.0, 'baik': 1.0, 'hebat': 1.5, 'suka': 1.0, 'sayang': 1.0, 'gembira': 1.0,
+    'terbaik': 2.0, 'cantik': 1.0, 'mantap': 1.5, 'syabas': 1.5, 'tahniah': 1.5,
+    'setuju': 1.0, 'sokong': 1.0, 'bangga': 1.0, 'power': 1.0, 'gempak': 1.5,
+    'buruk': -1.0, 'teruk': -1.5, 'benci': -1.5, 'marah': -1.5, 'sedih': -1.0,
+    'bodoh': -1.5, 'gagal': -1.5, 'rasuah': -2.0, 'tipu': -1.5, 'penipu': -2.0,
+    'malu': -1.0, 'kecewa': -1.5, 'lemah': -1.0, 'bosan': -1.0, 'sampah': -2.0,
+    'bangang': -2.0, 'menyampah': -1.5, 'hancur': -1.5, 'susah': -0.5, 'mahal': -0.5,
+}
+
+NEGATORS = {
+    'not', 'no', 'never', 'dont', "don't", 'isnt', "isn't", 'cannot', "can't", 'wont', "won't",
+    'tak', 'tidak', 'bukan', 'jangan', 'belum', 'takde', 'tiada',
+}
+
+# Malay emphatic particles and the possessive suffix, e.g. "bagusnya",
+# "baiklah", "terukkan"
+MALAY_SUFFIXES = ('nya', 'lah', 'kah', 'kan')
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+VOCABULARY = {word: index for index, word in enumerate(LEXICON)}
+# The lexicon sorted for np.searchsorted, with the matching weights
+TERMS = np.array(sorted(LEXICON))
+TERM_WEIGHTS = np.array([LEXICON[term] for term in TERMS], dtype=np.float64)
+NEGATOR_TERMS = np.array(sorted(NEGATORS))
+LABELS = np.array(['N', 'U', 'P'])
+
+
+def _normalize(token):
+    if token in VOCABULARY:
+        return token
+    for suffix in MALAY_SUFFIXES:
+        if token.endswith(suffix) and token[:-len(suffix)] in VOCABULARY:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    """Lowercase word tokens; Malay reduplication ("baik-baik") collapses to one word."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower().replace('-', ' ')):
+        token = _normalize(token)
+        if not tokens or tokens[-1] != token:
+            tokens.append(token)
+    return tokens
+
+
+def _lookup(terms, tokens):
+    # Position of each token in the sorted `terms`, and whether it is there
+    found = np.minimum(np.searchsorted(terms, tokens), len(terms) - 1)
+    return found, terms[found] == tokens
+
+
+def score_batch(messages):
+    """Return an array of 'P'/'N'/'U' labels for a list of messages.
+
+    The messages' tokens are laid out in one flat array of codes into the
+    batch's distinct tokens, which are looked up in the sorted lexicon with
+    np.searchsorted. A token is negated when the token before it in the
+    same message is a negator, and the weights are summed per message with
+    a single bincount, normalized by the square root of the message length.
+    """
+    documents = [tokenize(message or '') for message in messages]
+    lengths = np.fromiter(map(len, documents), dtype=np.int64, count=len(documents))
+    flat = [token for tokens in documents for token in tokens]
+    doc_index = np.repeat(np.arange(len(documents)), lengths)
+
+    # Hashing the tokens is cheaper than sorting them all (np.unique)
+    codes = {token: code for code, token in enumerate(dict.fromkeys(flat))}
+    token_codes = np.fromiter(map(codes.__getitem__, flat), dtype=np.int64, count=len(flat))
+    distinct = np.array(list(codes), dtype=str)
+    found, known = _lookup(TERMS, distinct)
+    weights = np.where(known, TERM_WEIGHTS[found], 0.0)[token_codes]
+    negator = _lookup(NEGATOR_TERMS, distinct)[1][token_codes]
+
+    # Shifted by one token: whether the previous token of the same message is a negator
+    negated = np.zeros(len(flat), dtype=bool)
+    negated[1:] = negator[:-1] & (doc_index[1:] == doc_index[:-1])
+    weights[negated] *= -1
+
+    scores = np.bincount(doc_index, weights=weights, minlength=len(documents))
+    scores = scores / np.sqrt(np.maximum(lengths, 1))
+    classes = (scores > POSITIVE_THRESHOLD).astype(np.int8) - (scores < NEGATIVE_THRESHOLD).astype(np.int8)
+    return LABELS[classes + 1]
+
+
+def _score_chunk(chunk):
+    ids, messages = chunk
+    started = time.process_time()
+    labels = score_batch(messages)
+    return ids, labels.tolist(), time.process_time() - started
+
+
+def classify_chunks(chunks, workers=None, max_pending=None):
+    """Score (ids, messages) chunks across a process pool.
+
+    Yields (ids, labels, cpu_seconds) as chunks complete, in submission
+    order. At most `max_pending` chunks are in flight, so the caller's
+    chunk iterator is consumed lazily.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= max_pending:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
@@ -0,0 +1,124 @@
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+from . import rollups
+
+
+# Conditional GET for the analytics pages and the chart data API. A view's
+# ETag is built from the data versions of what it shows (PostRollup and
+# GlobalRollup versions, bumped by every Response/Post/Cluster write), who
+# is looking, and the deployed templates and static files. A reload of an
+# unchanged page costs a version lookup or two and returns 304 Not Modified
+# without running the view.
+#
+# Responses are marked private and no-cache: browsers keep them but
+# revalidate every time, and shared caches never store them.
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+
+@lru_cache(maxsize=1)
+def release():
+    """Digest of the templates and collected static files, so a deploy changes every ETag."""
+    digest = hashlib.sha1(settings.RELEASE.encode('utf-8'))
+    for root, dirs, files in sorted(os.walk(TEMPLATES_DIR)):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(f.read())
+    for name, hashed in sorted(getattr(staticfiles_storage, 'hashed_files', {}).items()):
+        digest.update(f'{name}={hashed}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.sha1(repr((release(),) + parts).encode('utf-8')).hexdigest())
+
+
+def _post_id(value):
+    # The views 404 (or fail) on anything else; no validator for those
+    return int(value) if value and value.isdigit() else None
+
+
+def page_etag(request, *versions):
+    """ETag of an analytics page showing data at `versions` to this user."""
+    if len(messages.get_messages(request)):
+        # The pending messages are shown by the next full render
+        return None
+    return _etag(
+        'page', request.user.pk, request.is_admin, request.headers.get('X-Requested-With', ''), *versions,
+    )
+
+
+def dashboard_etag(request):
+    return page_etag(request, rollups.global_version())
+
+
+def cluster_page_etag(request):
+    # The charts are fetched separately from the API
+    return page_etag(request)
+
+
+def compare_page_etag(request):
+    # Lists every post and cluster; the chart is fetched separately
+    return page_etag(request, rollups.global_version())
+
+
+def post_page_etag(request):
+    """Sentiment and demographic pages: the post list, plus the selected post if any."""
+    post_id = request.GET.get('post')
+    if not post_id:
+        return page_etag(request, rollups.global_version())
+    post_id = _post_id(post_id)
+    if post_id is None:
+        return None
+    return page_etag(request, rollups.global_version(), post_id, rollups.post_version(post_id))
+
+
+def post_data_etag(request, post_id):
+    return _etag('post', post_id, rollups.post_version(post_id))
+
+
+def global_data_etag(request):
+    return _etag('global', rollups.global_version())
+
+
+def not_modified(request, etag):
+    """The 304 (or 412) response for a request whose validators match `etag`, or None."""
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def finish(request, response, etag):
+    if request.method not in ('GET', 'HEAD'):
+        return response
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        if etag is not None:
+            response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(etag_func):
+    """Like django.views.decorators.http.condition(etag_func=...), for the views here.
+
+    Goes inside login_required, so anonymous requests are redirected
+    before any validator is computed. See async_views.conditional for
+    the async views.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs)
+            response = not_modified(request, etag) or view(request, *args, **kwargs)
+            return finish(request, response, etag)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,71 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Max, Min, Sum
+
+from .models import SentimentCube
+
+
+DIMENSIONS = ('postid', 'responsedate', 'stateid', 'gender', 'agegroupid', 'sentiment')
+
+
+def cells(post_id, filters=None):
+    queryset = SentimentCube.objects.filter(postid=post_id)
+    if filters is not None:
+        queryset = filters.apply(queryset)
+    return queryset
+
+
+def total(post_id, filters=None):
+    return cells(post_id, filters).aggregate(total=Sum('total'))['total'] or 0
+
+
+def sentiment_counts(post_id, filters=None):
+    rows = cells(post_id, filters).values('sentiment').annotate(count=Sum('total'))
+    return Counter({row['sentiment']: row['count'] for row in rows})
+
+
+def breakdown(post_id, dimension, filters=None):
+    """Return {dimension value: Counter(sentiment -> responses)}."""
+    rows = cells(post_id, filters).values(dimension, 'sentiment').annotate(count=Sum('total'))
+    result = defaultdict(Counter)
+    for row in rows:
+        result[row[dimension]][row['sentiment']] += row['count']
+    return result
+
+
+def post_breakdowns(post_ids, dimension):
+    """Return {postid: Counter(dimension value -> responses)} for many posts in one query."""
+    rows = (
+        SentimentCube.objects.filter(postid__in=post_ids)
+        .values('postid', dimension)
+        .annotate(count=Sum('total'))
+        .order_by()
+    )
+    result = defaultdict(Counter)
+    for row in rows:
+        result[row['postid']][row[dimension]] += row['count']
+    return result
+
+
+def facets(post_id):
+    """Date range and the distinct gender / age group / state values of a post."""
+    rows = (
+        cells(post_id)
+        .filter(total__gt=0)
+        .values('gender', 'agegroupid', 'stateid')
+        .annotate(min_date=Min('responsedate'), max_date=Max('responsedate'))
+    )
+    genders, agegroups, states, min_dates, max_dates = set(), set(), set(), [], []
+    for row in rows:
+        genders.add(row['gender'])
+        agegroups.add(row['agegroupid'])
+        states.add(row['stateid'])
+        min_dates.append(row['min_date'])
+        max_dates.append(row['max_date'])
+    return {
+        'min_date': min(min_dates) if min_dates else None,
+        'max_date': max(max_dates) if max_dates else None,
+        'genders': sorted(genders),
+        'agegroups': sorted(agegroups),
+        'states': sorted(states),
+    }
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from . import cube
+from .filters import ResponseFilters
+from .models import PostRollup
+
+
+# Per-process index of daily sentiment counts, so the date range slider of
+# the sentiment page is answered from memory instead of the cube. There is
+# one index per post and gender / age group / state filter combination,
+# built from the cube on first use and kept least recently used up to
+# MAX_INDEXES. Writes made by this process are applied to the indexes as
+# they commit; writes made elsewhere are picked up by comparing the index's
+# post version with PostRollup at most every DATE_INDEX_TTL seconds.
+
+MAX_INDEXES = 256
+# Days allocated past the last response, so new responses rarely need the
+# index to be regrown
+SPARE_DAYS = 31
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of slots, updated and queried in O(log n)."""
+
+    def __init__(self, values):
+        self.tree = [0] + list(values)
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def add(self, index, amount):
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += amount
+            index += index & -index
+
+    def prefix(self, stop):
+        """Sum of the slots before `stop`."""
+        total = 0
+        while stop > 0:
+            total += self.tree[stop]
+            stop -= stop & -stop
+        return total
+
+    def range(self, start, stop):
+        return self.prefix(stop) - self.prefix(start)
+
+    def values(self):
+        return [self.range(i, i + 1) for i in range(len(self))]
+
+
+class DateIndex:
+    """Daily response counts per sentiment of one post and filter combination."""
+
+    def __init__(self, daily, version):
+        """`daily` maps (date, sentiment) to a response count."""
+        self.version = version
+        self.checked_at = time.monotonic()
+        days = [day for day, sentiment in daily]
+        self.start = min(days) if days else None
+        self.trees = {}
+        self._allocate(self.start, max(days) if days else None, daily)
+
+    def _allocate(self, first, last, daily):
+        self.start = first
+        size = (last - first).days + 1 + SPARE_DAYS if first is not None else 0
+        slots = {}
+        for (day, sentiment), count in daily.items():
+            slots.setdefault(sentiment, [0] * size)[(day - first).days] += count
+        self.trees = {sentiment: FenwickTree(values) for sentiment, values in slots.items()}
+        self.size = size
+
+    def _daily(self):
+        return {
+            (self.start + timedelta(days=i), sentiment): count
+            for sentiment, tree in self.trees.items()
+            for i, count in enumerate(tree.values())
+            if count
+        }
+
+    def add(self, day, sentiment, count):
+        if self.start is None or day < self.start or (day - self.start).days >= self.size:
+            daily = self._daily()
+            days = [d for d, s in daily] + [day]
+            self._allocate(min(days), max(days), daily)
+        tree = self.trees.get(sentiment)
+        if tree is None:
+            tree = self.trees[sentiment] = FenwickTree([0] * self.size)
+        tree.add((day - self.start).days, count)
+
+    def counts(self, date_from=None, date_to=None):
+        """Responses per sentiment dated between the given days, both inclusive."""
+        if self.start is None:
+            return Counter()
+        start = 0 if date_from is None else min(max((date_from - self.start).days, 0), self.size)
+        stop = self.size if date_to is None else min(max((date_to - self.start).days + 1, 0), self.size)
+        if start >= stop:
+            return Counter()
+        return Counter({sentiment: tree.range(start, stop) for sentiment, tree in self.trees.items()})
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def _key(post_id, filters):
+    return (int(post_id), filters.gender, str(filters.agegroup), str(filters.state))
+
+
+def _matches(key, cell):
+    post_id, gender, agegroup, state = key
+    postid, responsedate, stateid, cell_gender, agegroupid, sentiment = cell
+    return (
+        postid == post_id
+        and (not gender or gender == cell_gender)
+        and (not agegroup or agegroup == str(agegroupid))
+        and (not state or state == str(stateid))
+    )
+
+
+def _version(post_id):
+    return PostRollup.objects.filter(postid=post_id).values_list('version', flat=True).first() or 0
+
+
+def _build(key):
+    post_id, gender, agegroup, state = key
+    # Read the version and the counts from the same snapshot, so writes
+    # committed in between cannot be counted twice by record()
+    with transaction.atomic():
+        version = _version(post_id)
+        rows = (
+            cube.cells(post_id, ResponseFilters(gender=gender, agegroup=agegroup, state=state))
+            .values('responsedate', 'sentiment')
+            .annotate(count=Sum('total'))
+        )
+        daily = {(row['responsedate'], row['sentiment']): row['count'] for row in rows}
+    return DateIndex(daily, version)
+
+
+def _parse(value):
+    return date.fromisoformat(value) if value else None
+
+
+def sentiment_counts(post_id, filters=None):
+    """Responses per sentiment of a post, as cube.sentiment_counts.
+
+    Returns None for searches, which the index cannot answer, and if the
+    date filters are not ISO dates, for the caller to fall back to the cube.
+    """
+    filters = filters or ResponseFilters()
+    if filters.q:
+        return None
+    try:
+        key = _key(post_id, filters)
+        date_from, date_to = _parse(filters.date_from), _parse(filters.date_to)
+    except ValueError:
+        return None
+
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+    now = time.monotonic()
+    if index is not None and now - index.checked_at >= settings.DATE_INDEX_TTL:
+        if _version(key[0]) == index.version:
+            index.checked_at = now
+        else:
+            index = None
+    if index is None:
+        index = _build(key)
+        with _lock:
+            _indexes[key] = index
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+
+    with _lock:
+        return index.counts(date_from, date_to)
+
+
+def tracks(post_ids):
+    """Whether any of the posts has an index in this process."""
+    with _lock:
+        return any(key[0] in post_ids for key in _indexes)
+
+
+def record(cells, versions):
+    """Apply committed cube deltas to the indexes.
+
+    `cells` maps cube cell keys (see rollups._cell_key) to a count delta and
+    `versions` maps each affected post to its version after the write. An
+    index that missed a write in between is dropped and rebuilt on next use.
+    """
+    with _lock:
+        for key in list(_indexes):
+            version = versions.get(key[0])
+            if version is None:
+                continue
+            index = _indexes[key]
+            if index.version >= version:
+                continue  # built after the write was committed
+            if index.version != version - 1:
+                del _indexes[key]
+                continue
+            for cell, count in cells.items():
+                if _matches(key, cell):
+                    index.add(cell[1], cell[5], count)
+            index.version = version
+
+
+def clear():
+    with _lock:
+        _indexes.clear()
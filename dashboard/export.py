@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+from datetime import date
+
+from django.db.models import Q
+
+from . import archive
+
+
+# Streaming export of a post's responses. Rows are read in keyset chunks
+# ordered by (responsedate, responseid), so every chunk is one index range
+# scan and memory use stays flat however large the post is. The key of the
+# last row written is a resume position: pass it back as `after` to carry
+# on after an interrupted export. Archived months are read from the
+# archive table first (see dashboard/archive.py).
+
+COLUMNS = (
+    'responseid', 'postid', 'responsedate', 'username', 'gender', 'agegroup', 'state',
+    'sentiment', 'sentimentmodel', 'responsemessage',
+)
+FIELDS = (
+    'responseid', 'postid_id', 'responsedate', 'username', 'gender', 'agegroupid__agegroup',
+    'stateid__statename', 'sentiment', 'sentimentmodel', 'responsemessage',
+)
+CHUNK_SIZE = 5000
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def position(row):
+    """Resume position of an exported row, as accepted by parse_position."""
+    return f'{row[2].isoformat()}:{row[0]}'
+
+
+def parse_position(value):
+    """Return (responsedate, responseid) of a position; raises ValueError if malformed."""
+    day, separator, pk = value.partition(':')
+    if not separator:
+        raise ValueError(f'Expected DATE:RESPONSEID, got {value!r}')
+    return date.fromisoformat(day), int(pk)
+
+
+def chunks(post_id, filters, after=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of FIELDS tuples, oldest first, starting after the `after` position."""
+    key = parse_position(after) if after else None
+    segments = [
+        segment.order_by('responsedate', 'responseid').values_list(*FIELDS)
+        for segment in archive.post_segments(post_id, filters)
+    ]
+    while True:
+        rows = []
+        for queryset in segments:
+            if key is not None:
+                # Same seek as the responses list (see pagination.paginate)
+                day, pk = key
+                queryset = queryset.filter(Q(responsedate__gt=day) | Q(responseid__gt=pk), responsedate__gte=day)
+            rows += queryset[:chunk_size]
+        if not rows:
+            break
+        # The segments' dates can overlap (see archive.segments)
+        rows = sorted(rows, key=lambda row: (row[2], row[0]))[:chunk_size]
+        key = (rows[-1][2], rows[-1][0])
+        yield rows
+
+
+class CsvWriter:
+    def __init__(self, header=True):
+        self.header = header
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header:
+            writer.writerow(COLUMNS)
+            self.header = False
+        writer.writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def close(self):
+        return b''
+
+
+class JsonlWriter:
+    def __init__(self, header=True):
+        pass
+
+    def write(self, rows):
+        lines = []
+        for row in rows:
+            record = dict(zip(COLUMNS, row))
+            record['responsedate'] = record['responsedate'].isoformat()
+            lines.append(json.dumps(record, ensure_ascii=False))
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def close(self):
+        return b''
+
+
+class _Sink(io.RawIOBase):
+    # Parquet output that is handed on as it is written. tell() must keep
+    # counting across drains: the footer records absolute row group offsets.
+    def __init__(self):
+        self.parts = []
+        self.written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.written
+
+    def drain(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+class ParquetWriter:
+    """One Parquet row group per chunk. Needs pyarrow."""
+
+    def __init__(self, header=True):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('responseid', pa.int64()), ('postid', pa.int64()), ('responsedate', pa.date32()),
+            ('username', pa.string()), ('gender', pa.string()), ('agegroup', pa.string()),
+            ('state', pa.string()), ('sentiment', pa.string()), ('sentimentmodel', pa.string()),
+            ('responsemessage', pa.string()),
+        ])
+        self.sink = _Sink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression='snappy')
+
+    def write(self, rows):
+        columns = [
+            self.pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+        return self.sink.drain()
+
+    def close(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonlWriter, 'parquet': ParquetWriter}
+
+
+def stream(post_id, filters, fmt, after=None, header=True, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """Return an iterator over the export as byte strings, one per chunk.
+
+    `header` only applies to CSV (leave it off when appending a resumed
+    export). `on_chunk(rows, position)` is called once a chunk is written.
+    Parquet files cannot be appended to, so a resumed Parquet export is a
+    separate file holding the remaining rows. Raises ImportError up front
+    if Parquet is asked for without pyarrow installed.
+    """
+    return _stream(WRITERS[fmt](header), post_id, filters, after, chunk_size, on_chunk)
+
+
+def _stream(writer, post_id, filters, after, chunk_size, on_chunk):
+    for rows in chunks(post_id, filters, after, chunk_size):
+        data = writer.write(rows)
+        if data:
+            yield data
+        if on_chunk is not None:
+            on_chunk(rows, position(rows[-1]))
+    data = writer.close()
+    if data:
+        yield data
@@ -0,0 +1,58 @@
+from . import search
+
+
+class ResponseFilters:
+    """The gender / age group / state / date / text search filters of the analytics views.
+
+    Field names are shared by `Response` and `SentimentCube`, so the same
+    filters can be applied to raw responses or to pre-aggregated cube cells.
+    The cube has no message text: filters with a search (`q`) only apply to
+    responses.
+    """
+
+    def __init__(self, gender='', agegroup='', state='', date_from='', date_to='', q=''):
+        self.gender = gender
+        self.agegroup = agegroup
+        self.state = state
+        self.date_from = date_from
+        self.date_to = date_to
+        self.q = q.strip()
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(
+            gender=request.GET.get('gender', ''),
+            agegroup=request.GET.get('agegroup', ''),
+            state=request.GET.get('state', ''),
+            date_from=request.GET.get('date_from', ''),
+            date_to=request.GET.get('date_to', ''),
+            q=request.GET.get('q', ''),
+        )
+
+    def apply(self, queryset):
+        if self.gender:
+            queryset = queryset.filter(gender=self.gender)
+        if self.agegroup:
+            queryset = queryset.filter(agegroupid=self.agegroup)
+        if self.state:
+            queryset = queryset.filter(stateid=self.state)
+        if self.date_from:
+            queryset = queryset.filter(responsedate__gte=self.date_from)
+        if self.date_to:
+            queryset = queryset.filter(responsedate__lte=self.date_to)
+        if self.q:
+            queryset = search.apply(queryset, self.q)
+        return queryset
+
+    def as_dict(self):
+        return {
+            'gender': self.gender,
+            'agegroup': self.agegroup,
+            'state': self.state,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'q': self.q,
+        }
+
+    def __bool__(self):
+        return any(self.as_dict().values())
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.urls import reverse
+
+
+GEOJSON_PATH = settings.BASE_DIR / 'static' / 'geojson' / 'malaysia_states.geojson.geojson'
+
+# Simplification tolerance (degrees) and coordinate precision (decimals)
+# per detail level; 0.001 degrees is roughly 100 m.
+LEVELS = {
+    'low': {'tolerance': 0.02, 'precision': 2},
+    'medium': {'tolerance': 0.005, 'precision': 3},
+    'high': {'tolerance': 0.001, 'precision': 4},
+}
+
+# State names used in the database that differ from the GeoJSON feature names
+GEOJSON_NAMES = {
+    "Penang": "Pulau Pinang",
+    "Malacca": "Melaka",
+    "WP Kuala Lumpur": "Kuala Lumpur",
+    "WP Labuan": "Labuan",
+    "WP Putrajaya": "Putrajaya",
+}
+
+
+def level_for_zoom(zoom):
+    if zoom < 5:
+        return 'low'
+    if zoom < 7:
+        return 'medium'
+    return 'high'
+
+
+@lru_cache(maxsize=1)
+def load_states():
+    with open(GEOJSON_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _simplify(points, tolerance):
+    """Douglas-Peucker simplification of an (n, 2) array of points."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+
+def _simplify_ring(ring, tolerance, precision):
+    points = _simplify(np.asarray(ring, dtype=float), tolerance)
+    points = np.round(points, precision)
+    # Drop consecutive duplicates introduced by quantization
+    if len(points) > 1:
+        changed = np.any(points[1:] != points[:-1], axis=1)
+        points = points[np.concatenate(([True], changed))]
+    if len(points) < 4:
+        return None
+    return points.tolist()
+
+
+def _simplify_polygon(polygon, tolerance, precision):
+    rings = [_simplify_ring(ring, tolerance, precision) for ring in polygon]
+    if rings[0] is None:
+        # Keep tiny polygons (e.g. islands) at full detail, only quantized
+        rings[0] = np.round(np.asarray(polygon[0], dtype=float), precision).tolist()
+    return [ring for ring in rings if ring is not None]
+
+
+def simplify_states(level):
+    options = LEVELS[level]
+    features = []
+    for feature in load_states()['features']:
+        geometry = feature['geometry']
+        if geometry['type'] == 'Polygon':
+            coordinates = _simplify_polygon(geometry['coordinates'], **options)
+        else:
+            coordinates = [_simplify_polygon(p, **options) for p in geometry['coordinates']]
+        features.append({
+            'type': 'Feature',
+            'properties': {'name': feature['properties']['name']},
+            'geometry': {'type': geometry['type'], 'coordinates': coordinates},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+@lru_cache(maxsize=None)
+def variant(level):
+    """Serialized GeoJSON for a detail level and its content hash."""
+    content = json.dumps(simplify_states(level), separators=(',', ':')).encode('utf-8')
+    return content, hashlib.sha256(content).hexdigest()[:16]
+
+
+def variant_url(level):
+    content, digest = variant(level)
+    return f"{reverse('malaysia_geojson', args=[level])}?v={digest}"
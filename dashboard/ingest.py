@@ -0,0 +1,291 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+
+from django.db import transaction
+
+from . import rollups
+from .models import AgeGroup, Cluster, Post, Response, ResponseArchive, State
+
+
+GENDERS = {code for code, label in Response.GENDER_CHOICES}
+SENTIMENTS = {code for code, label in Response.SENTIMENT_CHOICES}
+
+# Keep IN (...) lists below SQLite's default host parameter limit
+LOOKUP_CHUNK = 900
+
+# Where rows of a model may already be stored: archived responses
+# (dashboard/archive.py) keep their ids
+STORED_IN = {Response: (Response, ResponseArchive)}
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path):
+    return 'jsonl' if str(path).lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(path, fmt, offset=0):
+    """Stream rows from a CSV or JSONL file.
+
+    Yields (row, offset) pairs where offset is the byte position just past
+    the row, so a later run can resume from a checkpoint with `offset`.
+    CSV rows are dicts keyed by the header; JSONL rows are the raw line text
+    (decoded by the cleaner so a malformed line is rejected, not fatal).
+    """
+    with open(path, 'rb') as f:
+        header = None
+        if fmt == 'csv':
+            header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+        if offset:
+            f.seek(offset)
+        position = f.tell()
+
+        def lines():
+            nonlocal position
+            for line in f:
+                position += len(line)
+                yield line.decode('utf-8')
+
+        if fmt == 'csv':
+            for values in csv.reader(lines()):
+                if values:
+                    yield dict(zip(header, values)), position
+        else:
+            for text in lines():
+                if text.strip():
+                    yield text, position
+
+
+def _as_dict(row):
+    if isinstance(row, dict):
+        return row
+    try:
+        row = json.loads(row)
+    except ValueError:
+        raise RowError('invalid JSON')
+    if not isinstance(row, dict):
+        raise RowError('expected a JSON object')
+    return row
+
+
+def _field(row, name, required=True):
+    value = row.get(name)
+    if isinstance(value, str):
+        value = value.strip()
+    if required and value in (None, ''):
+        raise RowError(f'missing {name}')
+    return value
+
+
+def _int(row, name, default=None):
+    value = _field(row, name, required=default is None)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{name} is not an integer: {value!r}')
+
+
+def _date(row, name):
+    value = _field(row, name)
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise RowError(f'{name} is not an ISO date: {value!r}')
+
+
+def _text(row, name, max_length):
+    value = str(_field(row, name))
+    if len(value) > max_length:
+        raise RowError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+class ResponseCleaner:
+    """Validate response rows against the code sets in the database.
+
+    Undisclosed demographics may be left blank and are stored as agegroup 0,
+    state 0 and gender 'N', as described on the Response model. A blank
+    sentiment loads the row unlabelled for `classify_responses`.
+    """
+
+    def __init__(self):
+        self.post_ids = set(Post.objects.values_list('postid', flat=True))
+        self.agegroup_ids = set(AgeGroup.objects.values_list('agegroupid', flat=True))
+        self.state_ids = set(State.objects.values_list('stateid', flat=True))
+
+    def __call__(self, row):
+        row = _as_dict(row)
+        response = Response(
+            responseid=_int(row, 'responseid'),
+            postid_id=_int(row, 'postid'),
+            responsedate=_date(row, 'responsedate'),
+            responsemessage=_text(row, 'responsemessage', 1024),
+            username=_text(row, 'username', 50),
+            agegroupid_id=_int(row, 'agegroupid', default=0),
+            gender=_field(row, 'gender', required=False) or 'N',
+            stateid_id=_int(row, 'stateid', default=0),
+            sentiment=_field(row, 'sentiment', required=False) or '',
+        )
+        if response.postid_id not in self.post_ids:
+            raise RowError(f'unknown postid {response.postid_id}')
+        if response.agegroupid_id not in self.agegroup_ids:
+            raise RowError(f'unknown agegroupid {response.agegroupid_id}')
+        if response.stateid_id not in self.state_ids:
+            raise RowError(f'unknown stateid {response.stateid_id}')
+        if response.gender not in GENDERS:
+            raise RowError(f'unknown gender {response.gender!r}')
+        if response.sentiment and response.sentiment not in SENTIMENTS:
+            raise RowError(f'unknown sentiment {response.sentiment!r}')
+        return response
+
+
+class PostCleaner:
+    def __init__(self):
+        self.cluster_ids = set(Cluster.objects.values_list('clusterid', flat=True))
+
+    def __call__(self, row):
+        row = _as_dict(row)
+        post = Post(
+            postid=_int(row, 'postid'),
+            clusterid_id=_int(row, 'clusterid'),
+            postdate=_date(row, 'postdate'),
+            postlink=_text(row, 'postlink', 2048),
+            postmessage=_text(row, 'postmessage', 2048),
+        )
+        if post.clusterid_id not in self.cluster_ids:
+            raise RowError(f'unknown clusterid {post.clusterid_id}')
+        return post
+
+
+def _existing_ids(model, ids):
+    existing = set()
+    ids = list(ids)
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[start:start + LOOKUP_CHUNK]
+        for stored in STORED_IN.get(model, (model,)):
+            existing.update(stored.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    return existing
+
+
+def _insert_new(model, objects):
+    # First occurrence wins within a batch; rows already stored are skipped,
+    # which makes re-running a file (or a resumed batch) a no-op.
+    unique = {}
+    for obj in objects:
+        unique.setdefault(obj.pk, obj)
+    existing = _existing_ids(model, unique)
+    new = [obj for pk, obj in unique.items() if pk not in existing]
+    model.objects.bulk_create(new, batch_size=1000)
+    return new
+
+
+def write_responses(objects):
+    with transaction.atomic():
+        new = _insert_new(Response, objects)
+        # bulk_create bypasses the rollup signal handlers
+        rollups.record_responses(new)
+    return len(new)
+
+
+def write_posts(objects):
+    with transaction.atomic():
+        new = _insert_new(Post, objects)
+        if new:
+            # bulk_create bypasses the signal handler that files new posts
+            rollups.add_posts(new)
+    return len(new)
+
+
+KINDS = {
+    'responses': (ResponseCleaner, write_responses),
+    'posts': (PostCleaner, write_posts),
+}
+
+
+class Checkpoint:
+    """Progress of an ingestion run, saved after every committed batch."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def ingest(path, kind, fmt=None, batch_size=5000, checkpoint=None, resume=False,
+           on_batch=None, on_reject=None):
+    """Load a CSV/JSONL file of posts or responses in bounded batches.
+
+    Each batch of `batch_size` input rows is validated, de-duplicated and
+    written in its own transaction, then the checkpoint is saved. Memory use
+    is bounded by the batch size regardless of file size. Returns a stats
+    dict; `on_batch(stats)` is called after each batch and
+    `on_reject(row, error)` for every invalid row.
+    """
+    cleaner_class, write = KINDS[kind]
+    cleaner = cleaner_class()
+    fmt = fmt or detect_format(path)
+
+    stats = {'path': os.path.abspath(path), 'kind': kind, 'offset': 0,
+             'rows': 0, 'inserted': 0, 'duplicates': 0, 'rejected': 0}
+    if resume and checkpoint is not None:
+        saved = checkpoint.load()
+        if saved and saved.get('path') == stats['path'] and saved.get('kind') == kind:
+            stats.update(saved)
+
+    started = time.monotonic()
+    rows_at_start = stats['rows']
+    batch, batch_rows = [], 0
+
+    def flush(offset):
+        nonlocal batch, batch_rows
+        inserted = write(batch)
+        stats['inserted'] += inserted
+        stats['duplicates'] += len(batch) - inserted
+        stats['rows'] += batch_rows
+        stats['offset'] = offset
+        elapsed = time.monotonic() - started
+        stats['rows_per_second'] = (stats['rows'] - rows_at_start) / elapsed if elapsed else 0.0
+        if checkpoint is not None:
+            checkpoint.save(stats)
+        if on_batch is not None:
+            on_batch(stats)
+        batch, batch_rows = [], 0
+
+    offset = stats['offset']
+    for row, offset in read_rows(path, fmt, stats['offset']):
+        batch_rows += 1
+        try:
+            batch.append(cleaner(row))
+        except RowError as error:
+            stats['rejected'] += 1
+            if on_reject is not None:
+                on_reject(row, error)
+        if batch_rows >= batch_size:
+            flush(offset)
+    if batch_rows:
+        flush(offset)
+
+    if checkpoint is not None:
+        checkpoint.clear()
+    return stats
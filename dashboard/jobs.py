@@ -0,0 +1,264 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import archive, rollups, routers
+from .models import Cluster, Job, Post
+
+
+# Background jobs kept in the database and run by `manage.py run_jobs`, so
+# slow work (rebuilds, large deletes) does not hold a web worker and no
+# broker is needed. Views enqueue a registered task with enqueue() and
+# poll the job (api.job_status). A worker claims the highest priority job
+# that is due, marking it running in a conditional UPDATE so two workers
+# never both get it; where the database supports it, candidates are read
+# with SELECT ... FOR UPDATE SKIP LOCKED so workers do not wait for each
+# other. A failed attempt is retried after an exponential backoff until
+# max_attempts. While a job runs, its worker refreshes the job's heartbeat;
+# a job whose heartbeat is older than JOB_STALE_SECONDS (its worker died)
+# is queued again.
+#
+# With BACKGROUND_JOBS off (e.g. in development, without a worker), a job
+# runs in the enqueueing process as soon as its transaction commits.
+
+RETRY_DELAY = 30  # seconds before the second attempt, doubled after each failure
+
+TASKS = {}
+
+
+def task(name, max_attempts=3):
+    """Register `func(job, **arguments)` as a task; its return value (JSON) is the job's result."""
+    def register(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+
+    return register
+
+
+def enqueue(name, priority=0, username='', **arguments):
+    if name not in TASKS:
+        raise KeyError(f'Unknown task: {name}')
+    job = Job.objects.create(
+        task=name, arguments=arguments, priority=priority, max_attempts=TASKS[name][1],
+        run_after=timezone.now(), username=username,
+    )
+    if not settings.BACKGROUND_JOBS:
+        # Runs after the caller's transaction, as a worker would
+        transaction.on_commit(lambda: run_now(job.pk))
+    return job
+
+
+def run_now(job_id):
+    job = claim(worker='inline', job_id=job_id)
+    if job is not None:
+        run(job)
+
+
+def report(job, done, total=None, message=None):
+    """Record a running job's progress, e.g. report(job, 3, 10, 'Deleting post 42')."""
+    job.progress_done = done
+    changes = {'progress_done': done}
+    if total is not None:
+        job.progress_total = changes['progress_total'] = total
+    if message is not None:
+        job.progress_message = changes['progress_message'] = message[:200]
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(**changes)
+
+
+def status(job):
+    """What the job polling endpoint returns."""
+    return {
+        'id': job.pk,
+        'task': job.task,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {'done': job.progress_done, 'total': job.progress_total, 'message': job.progress_message},
+        'result': job.result,
+        # The exception line of the last failed attempt; the traceback is on the jobs page
+        'error': job.error.strip().splitlines()[-1] if job.error.strip() else '',
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def unclaimed():
+    """Number of jobs that have been due for over JOB_STALE_SECONDS without a worker claiming them."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    return Job.objects.filter(status=Job.QUEUED, run_after__lt=cutoff).count()
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def _candidates(now):
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('-priority', 'run_after', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        due = due.select_for_update(skip_locked=True)
+    return due
+
+
+def claim(worker, job_id=None):
+    """Mark the next due job (or job `job_id`) running for `worker` and return it, or None."""
+    with routers.primary(), transaction.atomic():
+        now = timezone.now()
+        candidates = _candidates(now)
+        if job_id is not None:
+            candidates = candidates.filter(pk=job_id)
+        for job in candidates[:5]:
+            claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=job.attempts + 1, worker=worker,
+                started_at=now, heartbeat_at=now, progress_done=0, progress_total=0, progress_message='',
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+    return None
+
+
+class _Heartbeat(threading.Thread):
+    # Refreshes a running job's heartbeat from its own connection, so long
+    # tasks that report no progress are not taken for dead
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job_id = job.pk
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_STALE_SECONDS / 3):
+                try:
+                    Job.objects.filter(pk=self.job_id, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    # e.g. SQLite busy while the task writes; try again next time
+                    pass
+        finally:
+            connection.close()
+
+
+def run(job):
+    """Run a claimed job and record its result, or schedule its retry."""
+    func = TASKS.get(job.task, (None,))[0]
+    if func is None:
+        finish(job, error=f'Unknown task: {job.task}')
+        return False
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        with routers.primary():
+            result = func(job, **job.arguments)
+    except Exception:
+        finish(job, error=traceback.format_exc(), retry=job.attempts < job.max_attempts)
+        return False
+    finally:
+        heartbeat.stopped.set()
+        heartbeat.join()
+    finish(job, result=result)
+    return True
+
+
+def finish(job, result=None, error='', retry=False):
+    now = timezone.now()
+    if retry:
+        changes = {
+            'status': Job.QUEUED,
+            'run_after': now + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1)),
+            'error': error,
+        }
+    elif error:
+        changes = {'status': Job.FAILED, 'error': error, 'finished_at': now}
+    else:
+        changes = {
+            'status': Job.DONE, 'result': result, 'finished_at': now,
+            'progress_done': max(job.progress_done, job.progress_total),
+        }
+    with routers.primary():
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(**changes)
+
+
+def requeue_stale():
+    """Put running jobs whose worker died back in the queue (or fail them if out of attempts)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    error = f'No heartbeat from worker for {settings.JOB_STALE_SECONDS}s.'
+    with routers.primary():
+        stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff)
+        for job in stale:
+            finish(job, error=error, retry=job.attempts < job.max_attempts)
+    return len(stale)
+
+
+def work(worker, once=False, sleep=1.0, stop=None):
+    """Run jobs until `stop()` is true, or until none is due with `once`.
+
+    Yields (job, succeeded) after each job.
+    """
+    requeue_stale()
+    while not (stop and stop()):
+        close_old_connections()
+        job = claim(worker)
+        if job is None:
+            if once:
+                return
+            requeue_stale()
+            time.sleep(sleep)
+            continue
+        yield job, run(job)
+
+
+# Tasks
+
+@task('rebuild_rollups', max_attempts=1)
+def rebuild_rollups(job):
+    return {'posts': rollups.rebuild()}
+
+
+@task('delete_post')
+def delete_post(job, post_id):
+    report(job, 0, 1, f'Deleting post {post_id}')
+    deleted, per_model = Post.objects.filter(postid=post_id).delete()
+    return {'deleted': per_model}
+
+
+@task('delete_cluster')
+def delete_cluster(job, cluster_id):
+    posts = list(Post.objects.filter(clusterid=cluster_id).values_list('postid', flat=True))
+    # One post (and its responses) per transaction, so other writers are
+    # not blocked for the whole cascade and progress can be reported
+    for done, post_id in enumerate(posts):
+        report(job, done, len(posts) + 1, f'Deleting post {post_id}')
+        Post.objects.filter(postid=post_id).delete()
+    report(job, len(posts), len(posts) + 1, f'Deleting cluster {cluster_id}')
+    Cluster.objects.filter(clusterid=cluster_id).delete()
+    return {'posts': len(posts)}
+
+
+@task('extract_topics', max_attempts=1)
+def extract_topics(job, posts=None, refit=False):
+    options = {'refit': refit}
+    if posts:
+        options['post'] = posts
+    report(job, 0, 1, 'Extracting topics')
+    call_command('extract_topics', **options)
+    return {'posts': posts or 'all'}
+
+
+@task('archive_responses', max_attempts=1)
+def archive_responses(job, keep_months=None):
+    if keep_months is None:
+        keep_months = settings.RESPONSE_HOT_MONTHS
+    months = archive.months_to_archive(archive.months_back(keep_months))
+    moved = 0
+    for done, month in enumerate(months):
+        report(job, done, len(months), f'Archiving {month:%Y-%m}')
+        moved += archive.archive_month(month)
+    return {'months': len(months), 'responses': moved}
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import archive, routers
+
+
+class Command(BaseCommand):
+    help = ('Move responses older than the hot months (RESPONSE_HOT_MONTHS) from the response table '
+            'to the archive, month by month. Dashboards and rollups are unchanged.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=settings.RESPONSE_HOT_MONTHS,
+            help='Whole months to keep in the response table, besides the current one.',
+        )
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE,
+                            help='Responses moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would be archived.')
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--keep-months must be 0 or more and --batch-size at least 1.')
+        cutoff = archive.months_back(options['keep_months'])
+        with routers.primary():
+            months = archive.months_to_archive(cutoff)
+            if options['dry_run']:
+                for month in months:
+                    count = archive.hot_responses(month).count()
+                    self.stdout.write(f'{month:%Y-%m}: {count} response(s) in the response table')
+                return
+            moved = 0
+            for month in months:
+                count = archive.archive_month(month, options['batch_size'])
+                moved += count
+                self.stdout.write(f'{month:%Y-%m}: archived {count} response(s)')
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} response(s) dated before {cutoff}.'))
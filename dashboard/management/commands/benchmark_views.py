@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from dashboard import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Measure latency, SQL query count and peak memory of every analytics view and filter '
+            'combination against the current database, optionally comparing to a stored baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--post', type=int, help='Post to benchmark (default: the one with most responses).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per request, cold and warm each.')
+        parser.add_argument('--baseline', help='Compare against this baseline JSON file.')
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Send requests through the ASGI handler (set ASYNC_VIEWS=1 to benchmark the async views).',
+        )
+        parser.add_argument('--save', help='Write the results to this JSON file (e.g. to make a new baseline).')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Allowed relative slowdown / memory growth before a request counts as regressed.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive.')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        self.stdout.write(
+            f"{'request':<36} {'cold p50':>9} {'p99':>9} {'best':>9} {'warm p50':>9} {'p99':>9} {'best':>9} "
+            f"{'queries':>8} {'peak KiB':>9}"
+        )
+
+        def on_result(name, result):
+            self.stdout.write(
+                f"{name:<36} {result['cold_ms']:>9} {result['cold_p99_ms']:>9} {result['cold_best_ms']:>9} "
+                f"{result['warm_ms']:>9} {result['warm_p99_ms']:>9} {result['warm_best_ms']:>9} "
+                f"{result['queries']:>8} {result['peak_kib']:>9}"
+            )
+
+        setup_test_environment()
+        try:
+            current = benchmark.run(
+                options['post'], options['repeat'], on_result=on_result, asgi=options['asgi'],
+            )
+        finally:
+            teardown_test_environment()
+        meta = current['meta']
+        self.stdout.write(
+            f"{meta['vendor']}, {meta['responses']} responses, post {meta['post']} "
+            f"with {meta['post_responses']} responses, {meta['handler']}"
+        )
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(current, f, indent=2)
+            self.stdout.write(f"Results written to {options['save']}")
+
+        if baseline is not None:
+            regressions = benchmark.compare(current, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}.')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from dashboard import benchmark, queryplans, routers, synthetic
+from dashboard.models import Response
+
+
+class Command(BaseCommand):
+    help = ('Load a large synthetic dataset into a throwaway test database, issue every analytics '
+            'request and fail if any of their queries does a full scan or a filesort.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--responses', type=int, default=200000, help='Synthetic responses to load.')
+        parser.add_argument('--posts', type=int, default=20, help='Synthetic posts to spread them over.')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the test database (and its data) between runs.',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'],
+        )
+        try:
+            # Only the primary was switched to the test database
+            with routers.primary():
+                if not Response.objects.exists():
+                    self.stdout.write(f"Loading {options['responses']} synthetic responses...")
+                    synthetic.generate(options['responses'], options['posts'], seed=0)
+                    queryplans.analyze()
+                results = queryplans.check(benchmark.busiest_post())
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        failures = 0
+        for name, queries, problems in results:
+            status = self.style.ERROR('FAIL') if problems else self.style.SUCCESS('ok')
+            self.stdout.write(f'{status} {name} ({len(queries)} queries)')
+            if verbosity > 1:
+                for sql, plan in queries:
+                    self.stdout.write(f'    {sql}')
+                    for step in plan:
+                        self.stdout.write(f'      {step}')
+            for problem in problems:
+                self.stdout.write(f'  {problem}')
+            failures += bool(problems)
+
+        if failures:
+            raise CommandError(f'{failures} request(s) regressed to a full scan or filesort.')
+        self.stdout.write(self.style.SUCCESS('Every analytics query uses an index.'))
@@ -0,0 +1,98 @@
+import copy
+import time
+from collections import deque
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from dashboard import classifier, rollups
+from dashboard.models import Response, ResponseArchive
+
+
+def apply_labels(model, ids, labels):
+    """Store classifier labels on rows of `model` and move the affected rollup counts.
+
+    Archived responses are counted in the rollups like hot ones (see
+    dashboard/archive.py), so relabelling either moves the counts.
+    """
+    labels_by_id = dict(zip(ids, labels))
+    with transaction.atomic():
+        rows = model.objects.select_for_update().filter(
+            responseid__gte=ids[0], responseid__lte=ids[-1],
+        ).only('postid', 'responsedate', 'stateid', 'gender', 'agegroupid', 'sentiment', 'sentimentmodel')
+
+        updated, previous, relabelled = [], [], []
+        for row in rows:
+            label = labels_by_id.get(row.responseid)
+            if label is None:
+                continue
+            if row.sentiment != label:
+                previous.append(copy.copy(row))
+                relabelled.append(row)
+            row.sentiment = label
+            row.sentimentmodel = classifier.MODEL_VERSION
+            updated.append(row)
+
+        model.objects.bulk_update(updated, ['sentiment', 'sentimentmodel'], batch_size=1000)
+        # bulk_update bypasses the rollup signal handlers
+        rollups.record_responses(previous, sign=-1)
+        rollups.record_responses(relabelled)
+    return len(relabelled)
+
+
+class Command(BaseCommand):
+    help = ('Label unlabelled responses with the offline classifier, re-scoring responses '
+            'labelled by an older model version.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Scoring processes (default: one per CPU).')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Responses per scoring batch.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Also re-score responses already labelled by the current model version.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        # Manually labelled responses (sentimentmodel NULL) are never touched
+        if options['force']:
+            pending = Q(sentiment='') | Q(sentimentmodel__isnull=False)
+        else:
+            pending = Q(sentiment='') | (Q(sentimentmodel__isnull=False) & ~Q(sentimentmodel=classifier.MODEL_VERSION))
+        # The table of each chunk in flight; classify_chunks yields in submission order
+        models = deque()
+
+        def chunks():
+            for model in (Response, ResponseArchive):
+                queryset = model.objects.filter(pending).order_by('responseid')
+                last_id = None
+                while True:
+                    page = queryset if last_id is None else queryset.filter(responseid__gt=last_id)
+                    rows = list(page.values_list('responseid', 'responsemessage')[:chunk_size])
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    models.append(model)
+                    yield [row[0] for row in rows], [row[1] for row in rows]
+
+        self.stdout.write(f'Scoring with {classifier.MODEL_VERSION}...')
+        started = time.monotonic()
+        scored = relabelled = 0
+        cpu_seconds = 0.0
+        for ids, labels, cpu in classifier.classify_chunks(chunks(), workers=options['workers']):
+            relabelled += apply_labels(models.popleft(), ids, labels)
+            scored += len(ids)
+            cpu_seconds += cpu
+            self.stdout.write(f'{scored} responses scored, {relabelled} labels changed')
+
+        elapsed = time.monotonic() - started
+        per_core = scored / cpu_seconds if cpu_seconds else 0.0
+        overall = scored / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {scored} responses scored, {relabelled} labels changed in {elapsed:.1f}s '
+            f'({overall:.0f} docs/s overall, {per_core:.0f} docs/s per core).'
+        ))
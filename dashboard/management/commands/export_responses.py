@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import export, routers
+from dashboard.filters import ResponseFilters
+from dashboard.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Export the responses of a post, with the same filters as the sentiment page, '
+            'as CSV, JSON Lines or Parquet in constant memory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('post', type=int, help='Post whose responses to export.')
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write (default: standard output).')
+        parser.add_argument('--gender', default='')
+        parser.add_argument('--agegroup', default='')
+        parser.add_argument('--state', default='')
+        parser.add_argument('--date-from', default='', help='First response date, YYYY-MM-DD.')
+        parser.add_argument('--date-to', default='', help='Last response date, YYYY-MM-DD.')
+        parser.add_argument('--search', default='', help='Only responses containing these words and "phrases".')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE, help='Responses read per query.')
+        parser.add_argument('--after', help='Only export responses after this DATE:RESPONSEID position.')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Carry on an interrupted CSV or JSON Lines export into --output from its last complete chunk.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        if not Post.objects.filter(postid=options['post']).exists():
+            raise CommandError(f"Post {options['post']} does not exist.")
+        after = options['after']
+        if after:
+            try:
+                export.parse_position(after)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        output = options['output']
+        # Progress is recorded next to the output after every chunk: the
+        # position of its last row and the file size once it was written
+        progress_path = f'{output}.position' if output else None
+        offset = 0
+        if options['resume']:
+            if not output or options['format'] == 'parquet':
+                raise CommandError('--resume needs --output and a CSV or JSON Lines export.')
+            try:
+                with open(progress_path, encoding='utf-8') as f:
+                    progress = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Nothing to resume: cannot read {progress_path}: {e}')
+            after, offset = progress['position'], progress['offset']
+
+        filters = ResponseFilters(
+            gender=options['gender'], agegroup=options['agegroup'], state=options['state'],
+            date_from=options['date_from'], date_to=options['date_to'], q=options['search'],
+        )
+        exported = 0
+
+        def on_chunk(rows, position):
+            nonlocal exported
+            exported += len(rows)
+            if progress_path:
+                out.flush()
+                os.fsync(out.fileno())
+                with open(progress_path, 'w', encoding='utf-8') as f:
+                    json.dump({'position': position, 'offset': out.tell()}, f)
+            if options['verbosity'] > 1 or not output:
+                self.stderr.write(f'{exported} responses exported, last at {position}')
+
+        try:
+            chunks = export.stream(
+                options['post'], filters, options['format'], after=after, header=not after,
+                chunk_size=options['chunk_size'], on_chunk=on_chunk,
+            )
+        except ImportError:
+            raise CommandError('Parquet export needs pyarrow (pip install pyarrow).')
+
+        if output:
+            out = open(output, 'r+b' if options['resume'] else 'wb')
+            # Drop whatever an interrupted run wrote after its last complete chunk
+            out.truncate(offset)
+            out.seek(offset)
+        else:
+            out = sys.stdout.buffer
+        try:
+            # Read-only, so the export may read from a replica
+            with routers.scope():
+                for data in chunks:
+                    out.write(data)
+        finally:
+            if output:
+                out.close()
+
+        if progress_path and os.path.exists(progress_path):
+            os.remove(progress_path)
+        if output:
+            self.stdout.write(self.style.SUCCESS(f'Exported {exported} responses to {output}.'))
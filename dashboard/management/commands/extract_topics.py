@@ -0,0 +1,172 @@
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from dashboard import rollups, topics
+from dashboard.models import Post, PostRollup, Response, ResponseArchive, ResponseTopic, Topic, TopicFit
+from dashboard.rollups import SENTIMENT_FIELDS
+
+
+def _responses(queryset):
+    rows = list(queryset.order_by('responseid').values_list('responseid', 'responsemessage'))
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def _existing(postid, ids):
+    # Responses deleted since they were read are left out
+    stored = set(Response.objects.filter(postid=postid).values_list('responseid', flat=True))
+    return [pk in stored for pk in ids]
+
+
+def store_fit(postid, terms, idf, centroids, ids, labels):
+    """Replace a post's topics and assignments with a new fit.
+
+    Fits only read the response table: archived responses lose their topic.
+    """
+    with transaction.atomic():
+        ResponseTopic.objects.filter(responseid__postid=postid).delete()
+        ResponseArchive.objects.filter(postid=postid).update(topicid=None)
+        Topic.objects.filter(postid=postid).delete()
+        TopicFit.objects.update_or_create(postid_id=postid, defaults={
+            'vocabulary': '\n'.join(terms),
+            'idf': idf.tobytes(),
+            'responses': len(ids),
+            'fitted_at': timezone.now(),
+        })
+        Topic.objects.bulk_create([
+            Topic(postid_id=postid, number=j + 1, terms=' '.join(topics.top_terms(centroid, terms))[:200],
+                  centroid=centroid.tobytes())
+            for j, centroid in enumerate(centroids)
+        ])
+        store_assignments(postid, ids, labels)
+
+
+def store_assignments(postid, ids, labels):
+    """Record which topic (index into the post's topics, or -1) each response belongs to."""
+    topic_ids = dict(Topic.objects.filter(postid=postid).values_list('number', 'id'))
+    ResponseTopic.objects.bulk_create(
+        [ResponseTopic(responseid_id=pk, topic_id=topic_ids.get(label + 1))
+         for pk, label, exists in zip(ids, labels, _existing(postid, ids)) if exists],
+        batch_size=1000, ignore_conflicts=True,
+    )
+
+
+def load_fit(postid):
+    fit = TopicFit.objects.get(postid=postid)
+    centroids = list(Topic.objects.filter(postid=postid).order_by('number').values_list('centroid', flat=True))
+    terms = fit.vocabulary.split('\n') if fit.vocabulary else []
+    shape = (len(centroids), len(terms))
+    return (
+        terms,
+        np.frombuffer(fit.idf, dtype=np.float32),
+        np.frombuffer(b''.join(bytes(c) for c in centroids), dtype=np.float32).reshape(shape),
+    )
+
+
+def recount():
+    """Refresh the sentiment mix of every topic from its responses' current labels.
+
+    Archived responses count towards the topic they had when archived.
+    Returns the ids of the posts whose topics changed.
+    """
+    mix = defaultdict(Counter)
+    hot = (
+        ResponseTopic.objects.filter(topic__isnull=False)
+        .values_list('topic', 'responseid__sentiment')
+        .annotate(count=Count('responseid'))
+        .order_by()
+    )
+    archived = (
+        ResponseArchive.objects.filter(topicid__isnull=False)
+        .values_list('topicid', 'sentiment')
+        .annotate(count=Count('responseid'))
+        .order_by()
+    )
+    for rows in (hot, archived):
+        for topic, sentiment, count in rows:
+            counts = mix[topic]
+            counts['total'] += count
+            field = SENTIMENT_FIELDS.get(sentiment)
+            if field:
+                counts[field] += count
+
+    changed = []
+    for topic in Topic.objects.all():
+        counts = mix[topic.pk]
+        values = {field: counts[field] for field in ('total', 'positive', 'negative', 'neutral')}
+        if any(getattr(topic, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(topic, field, value)
+            changed.append(topic)
+    Topic.objects.bulk_update(changed, ['total', 'positive', 'negative', 'neutral'], batch_size=1000)
+    return {topic.postid_id for topic in changed}
+
+
+class Command(BaseCommand):
+    help = ('Extract the topics of each post from its response messages (TF-IDF and mini-batch '
+            'k-means), assigning responses added since the last run to the existing topics.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--post', type=int, action='append', help='Only this post (repeatable).')
+        parser.add_argument('--topics', type=int, default=topics.TOPICS, help='Topics per post.')
+        parser.add_argument('--min-responses', type=int, default=50,
+                            help='Skip posts with fewer responses than this.')
+        parser.add_argument('--refit', action='store_true',
+                            help='Refit posts that already have topics instead of only assigning new responses.')
+        parser.add_argument('--workers', type=int, help='Fitting processes (default: one per CPU).')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['topics'] < 1:
+            raise CommandError('--topics must be positive.')
+
+        posts = PostRollup.objects.filter(total__gte=max(options['min_responses'], 1))
+        if options['post']:
+            missing = set(options['post']) - set(Post.objects.filter(postid__in=options['post']).values_list('postid', flat=True))
+            if missing:
+                raise CommandError(f'Posts do not exist: {", ".join(map(str, sorted(missing)))}')
+            posts = posts.filter(postid__in=options['post'])
+        posts = list(posts.order_by('-total').values_list('postid', flat=True))
+        fitted = set(TopicFit.objects.filter(postid__in=posts).values_list('postid', flat=True))
+        to_fit = posts if options['refit'] else [postid for postid in posts if postid not in fitted]
+        to_assign = [] if options['refit'] else sorted(set(
+            Response.objects.filter(postid__in=fitted, topic_assignment__isnull=True)
+            .values_list('postid', flat=True).distinct()
+        ))
+
+        started = time.monotonic()
+        cpu_seconds = 0.0
+
+        def fit_jobs():
+            for postid in to_fit:
+                ids, messages = _responses(Response.objects.filter(postid=postid))
+                yield postid, ids, messages, options['topics'], options['seed']
+
+        for postid, terms, idf, centroids, ids, labels, cpu in topics.run(
+                topics.fit_post, fit_jobs(), workers=options['workers']):
+            store_fit(postid, terms, idf, centroids, ids, labels)
+            cpu_seconds += cpu
+            self.stdout.write(f'Post {postid}: {len(centroids)} topics from {len(ids)} responses')
+
+        def assign_jobs():
+            for postid in to_assign:
+                ids, messages = _responses(Response.objects.filter(postid=postid, topic_assignment__isnull=True))
+                yield (postid, ids, messages, *load_fit(postid))
+
+        for postid, ids, labels, cpu in topics.run(topics.assign_post, assign_jobs(), workers=options['workers']):
+            store_assignments(postid, ids, labels)
+            cpu_seconds += cpu
+            self.stdout.write(f'Post {postid}: {len(ids)} new responses assigned')
+
+        # The sentiment pages show the topics; their ETags follow the post versions
+        rollups.touch_posts(set(to_fit) | set(to_assign) | recount())
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {len(to_fit)} posts fitted, {len(to_assign)} posts extended in {elapsed:.1f}s '
+            f'({cpu_seconds:.1f} CPU seconds in workers).'
+        ))
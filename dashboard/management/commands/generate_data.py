@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import synthetic
+
+
+class Command(BaseCommand):
+    help = ('Append a reproducible synthetic dataset (clusters, posts and responses with skewed '
+            'state, age group, gender and date distributions) for benchmarking.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('responses', type=int, help='Number of responses to create, e.g. 10000 or 1000000.')
+        parser.add_argument('--posts', type=int, help='Posts to create (default: one per 2000 responses).')
+        parser.add_argument('--clusters', type=int, default=5, help='Clusters to create.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Responses per insert batch.')
+
+    def handle(self, *args, **options):
+        if options['responses'] < 1 or options['batch_size'] < 1:
+            raise CommandError('responses and --batch-size must be positive.')
+
+        started = time.monotonic()
+
+        def on_batch(written):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{written} / {options['responses']} responses ({written / elapsed:.0f} rows/s)")
+
+        stats = synthetic.generate(
+            options['responses'], posts=options['posts'], clusters=options['clusters'],
+            seed=options['seed'], batch_size=options['batch_size'], on_batch=on_batch,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['clusters']} clusters, {stats['posts']} posts and {stats['responses']} responses "
+            f"created in {time.monotonic() - started:.1f}s; rollups rebuilt."
+        ))
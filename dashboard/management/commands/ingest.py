@@ -0,0 +1,57 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import ingest
+
+
+class Command(BaseCommand):
+    help = 'Stream posts or responses from a CSV/JSONL file into the database in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(ingest.KINDS), help='What the file contains.')
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Input rows per transaction.')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint).')
+        parser.add_argument('--resume', action='store_true', help='Continue from the last saved checkpoint.')
+        parser.add_argument('--rejects', help='Write rejected rows and the reason to this CSV file.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        checkpoint = ingest.Checkpoint(options['checkpoint'] or f"{options['path']}.checkpoint")
+
+        rejects_file = rejects = None
+        if options['rejects']:
+            rejects_file = open(options['rejects'], 'a', newline='', encoding='utf-8')
+            rejects = csv.writer(rejects_file)
+
+        def on_reject(row, error):
+            if rejects is not None:
+                rejects.writerow([str(error), json.dumps(row) if isinstance(row, dict) else row.rstrip('\n')])
+
+        def on_batch(stats):
+            self.stdout.write(
+                f"{stats['rows']} rows read, {stats['inserted']} inserted, "
+                f"{stats['duplicates']} duplicates, {stats['rejected']} rejected "
+                f"({stats['rows_per_second']:.0f} rows/s)"
+            )
+
+        try:
+            stats = ingest.ingest(
+                options['path'], options['kind'], fmt=options['format'],
+                batch_size=options['batch_size'], checkpoint=checkpoint, resume=options['resume'],
+                on_batch=on_batch, on_reject=on_reject,
+            )
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['inserted']} {options['kind']} inserted, {stats['duplicates']} duplicates, "
+            f"{stats['rejected']} rejected, {stats.get('rows_per_second', 0):.0f} rows/s."
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the sentiment rollup tables from the response table, or check them with --verify.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only compare the rollups against the response table and report mismatches.',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            mismatches = rollups.verify()
+            for mismatch in mismatches:
+                self.stderr.write(mismatch)
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} rollup mismatch(es) found. Run rebuild_rollups to fix them.')
+            self.stdout.write(self.style.SUCCESS('Rollups match the response table.'))
+            return
+
+        posts = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {posts} post(s).'))
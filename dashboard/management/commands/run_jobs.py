@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from dashboard import jobs, routers
+
+
+class Command(BaseCommand):
+    help = ('Run background jobs (dashboard/jobs.py) as they are queued. Start one or more next to the '
+            'web server; SIGTERM or Ctrl-C stops a worker after its current job.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of waiting.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds between polls of an empty queue.')
+
+    def handle(self, *args, **options):
+        stopping = []
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the current job...')
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        worker = jobs.worker_name()
+        self.stdout.write(f'Worker {worker} waiting for jobs.')
+        count = 0
+        with routers.primary():
+            for job, succeeded in jobs.work(worker, once=options['once'], sleep=options['sleep'],
+                                            stop=lambda: stopping):
+                count += 1
+                job.refresh_from_db()
+                if succeeded:
+                    self.stdout.write(f'Job {job.pk} {job.task}: done')
+                else:
+                    self.stderr.write(f'Job {job.pk} {job.task}: {job.status} (attempt {job.attempts} of '
+                                      f'{job.max_attempts})\n{job.error}')
+        self.stdout.write(self.style.SUCCESS(f'Ran {count} job(s).'))
@@ -0,0 +1,199 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# In-process request metrics, exposed in the Prometheus text format at
+# /metrics/. Every server process keeps its own registry, so scrape each
+# worker (or run a single one) to see all traffic.
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 5120, 10240, 51200, 102400, 512000, 1048576, 5242880)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield f'{self.name}{_labels(self.labels, label_values)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values, value):
+        with self._lock:
+            counts, total = self._series.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        for label_values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labels, label_values)} {cumulative}'
+
+
+REQUEST_SECONDS = Histogram(
+    'dashboard_request_duration_seconds', 'Time spent handling a request.', ['view'], TIME_BUCKETS)
+SQL_QUERIES = Histogram(
+    'dashboard_sql_queries', 'SQL queries issued per request.', ['view'], QUERY_BUCKETS)
+SQL_SECONDS = Histogram(
+    'dashboard_sql_duration_seconds', 'Time spent in SQL per request.', ['view'], TIME_BUCKETS)
+CHART_SECONDS = Histogram(
+    'dashboard_chart_build_seconds', 'Time spent building chart data per request.', ['view'], TIME_BUCKETS)
+SERIALIZE_SECONDS = Histogram(
+    'dashboard_serialize_seconds', 'Time spent serializing API responses per request.', ['view'], TIME_BUCKETS)
+TEMPLATE_SECONDS = Histogram(
+    'dashboard_template_render_seconds', 'Time spent rendering templates per request.', ['view'], TIME_BUCKETS)
+RESPONSE_BYTES = Histogram(
+    'dashboard_response_size_bytes', 'Size of non-streaming response bodies.', ['view'], SIZE_BUCKETS)
+CHART_CACHE = Counter(
+    'dashboard_chart_cache_requests_total', 'Chart lookups by chart and result (hit, miss, or index when served from the date index).', ['chart', 'result'])
+
+REGISTRY = [
+    REQUEST_SECONDS, SQL_QUERIES, SQL_SECONDS, CHART_SECONDS, SERIALIZE_SECONDS,
+    TEMPLATE_SECONDS, RESPONSE_BYTES, CHART_CACHE,
+]
+
+
+def expose():
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Time and query totals of the request being handled.
+
+    Async views run parts of a request in several threads at once, so
+    updates go through a lock.
+    """
+
+    PHASES = ('sql', 'chart', 'serialize', 'template')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.chart = 0.0
+        self.serialize = 0.0
+        self.template = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, queries=0):
+        with self._lock:
+            setattr(self, phase, getattr(self, phase) + seconds)
+            self.queries += queries
+
+    def server_timing(self, total):
+        """Server-Timing header value, in milliseconds."""
+        parts = [f'{phase};dur={getattr(self, phase) * 1000:.1f}' for phase in self.PHASES]
+        parts[0] += f';desc="{self.queries} queries"'
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+# Context variables follow a request into the threads that sync_to_async
+# runs its work in, so nested timings land on the right request.
+_current = contextvars.ContextVar('dashboard_request_stats', default=None)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to `phase` of the current request, if any."""
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.add(phase, time.perf_counter() - started)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper that counts and times queries of the current request."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add('sql', time.perf_counter() - started, queries=1)
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """connection_created receiver adding sql_wrapper to every database connection."""
+    # Insert first: connection.execute_wrapper() blocks pop the last entry
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, sql_wrapper)
+
+
+def record(view, stats, total, size=None):
+    REQUEST_SECONDS.observe(view, value=total)
+    SQL_QUERIES.observe(view, value=stats.queries)
+    SQL_SECONDS.observe(view, value=stats.sql)
+    CHART_SECONDS.observe(view, value=stats.chart)
+    SERIALIZE_SECONDS.observe(view, value=stats.serialize)
+    TEMPLATE_SECONDS.observe(view, value=stats.template)
+    if size is not None:
+        RESPONSE_BYTES.observe(view, value=size)
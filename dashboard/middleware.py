@@ -0,0 +1,121 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics, roles, routers
+
+
+class MetricsMiddleware:
+    """Record per-view timings, query counts and response sizes in dashboard.metrics.
+
+    Should come first so the timings cover the other middleware. Admins also
+    get the breakdown of their own request in a Server-Timing header (shown
+    in the browser's network panel) while METRICS_SERVER_TIMING is on.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, total):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        metrics.record(view, stats, total, size)
+
+        if getattr(settings, 'METRICS_SERVER_TIMING', False) and getattr(request, 'is_admin', False):
+            response['Server-Timing'] = stats.server_timing(total)
+        return response
+
+
+class AppUserRoleMiddleware:
+    """Set `request.is_admin` from the role cached in the session.
+
+    Must come after AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request.is_admin = roles.is_admin(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.is_admin = await sync_to_async(roles.is_admin)(request)
+        return await self.get_response(request)
+
+
+class ReplicaPinMiddleware:
+    """Pin reads to the primary database where a replica might be stale.
+
+    Requests that are not GET/HEAD read from the primary, and so does any
+    request carrying the pin cookie, which is set for REPLICA_PIN_SECONDS
+    after a request writes (see dashboard/routers.py). Should come before
+    any middleware that reads dashboard tables.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with routers.scope(self.pinned(request)) as pin:
+            response = self.get_response(request)
+        return self.finish(response, pin.wrote)
+
+    async def __acall__(self, request):
+        with routers.scope(self.pinned(request)) as pin:
+            response = await self.get_response(request)
+        return self.finish(response, pin.wrote)
+
+    def pinned(self, request):
+        return request.method not in ('GET', 'HEAD') or routers.PIN_COOKIE in request.COOKIES
+
+    def finish(self, response, wrote):
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                routers.PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,67 @@
+# Generated by Django 4.2 on 2026-10-18 10:24
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    Response = apps.get_model('dashboard', 'Response')
+    PostRollup = apps.get_model('dashboard', 'PostRollup')
+    GlobalRollup = apps.get_model('dashboard', 'GlobalRollup')
+    fields = {'P': 'positive', 'N': 'negative', 'U': 'neutral'}
+
+    rollups = {}
+    totals = GlobalRollup(
+        pk=1,
+        clusters=apps.get_model('dashboard', 'Cluster').objects.count(),
+        posts=apps.get_model('dashboard', 'Post').objects.count(),
+    )
+    for row in Response.objects.values('postid', 'sentiment').annotate(count=Count('responseid')):
+        rollup = rollups.setdefault(row['postid'], PostRollup(postid_id=row['postid']))
+        for target in (rollup, totals):
+            target.total += row['count']
+            if row['sentiment'] in fields:
+                field = fields[row['sentiment']]
+                setattr(target, field, getattr(target, field) + row['count'])
+    PostRollup.objects.bulk_create(rollups.values(), batch_size=1000)
+    totals.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_alter_agegroup_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalRollup',
+            fields=[
+                ('id', models.IntegerField(default=1, primary_key=True, serialize=False)),
+                ('clusters', models.IntegerField(default=0)),
+                ('posts', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('positive', models.IntegerField(default=0)),
+                ('negative', models.IntegerField(default=0)),
+                ('neutral', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'globalrollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostRollup',
+            fields=[
+                ('postid', models.OneToOneField(db_column='postid', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='dashboard.post')),
+                ('total', models.IntegerField(default=0)),
+                ('positive', models.IntegerField(default=0)),
+                ('negative', models.IntegerField(default=0)),
+                ('neutral', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'postrollup',
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 10:26
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def populate_cube(apps, schema_editor):
+    Response = apps.get_model('dashboard', 'Response')
+    SentimentCube = apps.get_model('dashboard', 'SentimentCube')
+    dimensions = ('postid', 'responsedate', 'stateid', 'gender', 'agegroupid', 'sentiment')
+
+    rows = Response.objects.values(*dimensions).annotate(count=Count('responseid'))
+    SentimentCube.objects.bulk_create(
+        [SentimentCube(postid_id=row['postid'], responsedate=row['responsedate'], stateid=row['stateid'],
+                       gender=row['gender'], agegroupid=row['agegroupid'], sentiment=row['sentiment'],
+                       total=row['count'])
+         for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_postrollup_globalrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responsedate', models.DateField()),
+                ('stateid', models.IntegerField()),
+                ('gender', models.CharField(max_length=2)),
+                ('agegroupid', models.IntegerField()),
+                ('sentiment', models.CharField(max_length=1)),
+                ('total', models.IntegerField(default=0)),
+                ('postid', models.ForeignKey(db_column='postid', on_delete=django.db.models.deletion.CASCADE, to='dashboard.post')),
+            ],
+            options={
+                'db_table': 'sentimentcube',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sentimentcube',
+            constraint=models.UniqueConstraint(fields=('postid', 'responsedate', 'stateid', 'gender', 'agegroupid', 'sentiment'), name='sentimentcube_cell'),
+        ),
+        migrations.RunPython(populate_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_sentimentcube'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalrollup',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='postrollup',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
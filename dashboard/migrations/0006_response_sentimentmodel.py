@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_rollup_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='sentimentmodel',
+            field=models.CharField(blank=True, max_length=30, null=True),
+        ),
+        migrations.AlterField(
+            model_name='response',
+            name='sentiment',
+            field=models.CharField(blank=True, choices=[('P', 'Positive'), ('N', 'Negative'), ('U', 'Neutral')], max_length=1),
+        ),
+    ]
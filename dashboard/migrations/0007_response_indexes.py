@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_response_sentimentmodel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['postid', 'responsedate', 'responseid'], name='response_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['postid', 'gender', 'responsedate'], name='response_post_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['postid', 'agegroupid', 'responsedate'], name='response_post_agegroup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['postid', 'stateid', 'responsedate'], name='response_post_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['postid', 'sentiment', 'responsedate'], name='response_post_sentiment_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+# The inverted index behind dashboard/search.py. MySQL maintains FULLTEXT
+# indexes itself; on SQLite an external-content FTS5 table over
+# response.responsemessage is kept current by triggers. Other backends get
+# no index and search with LIKE. SQLite drops triggers with their table, so
+# a later migration that makes Django rebuild the response table there
+# must create them again.
+
+MYSQL_FORWARD = [
+    'CREATE FULLTEXT INDEX response_message_ft ON response (responsemessage)',
+]
+MYSQL_REVERSE = [
+    'DROP INDEX response_message_ft ON response',
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE response_fts USING fts5("
+    "responsemessage, content='response', content_rowid='responseid', tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO response_fts(response_fts) VALUES ('rebuild')",
+    "CREATE TRIGGER response_fts_insert AFTER INSERT ON response BEGIN "
+    "INSERT INTO response_fts(rowid, responsemessage) VALUES (new.responseid, new.responsemessage); END",
+    "CREATE TRIGGER response_fts_delete AFTER DELETE ON response BEGIN "
+    "INSERT INTO response_fts(response_fts, rowid, responsemessage) "
+    "VALUES ('delete', old.responseid, old.responsemessage); END",
+    "CREATE TRIGGER response_fts_update AFTER UPDATE OF responseid, responsemessage ON response BEGIN "
+    "INSERT INTO response_fts(response_fts, rowid, responsemessage) "
+    "VALUES ('delete', old.responseid, old.responsemessage); "
+    "INSERT INTO response_fts(rowid, responsemessage) VALUES (new.responseid, new.responsemessage); END",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER response_fts_update',
+    'DROP TRIGGER response_fts_delete',
+    'DROP TRIGGER response_fts_insert',
+    'DROP TABLE response_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql, params=None)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_response_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'mysql': MYSQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'mysql': MYSQL_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
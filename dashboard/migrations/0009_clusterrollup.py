@@ -0,0 +1,101 @@
+# Generated by Django 4.2 on 2026-10-18 11:12
+
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def populate_cluster_rollups(apps, schema_editor):
+    Post = apps.get_model('dashboard', 'Post')
+    PostRollup = apps.get_model('dashboard', 'PostRollup')
+    ClusterRollup = apps.get_model('dashboard', 'ClusterRollup')
+    ClusterDaily = apps.get_model('dashboard', 'ClusterDaily')
+    SentimentCube = apps.get_model('dashboard', 'SentimentCube')
+    fields = {'P': 'positive', 'N': 'negative', 'U': 'neutral'}
+    counts = ('total', 'positive', 'negative', 'neutral')
+
+    # File every post's rollup under its cluster, creating the rollups of
+    # posts that have no responses yet
+    post_clusters = dict(Post.objects.values_list('postid', 'clusterid'))
+    filed = []
+    for rollup in PostRollup.objects.all():
+        rollup.clusterid_id = post_clusters.get(rollup.postid_id)
+        filed.append(rollup)
+    PostRollup.objects.bulk_update(filed, ['clusterid'], batch_size=1000)
+    existing = {rollup.postid_id for rollup in filed}
+    PostRollup.objects.bulk_create(
+        [PostRollup(postid_id=postid, clusterid_id=clusterid)
+         for postid, clusterid in post_clusters.items() if postid not in existing],
+        batch_size=1000,
+    )
+
+    clusters = {
+        clusterid: ClusterRollup(clusterid_id=clusterid)
+        for clusterid in apps.get_model('dashboard', 'Cluster').objects.values_list('clusterid', flat=True)
+    }
+    for rollup in PostRollup.objects.all():
+        cluster = clusters[rollup.clusterid_id]
+        cluster.posts += 1
+        for field in counts:
+            setattr(cluster, field, getattr(cluster, field) + getattr(rollup, field))
+    ClusterRollup.objects.bulk_create(clusters.values(), batch_size=1000)
+
+    days = {}
+    rows = SentimentCube.objects.values('postid', 'responsedate', 'sentiment').annotate(count=Sum('total'))
+    for row in rows:
+        key = (post_clusters[row['postid']], row['responsedate'])
+        day = days.setdefault(key, ClusterDaily(clusterid_id=key[0], responsedate=key[1]))
+        day.total += row['count']
+        if row['sentiment'] in fields:
+            field = fields[row['sentiment']]
+            setattr(day, field, getattr(day, field) + row['count'])
+    ClusterDaily.objects.bulk_create(days.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_response_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterRollup',
+            fields=[
+                ('clusterid', models.OneToOneField(db_column='clusterid', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='dashboard.cluster')),
+                ('posts', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('positive', models.IntegerField(default=0)),
+                ('negative', models.IntegerField(default=0)),
+                ('neutral', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'clusterrollup',
+            },
+        ),
+        migrations.AddField(
+            model_name='postrollup',
+            name='clusterid',
+            field=models.ForeignKey(db_column='clusterid', null=True, on_delete=django.db.models.deletion.CASCADE, to='dashboard.cluster'),
+        ),
+        migrations.CreateModel(
+            name='ClusterDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responsedate', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('positive', models.IntegerField(default=0)),
+                ('negative', models.IntegerField(default=0)),
+                ('neutral', models.IntegerField(default=0)),
+                ('clusterid', models.ForeignKey(db_column='clusterid', on_delete=django.db.models.deletion.CASCADE, to='dashboard.cluster')),
+            ],
+            options={
+                'db_table': 'clusterdaily',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clusterdaily',
+            constraint=models.UniqueConstraint(fields=('clusterid', 'responsedate'), name='clusterdaily_day'),
+        ),
+        migrations.RunPython(populate_cluster_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_clusterrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicFit',
+            fields=[
+                ('postid', models.OneToOneField(db_column='postid', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='topic_fit', serialize=False, to='dashboard.post')),
+                ('vocabulary', models.TextField()),
+                ('idf', models.BinaryField()),
+                ('responses', models.IntegerField(default=0)),
+                ('fitted_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'topicfit',
+            },
+        ),
+        migrations.CreateModel(
+            name='Topic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.SmallIntegerField()),
+                ('terms', models.CharField(max_length=200)),
+                ('centroid', models.BinaryField()),
+                ('total', models.IntegerField(default=0)),
+                ('positive', models.IntegerField(default=0)),
+                ('negative', models.IntegerField(default=0)),
+                ('neutral', models.IntegerField(default=0)),
+                ('postid', models.ForeignKey(db_column='postid', on_delete=django.db.models.deletion.CASCADE, to='dashboard.post')),
+            ],
+            options={
+                'db_table': 'topic',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResponseTopic',
+            fields=[
+                ('responseid', models.OneToOneField(db_column='responseid', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='topic_assignment', serialize=False, to='dashboard.response')),
+                ('topic', models.ForeignKey(db_column='topicid', null=True, on_delete=django.db.models.deletion.CASCADE, to='dashboard.topic')),
+            ],
+            options={
+                'db_table': 'responsetopic',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='topic',
+            constraint=models.UniqueConstraint(fields=('postid', 'number'), name='topic_post_number'),
+        ),
+    ]
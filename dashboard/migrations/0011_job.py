@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_topics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=50)),
+                ('arguments', models.JSONField(default=dict)),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.SmallIntegerField(default=0)),
+                ('max_attempts', models.SmallIntegerField(default=3)),
+                ('run_after', models.DateTimeField()),
+                ('progress_done', models.IntegerField(default=0)),
+                ('progress_total', models.IntegerField(default=0)),
+                ('progress_message', models.CharField(blank=True, max_length=200)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'job',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'priority', 'run_after'], name='job_claim_idx'),
+        ),
+    ]
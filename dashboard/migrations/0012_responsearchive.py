@@ -0,0 +1,68 @@
+# Generated by Django 4.2 on 2026-10-18 11:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Archived months are rarely read and never updated, so on MySQL the
+# archive is stored compressed.
+
+MYSQL_FORWARD = [
+    'ALTER TABLE responsearchive ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8',
+]
+MYSQL_REVERSE = [
+    'ALTER TABLE responsearchive ROW_FORMAT=DYNAMIC KEY_BLOCK_SIZE=0',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMonth',
+            fields=[
+                ('month', models.DateField(primary_key=True, serialize=False)),
+                ('responses', models.IntegerField(default=0)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'archivedmonth',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResponseArchive',
+            fields=[
+                ('responseid', models.IntegerField(primary_key=True, serialize=False)),
+                ('responsedate', models.DateField()),
+                ('responsemessage', models.CharField(max_length=1024)),
+                ('username', models.CharField(max_length=50)),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Others'), ('N', 'Not Disclosed')], default='NA', max_length=2)),
+                ('sentiment', models.CharField(blank=True, choices=[('P', 'Positive'), ('N', 'Negative'), ('U', 'Neutral')], max_length=1)),
+                ('sentimentmodel', models.CharField(blank=True, max_length=30, null=True)),
+                ('topicid', models.IntegerField(blank=True, null=True)),
+                ('agegroupid', models.ForeignKey(db_column='agegroupid', db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to='dashboard.agegroup')),
+                ('postid', models.ForeignKey(db_column='postid', db_index=False, on_delete=django.db.models.deletion.CASCADE, to='dashboard.post')),
+                ('stateid', models.ForeignKey(db_column='stateid', db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to='dashboard.state')),
+            ],
+            options={
+                'db_table': 'responsearchive',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='responsearchive',
+            index=models.Index(fields=['postid', 'responsedate', 'responseid'], name='responsearchive_post_date_idx'),
+        ),
+        migrations.RunPython(_run({'mysql': MYSQL_FORWARD}), _run({'mysql': MYSQL_REVERSE})),
+    ]
@@ -88,10 +88,273 @@ class Response(models.Model):
     agegroupid = models.ForeignKey(AgeGroup, on_delete=models.CASCADE, db_column='agegroupid')
     gender = models.CharField(max_length=2, choices=GENDER_CHOICES, default='NA')
     stateid = models.ForeignKey(State, on_delete=models.CASCADE, db_column='stateid')
-    sentiment = models.CharField(max_length=1, choices=SENTIMENT_CHOICES)
+    # Blank until labelled. Rows labelled by dashboard/classifier.py record
+    # the model version in sentimentmodel; manual labels leave it NULL.
+    sentiment = models.CharField(max_length=1, choices=SENTIMENT_CHOICES, blank=True)
+    sentimentmodel = models.CharField(max_length=30, null=True, blank=True)
 
     class Meta:
         db_table = 'response'
+        # One index per analytics access path: the post, the filtered column,
+        # then the date so the newest-first listing is read in index order.
+        # `manage.py check_query_plans` fails if a view stops using them.
+        indexes = [
+            models.Index(fields=['postid', 'responsedate', 'responseid'], name='response_post_date_idx'),
+            models.Index(fields=['postid', 'gender', 'responsedate'], name='response_post_gender_idx'),
+            models.Index(fields=['postid', 'agegroupid', 'responsedate'], name='response_post_agegroup_idx'),
+            models.Index(fields=['postid', 'stateid', 'responsedate'], name='response_post_state_idx'),
+            models.Index(fields=['postid', 'sentiment', 'responsedate'], name='response_post_sentiment_idx'),
+        ]
 
     def __str__(self):
-        return f"Response {self.responseid} - {self.sentiment}"
\ No newline at end of file
+        return f"Response {self.responseid} - {self.sentiment}"
+
+
+class ResponseArchive(models.Model):
+    # Responses of months moved out of `response` by `manage.py
+    # archive_responses` (see dashboard/archive.py). Same columns, but only
+    # the one index the responses list and export read by, no full-text
+    # index and no foreign key constraints to the lookup tables; the rollups
+    # and cube keep counting these rows.
+    responseid = models.IntegerField(primary_key=True)
+    postid = models.ForeignKey(Post, on_delete=models.CASCADE, db_column='postid', db_index=False)
+    responsedate = models.DateField()
+    responsemessage = models.CharField(max_length=1024)
+    username = models.CharField(max_length=50)
+    agegroupid = models.ForeignKey(AgeGroup, on_delete=models.DO_NOTHING, db_column='agegroupid',
+                                   db_constraint=False, db_index=False)
+    gender = models.CharField(max_length=2, choices=Response.GENDER_CHOICES, default='NA')
+    stateid = models.ForeignKey(State, on_delete=models.DO_NOTHING, db_column='stateid',
+                                db_constraint=False, db_index=False)
+    sentiment = models.CharField(max_length=1, choices=Response.SENTIMENT_CHOICES, blank=True)
+    sentimentmodel = models.CharField(max_length=30, null=True, blank=True)
+    # The Topic the response was assigned to when archived; cleared when
+    # the post's topics are refitted
+    topicid = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'responsearchive'
+        indexes = [
+            models.Index(fields=['postid', 'responsedate', 'responseid'], name='responsearchive_post_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived response {self.responseid} - {self.sentiment}"
+
+
+class ArchivedMonth(models.Model):
+    # A month whose responses are in ResponseArchive. Responses dated before
+    # the month after the latest one are read from the archive only.
+    month = models.DateField(primary_key=True)  # first day of the month
+    responses = models.IntegerField(default=0)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'archivedmonth'
+
+    def __str__(self):
+        return f"Archived {self.month:%Y-%m} - {self.responses} responses"
+
+
+class PostRollup(models.Model):
+    # Per-post sentiment counts, kept current by the signal handlers in
+    # dashboard/signals.py and reconciled by `manage.py rebuild_rollups`.
+    postid = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True,
+                                  db_column='postid', related_name='rollup')
+    total = models.IntegerField(default=0)
+    positive = models.IntegerField(default=0)
+    negative = models.IntegerField(default=0)
+    neutral = models.IntegerField(default=0)
+    # Bumped on every change to the post or its responses; used to key caches
+    version = models.IntegerField(default=0)
+    # The cluster these counts are included in. Normally the post's cluster;
+    # read under this row's lock so a concurrent move cannot file a write
+    # under the old one (see rollups.move_post). NULL until filed.
+    clusterid = models.ForeignKey(Cluster, on_delete=models.CASCADE, null=True, db_column='clusterid')
+
+    class Meta:
+        db_table = 'postrollup'
+
+    def __str__(self):
+        return f"Rollup for post {self.postid_id} - {self.total} responses"
+
+
+class GlobalRollup(models.Model):
+    # Single row (id=1) holding the dashboard-wide totals.
+    id = models.IntegerField(primary_key=True, default=1)
+    clusters = models.IntegerField(default=0)
+    posts = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    positive = models.IntegerField(default=0)
+    negative = models.IntegerField(default=0)
+    neutral = models.IntegerField(default=0)
+    # Bumped on every Response/Post/Cluster write
+    version = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'globalrollup'
+
+    def __str__(self):
+        return f"Global rollup - {self.total} responses"
+
+
+class ClusterRollup(models.Model):
+    # Per-cluster totals: the sum of the cluster's post rollups, maintained
+    # alongside them by dashboard/rollups.py.
+    clusterid = models.OneToOneField(Cluster, on_delete=models.CASCADE, primary_key=True,
+                                     db_column='clusterid', related_name='rollup')
+    posts = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    positive = models.IntegerField(default=0)
+    negative = models.IntegerField(default=0)
+    neutral = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'clusterrollup'
+
+    def __str__(self):
+        return f"Rollup for cluster {self.clusterid_id} - {self.total} responses"
+
+
+class ClusterDaily(models.Model):
+    # Responses per cluster and day, the sum of the cube cells of the
+    # cluster's posts; the cluster trend charts are drawn from it.
+    clusterid = models.ForeignKey(Cluster, on_delete=models.CASCADE, db_column='clusterid')
+    responsedate = models.DateField()
+    total = models.IntegerField(default=0)
+    positive = models.IntegerField(default=0)
+    negative = models.IntegerField(default=0)
+    neutral = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'clusterdaily'
+        constraints = [
+            models.UniqueConstraint(fields=['clusterid', 'responsedate'], name='clusterdaily_day'),
+        ]
+
+    def __str__(self):
+        return f"Cluster {self.clusterid_id} on {self.responsedate} - {self.total}"
+
+
+class SentimentCube(models.Model):
+    # Response counts keyed by every dimension the analytics views filter or
+    # group on. Dimension names match `Response` so the same filters apply
+    # to both; see dashboard/cube.py for the query side.
+    postid = models.ForeignKey(Post, on_delete=models.CASCADE, db_column='postid')
+    responsedate = models.DateField()
+    stateid = models.IntegerField()
+    gender = models.CharField(max_length=2)
+    agegroupid = models.IntegerField()
+    sentiment = models.CharField(max_length=1)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'sentimentcube'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['postid', 'responsedate', 'stateid', 'gender', 'agegroupid', 'sentiment'],
+                name='sentimentcube_cell',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Cube cell post {self.postid_id} {self.responsedate} - {self.total}"
+
+
+class TopicFit(models.Model):
+    # The TF-IDF vocabulary of a post's topics, kept so responses added
+    # later can be assigned to them without refitting (dashboard/topics.py).
+    postid = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True,
+                                  db_column='postid', related_name='topic_fit')
+    vocabulary = models.TextField()  # one term per line
+    idf = models.BinaryField()  # float32 per term
+    responses = models.IntegerField(default=0)  # responses the topics were fitted on
+    fitted_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'topicfit'
+
+    def __str__(self):
+        return f"Topic fit for post {self.postid_id} - {self.responses} responses"
+
+
+class Topic(models.Model):
+    postid = models.ForeignKey(Post, on_delete=models.CASCADE, db_column='postid')
+    number = models.SmallIntegerField()  # 1 is the largest topic of the post
+    terms = models.CharField(max_length=200)  # top terms, space separated
+    centroid = models.BinaryField()  # float32 weight per vocabulary term
+    # Responses assigned to the topic and their sentiment labels, as of the
+    # last extract_topics run
+    total = models.IntegerField(default=0)
+    positive = models.IntegerField(default=0)
+    negative = models.IntegerField(default=0)
+    neutral = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'topic'
+        constraints = [
+            models.UniqueConstraint(fields=['postid', 'number'], name='topic_post_number'),
+        ]
+
+    def __str__(self):
+        return f"Topic {self.number} of post {self.postid_id} - {self.terms}"
+
+
+class ResponseTopic(models.Model):
+    # A response seen by extract_topics; topic is NULL if none of its words
+    # are in the post's vocabulary.
+    responseid = models.OneToOneField(Response, on_delete=models.CASCADE, primary_key=True,
+                                      db_column='responseid', related_name='topic_assignment')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, null=True, db_column='topicid')
+
+    class Meta:
+        db_table = 'responsetopic'
+
+    def __str__(self):
+        return f"Response {self.responseid_id} - topic {self.topic_id}"
+
+
+class Job(models.Model):
+    # A unit of background work, run by `manage.py run_jobs` (see
+    # dashboard/jobs.py for the task registry and the claiming protocol).
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=50)
+    arguments = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)  # higher runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.SmallIntegerField(default=0)
+    max_attempts = models.SmallIntegerField(default=3)
+    run_after = models.DateTimeField()  # not claimed before; pushed back between retries
+    # Reported by the task while it runs; `total` is 0 until it knows
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)  # traceback of the last failed attempt
+    username = models.CharField(max_length=150, blank=True)  # who enqueued it, if a user did
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker as the task reports progress; a running job
+    # whose heartbeat is older than JOB_STALE_SECONDS is retried
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'job'
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} {self.task} - {self.status}"
@@ -0,0 +1,135 @@
+import math
+
+from django.core import signing
+from django.db.models import Q
+
+
+CURSOR_SALT = 'dashboard.pagination'
+
+
+def encode_cursor(position):
+    return signing.dumps(position, salt=CURSOR_SALT)
+
+
+def decode_cursor(token):
+    """Return the position stored in a cursor token; a missing or tampered token means the first page."""
+    if not token:
+        return {}
+    try:
+        return signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return {}
+
+
+def _key(response):
+    return [response.responsedate.isoformat(), response.responseid]
+
+
+class KeysetPage:
+    """One page of responses, newest first, with cursors to its neighbours.
+
+    Mirrors the parts of django.core.paginator.Page the templates use, but
+    pages are reached by seeking past the (responsedate, responseid) of the
+    previous page's edge instead of with OFFSET, so every page costs the
+    same. `total` is supplied by the caller rather than counted here.
+    """
+
+    def __init__(self, object_list, start_index, per_page, total, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.start_index = start_index
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def number(self):
+        return (self.start_index - 1) // self.per_page + 1
+
+    @property
+    def num_pages(self):
+        return max(math.ceil(self.total / self.per_page), 1)
+
+    @property
+    def last_cursor(self):
+        return encode_cursor({'last': True})
+
+
+def _rows(querysets, count, newest_first):
+    """The first `count` rows of `querysets`, each in the order given, merged into that order."""
+    rows = []
+    for queryset in querysets:
+        rows += queryset[:count]
+    if len(querysets) > 1:
+        rows.sort(key=lambda response: (response.responsedate, response.responseid), reverse=newest_first)
+    return rows[:count]
+
+
+def paginate(querysets, cursor, per_page, total):
+    """Return the KeysetPage of `querysets` (already filtered) at `cursor`.
+
+    `querysets` are read as one list, merged by (responsedate,
+    responseid) (see archive.segments). `total` is the number of rows they
+    match; it only feeds the "page N of M" display and the size of the
+    last page.
+    """
+    position = decode_cursor(cursor)
+    newest_first = [queryset.order_by('-responsedate', '-responseid') for queryset in querysets]
+    oldest_first = [queryset.order_by('responsedate', 'responseid') for queryset in querysets]
+
+    # The redundant responsedate bound lets the seek use the (postid, ...,
+    # responsedate) indexes as a range instead of filtering row by row.
+    if 'after' in position:
+        date, pk = position['after']
+        rows = _rows(
+            [queryset.filter(Q(responsedate__lt=date) | Q(responseid__lt=pk), responsedate__lte=date)
+             for queryset in newest_first],
+            per_page + 1, newest_first=True,
+        )
+        has_next, has_previous = len(rows) > per_page, True
+        rows = rows[:per_page]
+        start = position['start']
+    elif 'before' in position:
+        date, pk = position['before']
+        rows = _rows(
+            [queryset.filter(Q(responsedate__gt=date) | Q(responseid__gt=pk), responsedate__gte=date)
+             for queryset in oldest_first],
+            per_page + 1, newest_first=False,
+        )
+        has_next, has_previous = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        start = position['start']
+    elif position.get('last'):
+        size = total % per_page or per_page
+        rows = _rows(oldest_first, size + 1, newest_first=False)
+        has_next, has_previous = False, len(rows) > size
+        rows = rows[:size][::-1]
+        start = total - len(rows) + 1
+    else:
+        rows = _rows(newest_first, per_page + 1, newest_first=True)
+        has_next, has_previous = len(rows) > per_page, False
+        rows = rows[:per_page]
+        start = 1
+
+    # Rows added or removed since the cursor was issued can shift positions
+    start = max(start, 1) if has_previous else 1
+    page = KeysetPage(rows, start, per_page, total)
+    if rows and has_next:
+        page.next_cursor = encode_cursor({'after': _key(rows[-1]), 'start': start + len(rows)})
+    if rows and has_previous:
+        page.previous_cursor = encode_cursor({'before': _key(rows[0]), 'start': max(start - per_page, 1)})
+    return page
@@ -0,0 +1,104 @@
+import re
+
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from . import benchmark
+
+
+# Tables that grow with the number of responses. Scanning the small lookup
+# tables (clusters, posts, states, age groups) is expected and not reported.
+LARGE_TABLES = {'response', 'responsearchive', 'sentimentcube'}
+
+
+def analyze():
+    """Give the planner statistics that match the data."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE response, responsearchive, sentimentcube')
+        else:
+            cursor.execute('ANALYZE')
+
+
+def explain(sql):
+    """Return the plan of a captured query as a list of steps."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}')
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    raise NotImplementedError(f'EXPLAIN is not supported for {connection.vendor}')
+
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+LARGE_TABLE_RE = re.compile(r'\b(?:FROM|JOIN) [`"]?(?:%s)[`"]?' % '|'.join(LARGE_TABLES))
+
+
+def _uses_fulltext(plan):
+    for step in plan:
+        if isinstance(step, str):
+            if 'VIRTUAL TABLE' in step:
+                return True
+        elif step.get('type') == 'fulltext':
+            return True
+    return False
+
+
+def plan_problems(sql, plan):
+    """Full scans of the large tables and sorts of their rows that do not use an index.
+
+    Searches read the matching rows from the full-text index, which has no
+    useful order, so sorting them is expected.
+    """
+    if not LARGE_TABLE_RE.search(sql):
+        return []
+    searching = _uses_fulltext(plan)
+    problems = []
+    for step in plan:
+        if isinstance(step, str):
+            scan = SQLITE_SCAN_RE.match(step)
+            if scan and scan.group(1) in LARGE_TABLES:
+                problems.append(f'full scan: {step}')
+            if 'TEMP B-TREE FOR' in step and 'ORDER BY' in step and not searching:
+                problems.append(f'filesort: {step}')
+        else:
+            table = step.get('table')
+            extra = step.get('Extra') or ''
+            if table in LARGE_TABLES and step.get('type') in ('ALL', 'index'):
+                problems.append(f'full scan of {table} (type={step["type"]})')
+            if 'Using filesort' in extra and not searching:
+                problems.append(f'filesort on {table}: {extra}')
+    return problems
+
+
+def check(post_id):
+    """Issue every request in benchmark.REQUESTS and EXPLAIN the SELECTs it runs.
+
+    Returns a list of (name, queries, problems) where queries is a list of
+    (sql, plan) pairs.
+    """
+    client = benchmark.analytics_client()
+    results = []
+    for name, url, headers in benchmark.requests_for(post_id):
+        # Charts are cached; start cold so every query is issued
+        caches['charts'].clear()
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'{name}: {url} returned {response.status_code}')
+
+        queries, problems = [], []
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(sql)
+            queries.append((sql, plan))
+            problems.extend(f'{problem}\n    {sql}' for problem in plan_problems(sql, plan))
+        results.append((name, queries, problems))
+    return results
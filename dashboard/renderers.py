@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its time as the request's serialize time."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.timed('serialize'):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,80 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Tags, Warning, register
+
+from .models import AppUser
+
+
+ADMIN_USERTYPE = 1
+
+SESSION_KEY = '_appuser_role'
+
+# Role epochs expire after this long, so sessions look their role up again
+# at least this often. Edits made through the ORM invalidate the epoch at
+# once (see dashboard/signals.py); edits made directly in SQL bypass that
+# and take effect within this time, or right away after invalidate().
+EPOCH_SECONDS = 600
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _epoch_key(username):
+    return f'dashboard:role-epoch:{username}'
+
+
+def _epoch(username):
+    # The epoch changes whenever the user's AppUser row does; a session
+    # holding a role from another epoch looks the role up again. If the
+    # cache loses the key a fresh epoch is issued, which also forces a lookup.
+    # The epochs must live in a cache shared by every worker process.
+    return cache.get_or_set(_epoch_key(username), lambda: uuid.uuid4().hex, EPOCH_SECONDS)
+
+
+def invalidate(username):
+    cache.delete(_epoch_key(username))
+
+
+def remember(request, usertype):
+    """Store the user's role in their session, e.g. right after login."""
+    request.session[SESSION_KEY] = {
+        'usertype': usertype,
+        'epoch': _epoch(request.user.username),
+    }
+
+
+def usertype(request):
+    """Return the AppUser.usertype of the logged-in user, or None.
+
+    Served from the session; AppUser is only queried after the role changed.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    role = request.session.get(SESSION_KEY)
+    if role is None or role['epoch'] != _epoch(user.username):
+        value = AppUser.objects.filter(username=user.username).values_list('usertype', flat=True).first()
+        remember(request, value)
+        return value
+    return role['usertype']
+
+
+def is_admin(request):
+    return usertype(request) == ADMIN_USERTYPE
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # Role invalidations and cached users only reach the process that made them
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            'The default cache is local to each process, so role changes made in one worker are not '
+            'seen by the others.',
+            hint='Set REDIS_URL (or another shared cache backend) when running more than one worker.',
+            id='dashboard.W001',
+        )]
+    return []
@@ -0,0 +1,443 @@
+from collections import Counter, defaultdict
+from datetime import date
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import dateindex
+from .cube import DIMENSIONS
+from .models import (
+    Cluster, Post, Response, ResponseArchive, PostRollup, GlobalRollup, ClusterRollup, ClusterDaily, SentimentCube,
+)
+
+
+SENTIMENT_FIELDS = {'P': 'positive', 'N': 'negative', 'U': 'neutral'}
+COUNT_FIELDS = ('total', 'positive', 'negative', 'neutral')
+
+# Writers lock rollup rows in this order to avoid deadlocking each other:
+# post rollups, the global rollup, cluster rollups (by id), cluster days,
+# then cube cells.
+#
+# Archived responses (dashboard/archive.py) stay counted: moving them is
+# not a write to the rollups, and the computations below read both tables.
+
+# Above this many touched cube cells, record_responses switches from one
+# UPDATE per cell to set-based bulk queries.
+BULK_CELL_THRESHOLD = 50
+
+
+def _counts_for(sentiment, sign=1):
+    counts = Counter({'total': sign})
+    field = SENTIMENT_FIELDS.get(sentiment)
+    if field:
+        counts[field] += sign
+    return counts
+
+
+def _apply(queryset, counts):
+    changes = {field: F(field) + n for field, n in counts.items() if n}
+    if not changes:
+        return True
+    return queryset.update(**changes) > 0
+
+
+def _cell_key(row):
+    responsedate = row.responsedate
+    if isinstance(responsedate, str):
+        responsedate = date.fromisoformat(responsedate)
+    return (row.postid_id, responsedate, row.stateid_id, row.gender, row.agegroupid_id, row.sentiment)
+
+
+def _cell_lookup(key):
+    lookup = dict(zip(DIMENSIONS, key))
+    lookup['postid_id'] = lookup.pop('postid')
+    return lookup
+
+
+def record_responses(rows, sign=1):
+    """Add (sign=1) or remove (sign=-1) responses from the rollup tables.
+
+    `rows` only needs the `Response` dimension attributes (postid_id,
+    responsedate, stateid_id, gender, agegroupid_id, sentiment), so callers
+    can pass model instances or copies of rows that no longer exist.
+    """
+    per_post = defaultdict(Counter)
+    per_cell = Counter()
+    for row in rows:
+        per_post[row.postid_id].update(_counts_for(row.sentiment, sign))
+        per_cell[_cell_key(row)] += sign
+    if not per_post:
+        return
+
+    overall = Counter()
+    with transaction.atomic():
+        for postid, counts in per_post.items():
+            adjust_post(postid, counts)
+            overall.update(counts)
+        adjust_global(overall)
+
+        # The clusters the posts are filed under and the versions this write
+        # bumped them to, read under its row locks
+        versions, clusters = {}, {}
+        for postid, clusterid, version in PostRollup.objects.filter(
+                postid__in=list(per_post)).values_list('postid', 'clusterid', 'version'):
+            versions[postid], clusters[postid] = version, clusterid
+
+        per_cluster = defaultdict(Counter)
+        for postid, counts in per_post.items():
+            if clusters.get(postid) is not None:
+                per_cluster[clusters[postid]].update(counts)
+        for clusterid in sorted(per_cluster):
+            adjust_cluster(clusterid, per_cluster[clusterid])
+        per_day = defaultdict(Counter)
+        for key, n in per_cell.items():
+            if clusters.get(key[0]) is not None:
+                per_day[clusters[key[0]], key[1]].update(_counts_for(key[5], n))
+        adjust_cluster_days(per_day)
+
+        if dateindex.tracks(per_post):
+            transaction.on_commit(partial(dateindex.record, dict(per_cell), versions))
+
+        if len(per_cell) > BULK_CELL_THRESHOLD:
+            _apply_cells_in_bulk(per_cell)
+            return
+        for key, n in per_cell.items():
+            lookup = _cell_lookup(key)
+            cell = SentimentCube.objects.filter(**lookup)
+            if not _apply(cell, {'total': n}):
+                SentimentCube.objects.get_or_create(**lookup)
+                _apply(cell, {'total': n})
+
+
+def _apply_cells_in_bulk(per_cell):
+    """Apply many cube deltas with a few set-based queries (bulk ingestion).
+
+    Existing cells in the affected posts and date span are locked, updated
+    in Python and written back with bulk_update; missing cells are
+    bulk-created. Must run inside a transaction.
+    """
+    posts = {key[0] for key in per_cell}
+    dates = [key[1] for key in per_cell]
+    existing = SentimentCube.objects.select_for_update().filter(
+        postid__in=posts, responsedate__gte=min(dates), responsedate__lte=max(dates),
+    )
+    changed = []
+    for cell in existing:
+        key = (cell.postid_id, cell.responsedate, cell.stateid, cell.gender, cell.agegroupid, cell.sentiment)
+        n = per_cell.pop(key, 0)
+        if n:
+            cell.total += n
+            changed.append(cell)
+    SentimentCube.objects.bulk_update(changed, ['total'], batch_size=1000)
+    SentimentCube.objects.bulk_create(
+        [SentimentCube(total=n, **_cell_lookup(key)) for key, n in per_cell.items() if n],
+        batch_size=1000,
+    )
+
+
+def adjust_post(postid, counts):
+    """Apply count deltas to a post's rollup and bump its version."""
+    counts = Counter(counts, version=1)
+    rollup = PostRollup.objects.filter(postid=postid)
+    if not _apply(rollup, counts):
+        PostRollup.objects.get_or_create(postid_id=postid)
+        _apply(rollup, counts)
+
+
+def touch_posts(postids):
+    """Bump the versions of posts whose derived data (e.g. topics) changed without a write to them."""
+    with transaction.atomic():
+        for postid in sorted(postids):
+            adjust_post(postid, Counter())
+
+
+def adjust_global(counts):
+    """Apply count deltas to the global rollup and bump its version."""
+    counts = Counter(counts, version=1)
+    if not _apply(GlobalRollup.objects.filter(pk=1), counts):
+        # No global row yet: computing it from scratch already includes
+        # the change being recorded.
+        rebuild_global()
+
+
+def adjust_cluster(clusterid, counts):
+    """Apply count deltas (including `posts`) to a cluster's rollup."""
+    rollup = ClusterRollup.objects.filter(clusterid=clusterid)
+    if not _apply(rollup, counts):
+        ClusterRollup.objects.get_or_create(clusterid_id=clusterid)
+        _apply(rollup, counts)
+
+
+def adjust_cluster_days(per_day):
+    """Apply count deltas to cluster days; `per_day` maps (clusterid, date) to counts."""
+    if len(per_day) > BULK_CELL_THRESHOLD:
+        _apply_days_in_bulk(per_day)
+        return
+    for (clusterid, responsedate), counts in sorted(per_day.items()):
+        day = ClusterDaily.objects.filter(clusterid=clusterid, responsedate=responsedate)
+        if not _apply(day, counts):
+            ClusterDaily.objects.get_or_create(clusterid_id=clusterid, responsedate=responsedate)
+            _apply(day, counts)
+
+
+def _apply_days_in_bulk(per_day):
+    # As _apply_cells_in_bulk, for cluster days
+    per_day = dict(per_day)
+    dates = [responsedate for clusterid, responsedate in per_day]
+    existing = ClusterDaily.objects.select_for_update().filter(
+        clusterid__in={clusterid for clusterid, responsedate in per_day},
+        responsedate__gte=min(dates), responsedate__lte=max(dates),
+    ).order_by('clusterid', 'responsedate')
+    changed = []
+    for day in existing:
+        counts = per_day.pop((day.clusterid_id, day.responsedate), None)
+        if counts:
+            for field, n in counts.items():
+                setattr(day, field, getattr(day, field) + n)
+            changed.append(day)
+    ClusterDaily.objects.bulk_update(changed, COUNT_FIELDS, batch_size=1000)
+    ClusterDaily.objects.bulk_create(
+        [ClusterDaily(clusterid_id=clusterid, responsedate=responsedate, **{f: counts[f] for f in COUNT_FIELDS})
+         for (clusterid, responsedate), counts in per_day.items() if any(counts.values())],
+        batch_size=1000,
+    )
+
+
+def post_days(postid):
+    """Counts of a post's responses per day, from its cube cells.
+
+    The cells are read with a locking read, so inside a transaction that
+    holds the post's rollup the result includes every committed write.
+    """
+    days = defaultdict(Counter)
+    cells = SentimentCube.objects.select_for_update().filter(postid=postid).values_list(
+        'responsedate', 'sentiment', 'total')
+    for responsedate, sentiment, total in cells:
+        days[responsedate].update(_counts_for(sentiment, total))
+    return days
+
+
+def add_posts(posts):
+    """Create the rollups of new posts, filed under their clusters."""
+    with transaction.atomic():
+        PostRollup.objects.bulk_create(
+            [PostRollup(postid_id=post.pk, clusterid_id=post.clusterid_id) for post in posts],
+            batch_size=1000,
+        )
+        adjust_global(Counter(posts=len(posts)))
+        per_cluster = Counter(post.clusterid_id for post in posts)
+        for clusterid in sorted(per_cluster):
+            adjust_cluster(clusterid, Counter(posts=per_cluster[clusterid]))
+
+
+def move_post(postid, clusterid):
+    """File a post's counts under `clusterid` if they are filed elsewhere.
+
+    Call after adjust_post (and adjust_global) in the same transaction, so
+    the post's rollup is locked: responses written meanwhile wait for the
+    move and are then counted in the new cluster.
+    """
+    with transaction.atomic():
+        rollup = PostRollup.objects.select_for_update().filter(postid=postid).first()
+        if rollup is None or rollup.clusterid_id == clusterid:
+            return
+        counts = Counter({field: getattr(rollup, field) for field in COUNT_FIELDS})
+        days = post_days(postid)
+        per_cluster = {clusterid: Counter(counts, posts=1)}
+        per_day = {(clusterid, responsedate): day for responsedate, day in days.items()}
+        if rollup.clusterid_id is not None:
+            per_cluster[rollup.clusterid_id] = Counter({field: -n for field, n in counts.items()}, posts=-1)
+            per_day.update({
+                (rollup.clusterid_id, responsedate): Counter({field: -n for field, n in day.items()})
+                for responsedate, day in days.items()
+            })
+        for moved in sorted(per_cluster):
+            adjust_cluster(moved, per_cluster[moved])
+        adjust_cluster_days(per_day)
+        PostRollup.objects.filter(postid=postid).update(clusterid=clusterid)
+
+
+def remove_post(rollup, days):
+    """Take a deleted post out of its cluster's rollups.
+
+    `rollup` is the post's PostRollup and `days` its post_days(), both read
+    before the delete.
+    """
+    if rollup.clusterid_id is None:
+        return
+    counts = Counter({field: -getattr(rollup, field) for field in COUNT_FIELDS}, posts=-1)
+    adjust_cluster(rollup.clusterid_id, counts)
+    adjust_cluster_days({
+        (rollup.clusterid_id, responsedate): Counter({field: -n for field, n in day.items()})
+        for responsedate, day in days.items()
+    })
+
+
+def global_totals():
+    return GlobalRollup.objects.filter(pk=1).first() or rebuild_global()
+
+
+def post_version(postid):
+    version = PostRollup.objects.filter(postid=postid).values_list('version', flat=True).first()
+    return version or 0
+
+
+def global_version():
+    return global_totals().version
+
+
+def compute_post_rollups():
+    rollups = defaultdict(Counter)
+    for model in (Response, ResponseArchive):
+        rows = model.objects.values('postid', 'sentiment').annotate(count=Count('responseid'))
+        for row in rows:
+            rollups[row['postid']].update(_counts_for(row['sentiment'], row['count']))
+    return rollups
+
+
+def compute_global_rollup(post_rollups=None):
+    if post_rollups is None:
+        post_rollups = compute_post_rollups()
+    totals = Counter()
+    for counts in post_rollups.values():
+        totals.update(counts)
+    values = {field: totals[field] for field in COUNT_FIELDS}
+    values['clusters'] = Cluster.objects.count()
+    values['posts'] = Post.objects.count()
+    return values
+
+
+def rebuild_global(post_rollups=None):
+    values = compute_global_rollup(post_rollups)
+    previous = GlobalRollup.objects.filter(pk=1).values_list('version', flat=True).first()
+    values['version'] = previous + 1 if previous is not None else 0
+    rollup, created = GlobalRollup.objects.update_or_create(pk=1, defaults=values)
+    return rollup
+
+
+def compute_cube():
+    cells = Counter()
+    for model in (Response, ResponseArchive):
+        rows = model.objects.values(*DIMENSIONS).annotate(count=Count('responseid'))
+        cells.update({tuple(row[d] for d in DIMENSIONS): row['count'] for row in rows})
+    return dict(cells)
+
+
+def compute_cluster_rollups(post_rollups, post_clusters):
+    """Sum post rollups into their clusters; `post_clusters` maps post to cluster."""
+    clusters = {clusterid: Counter() for clusterid in Cluster.objects.values_list('clusterid', flat=True)}
+    for postid, clusterid in post_clusters.items():
+        clusters[clusterid].update(post_rollups.get(postid, Counter()))
+        clusters[clusterid]['posts'] += 1
+    return clusters
+
+
+def compute_cluster_days(cells, post_clusters):
+    """Sum cube cells into (clusterid, date) counts."""
+    days = defaultdict(Counter)
+    for key, n in cells.items():
+        days[post_clusters[key[0]], key[1]].update(_counts_for(key[5], n))
+    return days
+
+
+@transaction.atomic
+def rebuild():
+    post_rollups = compute_post_rollups()
+    post_clusters = dict(Post.objects.values_list('postid', 'clusterid'))
+    # Versions must keep increasing across a rebuild or cached charts of
+    # the old counts would be served again.
+    versions = dict(PostRollup.objects.values_list('postid', 'version'))
+    PostRollup.objects.all().delete()
+    PostRollup.objects.bulk_create(
+        [PostRollup(postid_id=postid, version=versions.get(postid, -1) + 1, clusterid_id=clusterid,
+                    **{f: post_rollups.get(postid, Counter())[f] for f in COUNT_FIELDS})
+         for postid, clusterid in post_clusters.items()],
+        batch_size=1000,
+    )
+    rebuild_global(post_rollups)
+
+    cells = compute_cube()
+    SentimentCube.objects.all().delete()
+    SentimentCube.objects.bulk_create(
+        [SentimentCube(total=n, **_cell_lookup(key)) for key, n in cells.items()],
+        batch_size=1000,
+    )
+
+    ClusterRollup.objects.all().delete()
+    ClusterRollup.objects.bulk_create(
+        [ClusterRollup(clusterid_id=clusterid, posts=counts['posts'], **{f: counts[f] for f in COUNT_FIELDS})
+         for clusterid, counts in compute_cluster_rollups(post_rollups, post_clusters).items()],
+        batch_size=1000,
+    )
+    ClusterDaily.objects.all().delete()
+    ClusterDaily.objects.bulk_create(
+        [ClusterDaily(clusterid_id=clusterid, responsedate=responsedate, **{f: counts[f] for f in COUNT_FIELDS})
+         for (clusterid, responsedate), counts in compute_cluster_days(cells, post_clusters).items()],
+        batch_size=1000,
+    )
+    transaction.on_commit(dateindex.clear)
+    return len(post_rollups)
+
+
+def verify():
+    """Compare the stored rollups against the response table and its archive.
+
+    Returns a list of human-readable mismatch descriptions; empty means the
+    rollups are consistent.
+    """
+    mismatches = []
+    expected = compute_post_rollups()
+    stored = {r.postid_id: r for r in PostRollup.objects.all()}
+
+    for postid in sorted(set(expected) | set(stored)):
+        counts = expected.get(postid, Counter())
+        rollup = stored.get(postid)
+        for field in COUNT_FIELDS:
+            actual = getattr(rollup, field) if rollup else 0
+            if actual != counts[field]:
+                mismatches.append(f"post {postid}: {field} is {actual}, expected {counts[field]}")
+
+    expected_global = compute_global_rollup(expected)
+    stored_global = GlobalRollup.objects.filter(pk=1).first()
+    for field, value in expected_global.items():
+        actual = getattr(stored_global, field) if stored_global else None
+        if actual != value:
+            mismatches.append(f"global: {field} is {actual}, expected {value}")
+
+    expected_cells = compute_cube()
+    stored_cells = {
+        tuple(row[d] for d in DIMENSIONS): row['total']
+        for row in SentimentCube.objects.filter(total__gt=0).values(*DIMENSIONS, 'total')
+    }
+    for key in sorted(set(expected_cells) | set(stored_cells), key=str):
+        actual, expected_total = stored_cells.get(key, 0), expected_cells.get(key, 0)
+        if actual != expected_total:
+            mismatches.append(f"cube cell {key}: total is {actual}, expected {expected_total}")
+
+    post_clusters = dict(Post.objects.values_list('postid', 'clusterid'))
+    for postid, clusterid in sorted(post_clusters.items()):
+        actual = stored[postid].clusterid_id if postid in stored else None
+        if actual != clusterid:
+            mismatches.append(f"post {postid}: filed under cluster {actual}, expected {clusterid}")
+
+    expected_clusters = compute_cluster_rollups(expected, post_clusters)
+    stored_clusters = {r.clusterid_id: r for r in ClusterRollup.objects.all()}
+    for clusterid in sorted(set(expected_clusters) | set(stored_clusters)):
+        counts = expected_clusters.get(clusterid, Counter())
+        rollup = stored_clusters.get(clusterid)
+        for field in ('posts',) + COUNT_FIELDS:
+            actual = getattr(rollup, field) if rollup else 0
+            if actual != counts[field]:
+                mismatches.append(f"cluster {clusterid}: {field} is {actual}, expected {counts[field]}")
+
+    expected_days = compute_cluster_days(expected_cells, post_clusters)
+    stored_days = {(r.clusterid_id, r.responsedate): r for r in ClusterDaily.objects.all()}
+    for key in sorted(set(expected_days) | set(stored_days)):
+        counts = expected_days.get(key, Counter())
+        day = stored_days.get(key)
+        for field in COUNT_FIELDS:
+            actual = getattr(day, field) if day else 0
+            if actual != counts[field]:
+                mismatches.append(f"cluster {key[0]} on {key[1]}: {field} is {actual}, expected {counts[field]}")
+    return mismatches
@@ -0,0 +1,139 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Sends reads of the dashboard's tables to the read replicas listed in
+# settings.DATABASE_REPLICAS; writes, and every other app's tables (auth,
+# sessions), stay on the primary. Replicas are only read inside a scope():
+# each request (middleware.ReplicaPinMiddleware) and each read-only command
+# opens one. Everything else, e.g. commands that write what they read and
+# job workers, reads the primary. Within a scope, reads go to the primary
+# instead:
+#
+# - inside a transaction on the primary, so a write is read back consistently;
+# - for the rest of the scope once it has written to them;
+# - for requests that are not GET/HEAD, which read what they are about to change;
+# - for REPLICA_PIN_SECONDS after a request wrote, through the cookie set by
+#   middleware.ReplicaPinMiddleware, so admins see their own edits even
+#   while the replicas lag behind.
+#
+# A scope reads from one replica throughout, chosen when it starts, so the
+# data versions it reads (and keys chart caches by) match the rows read
+# with them even when the replicas lag by different amounts. Streaming
+# responses read after the view has returned; carry() keeps their reads in
+# the request's scope.
+
+PIN_COOKIE = 'replica_pin'
+
+
+def _choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class _Pin:
+    def __init__(self, primary=False, forced=False, replica=None):
+        self.primary = primary
+        self.wrote = False
+        # Set by primary(); carries over into scopes opened inside the block
+        self.forced = forced
+        # The replica every read of this scope goes to
+        self.replica = replica
+
+
+_pin = contextvars.ContextVar('dashboard_replica_pin', default=None)
+
+
+@contextmanager
+def scope(primary=False, pin=None):
+    """Route the reads of a request or command as described above.
+
+    Yields the scope's pin; its `wrote` attribute says whether the scope
+    wrote to the dashboard's tables. Pass the pin of an earlier scope to
+    carry on reading where it did.
+    """
+    if pin is None:
+        current = _pin.get()
+        forced = current is not None and current.forced
+        pin = _Pin(primary or forced, forced, _choose_replica())
+    token = _pin.set(pin)
+    try:
+        yield pin
+    finally:
+        _pin.reset(token)
+
+
+def carry(iterable):
+    """Iterate `iterable` in the current scope, also once the scope has ended.
+
+    For StreamingHttpResponse bodies, which are read after the middleware
+    has closed the request's scope.
+    """
+    pin = _pin.get()
+    if pin is None:
+        return iter(iterable)
+    return _carried(pin, iter(iterable))
+
+
+def _carried(pin, iterator):
+    while True:
+        # Only while each item is produced: the consumer runs outside the scope
+        with scope(pin=pin):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+@contextmanager
+def primary():
+    """Read everything from the primary inside the block."""
+    token = _pin.set(_Pin(primary=True, forced=True))
+    try:
+        yield
+    finally:
+        _pin.reset(token)
+
+
+def _reading_primary():
+    pin = _pin.get()
+    return (pin is not None and pin.primary) or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label != 'dashboard':
+            return None
+        pin = _pin.get()
+        if pin is None or _reading_primary():
+            return DEFAULT_DB_ALIAS
+        if pin.replica not in replicas:
+            pin.replica = _choose_replica()
+        return pin.replica
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != 'dashboard':
+            return None
+        pin = _pin.get()
+        if pin is not None:
+            pin.primary = pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,103 @@
+import re
+from collections import Counter
+
+from django.db.models import Count, Lookup
+
+from . import archive
+from .models import Response, ResponseArchive
+
+
+# Keyword and phrase search over response messages, backed by the
+# database's own inverted index: a FULLTEXT index on MySQL and an FTS5
+# table kept current by triggers on SQLite (see migration 0008). Other
+# backends fall back to LIKE, which scans.
+#
+# A query is a list of words and "quoted phrases"; a response matches if
+# it contains all of them. MySQL ignores words shorter than
+# innodb_ft_min_token_size (3 by default) and its stopwords. Archived
+# responses (dashboard/archive.py) have no index and are searched with LIKE.
+
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+WORD_RE = re.compile(r'\w+')
+FTS_TABLE = 'response_fts'
+
+
+def parse(query):
+    """Split a search query into phrases, each a list of words."""
+    phrases = []
+    for quoted, bare in QUERY_RE.findall(query):
+        if quoted:
+            words = WORD_RE.findall(quoted)
+            if words:
+                phrases.append(words)
+        else:
+            # Punctuation in a bare term separates words, as the indexes do
+            phrases.extend([word] for word in WORD_RE.findall(bare))
+    return phrases
+
+
+def _quoted(words):
+    return '"%s"' % ' '.join(words)
+
+
+class Search(Lookup):
+    """`responsemessage__search='words "a phrase"'`."""
+
+    lookup_name = 'search'
+
+    def process_rhs(self, compiler, connection):
+        return '%s', [self.rhs]
+
+    def as_mysql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        against = ' '.join('+' + _quoted(words) for words in parse(self.rhs))
+        return f'MATCH ({lhs}) AGAINST (%s IN BOOLEAN MODE)', [*lhs_params, against]
+
+    def as_sqlite(self, compiler, connection):
+        # FTS5 rowids are response ids; the subquery is answered from the index
+        qn = compiler.quote_name_unless_alias
+        pk = f'{qn(self.lhs.alias)}.{qn(Response._meta.pk.column)}'
+        match = ' '.join(_quoted(words) for words in parse(self.rhs))
+        return f'{pk} IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)', [match]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        phrases = parse(self.rhs)
+        sql = ' AND '.join([f'{lhs} LIKE %s'] * len(phrases))
+        params = []
+        for words in phrases:
+            params += [*lhs_params, '%%%s%%' % connection.ops.prep_for_like_query(' '.join(words))]
+        return sql, params
+
+
+class ScanSearch(Search):
+    """`search` on a column without a full-text index: LIKE everywhere."""
+
+    def as_mysql(self, compiler, connection):
+        return self.as_sql(compiler, connection)
+
+    as_sqlite = as_mysql
+
+
+Response._meta.get_field('responsemessage').register_lookup(Search)
+ResponseArchive._meta.get_field('responsemessage').register_lookup(ScanSearch)
+
+
+def apply(queryset, query):
+    """Filter `queryset` of responses to those matching `query`; a blank query matches nothing extra."""
+    if not parse(query):
+        return queryset
+    return queryset.filter(responsemessage__search=query)
+
+
+def sentiment_counts(post_id, filters):
+    """Responses per sentiment of a post matching the filters, search included.
+
+    The cube has no message text, so searches are counted on the response
+    tables themselves.
+    """
+    counts = Counter()
+    for queryset in archive.post_segments(post_id, filters):
+        rows = queryset.values('sentiment').annotate(count=Count('responseid')).order_by()
+        counts.update({row['sentiment']: row['count'] for row in rows})
+    return counts
@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import roles, rollups
+from .authentication import user_cache_key
+from .models import AppUser, Cluster, Post, Response, PostRollup
+
+User = get_user_model()
+
+
+def _is_cascade(origin, instance):
+    # Django passes the object (or queryset) whose delete() started the
+    # cascade as `origin`. Responses removed along with their post or
+    # cluster are accounted for by the post handlers in one step instead
+    # of one update per row; any other delete is counted row by row.
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (Post, Cluster)
+
+
+@receiver(pre_save, sender=Response)
+def capture_previous_response(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous = Response.objects.filter(pk=instance.pk).only(
+        'postid', 'responsedate', 'stateid', 'gender', 'agegroupid', 'sentiment').first()
+
+
+@receiver(post_save, sender=Response)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        rollups.record_responses([previous], sign=-1)
+    rollups.record_responses([instance])
+
+
+@receiver(post_delete, sender=Response)
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_cascade(origin, instance):
+        return
+    rollups.record_responses([instance], sign=-1)
+
+
+@receiver(post_save, sender=Post)
+def update_rollups_on_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.add_posts([instance])
+    else:
+        with transaction.atomic():
+            rollups.adjust_post(instance.pk, Counter())
+            rollups.adjust_global(Counter())
+            rollups.move_post(instance.pk, instance.clusterid_id)
+
+
+@receiver(pre_delete, sender=Post)
+def capture_post_rollup(sender, instance, origin=None, **kwargs):
+    # Locked first, as writers of the post's responses do, before its cube cells are read
+    instance._rollup_previous = PostRollup.objects.select_for_update().filter(postid=instance.pk).first()
+    # The cluster's own rollups go with it when a whole cluster is deleted
+    instance._rollup_days = None if isinstance(origin, Cluster) else rollups.post_days(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_rollups(sender, instance, **kwargs):
+    counts = Counter(posts=-1)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        for field in rollups.COUNT_FIELDS:
+            counts[field] -= getattr(previous, field)
+    rollups.adjust_global(counts)
+    days = getattr(instance, '_rollup_days', None)
+    if previous is not None and days is not None:
+        rollups.remove_post(previous, days)
+
+
+@receiver(post_save, sender=Cluster)
+def update_rollups_on_cluster_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.adjust_global(Counter(clusters=1 if created else 0))
+
+
+@receiver(post_delete, sender=Cluster)
+def remove_cluster_from_rollups(sender, instance, **kwargs):
+    rollups.adjust_global(Counter(clusters=-1))
+
+
+@receiver(post_save, sender=AppUser)
+@receiver(post_delete, sender=AppUser)
+def invalidate_role(sender, instance, **kwargs):
+    roles.invalidate(instance.username)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
@@ -0,0 +1,164 @@
+import gzip
+import importlib.util
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.checks import Error
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+
+# Static assets are collected under content-hashed names, with gzip and
+# Brotli variants written next to them, so they can be cached forever and
+# sent compressed without compressing on every request. plotly.js is
+# served from here too instead of a CDN; the pinned `plotly` package
+# (requirements.txt) ships the bundle.
+
+PLOTLY_PATH = 'vendor/plotly.min.js'
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.geojson', '.map', '.svg', '.txt')
+MIN_COMPRESS_SIZE = 1024
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+FAR_FUTURE = 31536000
+
+
+def plotly_source():
+    """The plotly.js bundle to serve: settings.PLOTLY_JS, or the one in the plotly package."""
+    if settings.PLOTLY_JS:
+        return settings.PLOTLY_JS
+    spec = importlib.util.find_spec('plotly')
+    if spec is None:
+        return None
+    return os.path.join(os.path.dirname(spec.origin), 'package_data', 'plotly.min.js')
+
+
+class _BundleStorage(FileSystemStorage):
+    # Exposes a single file under the name PLOTLY_PATH
+    def __init__(self, source):
+        super().__init__(location=os.path.dirname(source))
+        self.source = source
+        self.prefix = os.path.dirname(PLOTLY_PATH)
+
+    def path(self, name):
+        return self.source
+
+
+class PlotlyFinder(BaseFinder):
+    """Staticfiles finder providing plotly.js as vendor/plotly.min.js."""
+
+    def check(self, **kwargs):
+        source = plotly_source()
+        if source is None or not os.path.isfile(source):
+            return [Error(
+                f'plotly.js bundle not found at {source}.',
+                hint='Install the plotly package from requirements.txt or set PLOTLY_JS.',
+                id='dashboard.E001',
+            )]
+        return []
+
+    def find(self, path, all=False):
+        source = plotly_source()
+        if path != PLOTLY_PATH or source is None or not os.path.isfile(source):
+            return [] if all else None
+        return [source] if all else source
+
+    def list(self, ignore_patterns):
+        source = plotly_source()
+        if source is not None and os.path.isfile(source):
+            yield os.path.basename(PLOTLY_PATH), _BundleStorage(source)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz and .br copies of hashed text files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            # Only worth sending when it saves something
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+
+def _accepted(request):
+    """Content codings the client accepts (those not given q=0)."""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+@lru_cache(maxsize=1)
+def _hashed_names():
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve(request, path):
+    """Serve a collected static file, precompressed if the client accepts it.
+
+    Content-hashed names are cached for a year; others (only referenced
+    before collectstatic has run) briefly.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    served, encoding = full_path, None
+    accepted = _accepted(request)
+    for coding, suffix in ENCODINGS:
+        if coding in accepted and os.path.isfile(full_path + suffix):
+            served, encoding = full_path + suffix, coding
+            break
+
+    response = FileResponse(open(served, 'rb'), content_type=content_type)
+    response.headers.pop('Content-Disposition', None)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if path in _hashed_names():
+        patch_cache_control(response, public=True, max_age=FAR_FUTURE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=300)
+    return response
@@ -0,0 +1,141 @@
+import datetime
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+
+from . import rollups
+from .models import AgeGroup, Cluster, Post, Response, ResponseArchive, State
+
+
+# Code tables as loaded by sql.txt
+AGE_GROUPS = ['NA', '18-25', '26-35', '36-45', '46-55', '55+']
+STATES = [
+    'NA', 'Kuala Lumpur', 'Labuan', 'Putrajaya', 'Johor', 'Kedah', 'Kelantan', 'Malacca',
+    'Negeri Sembilan', 'Pahang', 'Penang', 'Perak', 'Perlis', 'Sabah', 'Sarawak', 'Selangor',
+    'Terengganu',
+]
+CLUSTERS = ['Political', 'Educational', 'Entertainment', 'Sports', 'Technology', 'Economy', 'Health']
+
+# Relative weights, roughly following the population and the age profile
+# of Malaysian social media users; index = stateid / agegroupid.
+STATE_WEIGHTS = [1.0, 2.0, 0.1, 0.1, 4.0, 2.2, 1.9, 0.9, 1.2, 1.6, 1.8, 2.5, 0.3, 3.4, 2.5, 7.0, 1.2]
+AGE_GROUP_WEIGHTS = [0.10, 0.30, 0.28, 0.17, 0.10, 0.05]
+GENDERS = ['M', 'F', 'O', 'N']
+GENDER_WEIGHTS = [0.47, 0.41, 0.02, 0.10]
+SENTIMENTS = ['P', 'N', 'U']
+
+# Responses arrive mostly in the first days after a post; mean lag in days
+RESPONSE_LAG_DAYS = 3.0
+# Post popularity follows a Zipf-like curve with this exponent
+POPULARITY_EXPONENT = 1.1
+
+MESSAGES = {
+    'P': ['Great initiative, well done!', 'Sangat bagus, teruskan usaha', 'Love this, thank you',
+          'Syabas kepada semua yang terlibat', 'This is the best news this week', 'Terbaik, sokong!'],
+    'N': ['This is terrible and disappointing', 'Teruk betul, kecewa', 'Waste of public money',
+          'Tak setuju langsung', 'Another failure, shame', 'Rasuah lagi, bosan'],
+    'U': ['When will this start?', 'Ada info lanjut?', 'Noted, thanks for sharing',
+          'Berapa kos semua ini?', 'Is this for all states?', 'Ok, kita tengok nanti'],
+}
+
+
+def _probabilities(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def ensure_code_tables():
+    """Create the age group and state rows if the database has none yet."""
+    if not AgeGroup.objects.exists():
+        AgeGroup.objects.bulk_create([AgeGroup(agegroupid=i, agegroup=name) for i, name in enumerate(AGE_GROUPS)])
+    if not State.objects.exists():
+        State.objects.bulk_create([State(stateid=i, statename=name) for i, name in enumerate(STATES)])
+
+
+def _next_id(*models):
+    # The first id unused in any of `models`
+    return max(model.objects.aggregate(last=Max('pk'))['last'] or 0 for model in models) + 1
+
+
+def generate(responses, posts=None, clusters=5, seed=0, start=datetime.date(2025, 1, 1), days=365,
+             batch_size=10000, on_batch=None):
+    """Append a reproducible synthetic dataset to the database.
+
+    Creates `clusters` clusters and `posts` posts (default: one per 2000
+    responses) dated within `days` of `start`, then `responses` responses
+    in batches. Post popularity is Zipf-like, responses cluster in the days
+    after their post, states and age groups are weighted by population, and
+    every post gets its own sentiment mix. The rollups are rebuilt at the
+    end. `on_batch(written)` is called after each batch.
+    """
+    rng = np.random.default_rng(seed)
+    posts = posts or max(responses // 2000, 1)
+    ensure_code_tables()
+
+    with transaction.atomic():
+        first_cluster = _next_id(Cluster)
+        new_clusters = Cluster.objects.bulk_create([
+            Cluster(clusterid=first_cluster + i, clustername=CLUSTERS[i % len(CLUSTERS)])
+            for i in range(clusters)
+        ])
+        cluster_ids = [cluster.clusterid for cluster in new_clusters] or list(
+            Cluster.objects.values_list('clusterid', flat=True))
+
+        first_post = _next_id(Post)
+        post_dates = rng.integers(0, days, posts)
+        post_clusters = rng.choice(cluster_ids, posts)
+        Post.objects.bulk_create([
+            Post(postid=first_post + i, clusterid_id=int(post_clusters[i]),
+                 postdate=start + datetime.timedelta(days=int(post_dates[i])),
+                 postlink=f'https://www.facebook.com/synthetic/posts/{first_post + i}',
+                 postmessage=f'Synthetic post {first_post + i}')
+            for i in range(posts)
+        ], batch_size=1000)
+
+    popularity = _probabilities(1.0 / np.arange(1, posts + 1) ** POPULARITY_EXPONENT)
+    rng.shuffle(popularity)
+    sentiment_mix = np.cumsum(rng.dirichlet([2.0, 2.0, 1.5], posts), axis=1)
+    state_p = _probabilities(STATE_WEIGHTS)
+    age_p = _probabilities(AGE_GROUP_WEIGHTS)
+    gender_p = _probabilities(GENDER_WEIGHTS)
+    messages = {sentiment: np.array(texts) for sentiment, texts in MESSAGES.items()}
+
+    next_response = _next_id(Response, ResponseArchive)
+    written = 0
+    while written < responses:
+        n = min(batch_size, responses - written)
+        post_index = rng.choice(posts, n, p=popularity)
+        lag = np.minimum(rng.exponential(RESPONSE_LAG_DAYS, n).astype(np.int64), days)
+        day = post_dates[post_index] + lag
+        states = rng.choice(len(STATES), n, p=state_p)
+        ages = rng.choice(len(AGE_GROUPS), n, p=age_p)
+        genders = rng.choice(len(GENDERS), n, p=gender_p)
+        sentiments = (rng.random(n)[:, None] > sentiment_mix[post_index]).sum(axis=1)
+        templates = rng.integers(0, len(MESSAGES['P']), n)
+
+        batch = []
+        for i in range(n):
+            sentiment = SENTIMENTS[min(sentiments[i], 2)]
+            responseid = next_response + written + i
+            batch.append(Response(
+                responseid=responseid,
+                postid_id=first_post + int(post_index[i]),
+                responsedate=start + datetime.timedelta(days=int(day[i])),
+                responsemessage=str(messages[sentiment][templates[i]]),
+                username=f'user{responseid}',
+                agegroupid_id=int(ages[i]),
+                gender=GENDERS[genders[i]],
+                stateid_id=int(states[i]),
+                sentiment=sentiment,
+            ))
+        Response.objects.bulk_create(batch, batch_size=1000)
+        written += n
+        if on_batch is not None:
+            on_batch(written)
+
+    # bulk_create bypasses the rollup signal handlers. One rebuild at the end
+    # is much cheaper than updating the cube cell by cell for every batch.
+    rollups.rebuild()
+    return {'clusters': len(new_clusters), 'posts': posts, 'responses': written,
+            'first_post': first_post, 'first_response': next_response}
@@ -0,0 +1,30 @@
+from django.template.backends.django import DjangoTemplates
+
+from . import metrics
+
+
+class TimedTemplate:
+    """Wraps a backend template so rendering counts towards the request's template time."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with metrics.timed('template'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render times reported to dashboard.metrics.
+
+    Included templates render inside their parent, so they are not counted twice.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
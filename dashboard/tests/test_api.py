@@ -0,0 +1,99 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from dashboard import rollups
+from dashboard.models import Response
+
+from .utils import create_dataset
+
+
+class ChartAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+        cls.user = get_user_model().objects.create(username='analyst')
+
+    def setUp(self):
+        caches['charts'].clear()
+        self.client.force_login(self.user)
+
+    def get(self, name, *args, query=''):
+        response = self.client.get(reverse(name, args=args) + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def sentiments(self, **filters):
+        counts = Counter(Response.objects.filter(postid=1, **filters).values_list('sentiment', flat=True))
+        return [counts['P'], counts['N'], counts['U']]
+
+    def test_sentiment(self):
+        data = self.get('api_post_sentiment', 1)
+        self.assertEqual(data, {'labels': ['Positive', 'Negative', 'Neutral'], 'values': self.sentiments(),
+                                'total': Response.objects.filter(postid=1).count()})
+        data = self.get('api_post_sentiment', 1, query='?gender=F&state=2')
+        self.assertEqual(data['values'], self.sentiments(gender='F', stateid=2))
+
+    def test_gender_and_agegroups(self):
+        data = self.get('api_post_gender', 1)
+        self.assertEqual(set(data), {'labels', 'positive', 'negative', 'neutral'})
+        self.assertEqual(len(data['labels']), 4)
+        self.assertEqual(data['positive'][data['labels'].index('Female')],
+                         Response.objects.filter(postid=1, gender='F', sentiment='P').count())
+
+        data = self.get('api_post_agegroups', 1)
+        self.assertEqual(data['labels'], ['Group 1', 'Group 2', 'Group 3'])
+        self.assertEqual(data['negative'][0], Response.objects.filter(postid=1, agegroupid=1, sentiment='N').count())
+
+    def test_states(self):
+        data = self.get('api_post_states', 1)
+        self.assertEqual(
+            set(data), {'states', 'total', 'positive', 'negative', 'neutral', 'geojson', 'center', 'zoom'},
+        )
+        self.assertEqual(sum(data['total']), Response.objects.filter(postid=1, stateid__gt=0).count())
+        self.assertTrue(data['geojson'].startswith(reverse('malaysia_geojson', args=['low'])))
+
+    def test_cluster_posts(self):
+        self.assertEqual(self.get('api_cluster_posts'), {'labels': ['Cluster 1', 'Cluster 2'], 'values': [2, 2]})
+
+    def test_cluster_sentiment_and_trends(self):
+        data = self.get('api_cluster_sentiment')
+        self.assertEqual(data['labels'], ['Cluster 1', 'Cluster 2'])
+        totals = [Response.objects.filter(postid__in=posts).count() for posts in ([1, 3], [2, 4])]
+        self.assertEqual(data['total'], totals)
+        self.assertEqual(data['negative'][1], Response.objects.filter(postid__in=[2, 4], sentiment='N').count())
+
+        data = self.get('api_cluster_trends')
+        self.assertEqual([cluster['name'] for cluster in data['clusters']], ['Cluster 1', 'Cluster 2'])
+        self.assertEqual(sum(sum(cluster['total']) for cluster in data['clusters']), Response.objects.count())
+        self.assertTrue(all(len(cluster['net']) == len(data['weeks']) for cluster in data['clusters']))
+
+    def test_filtered(self):
+        data = self.get('api_post_filtered', 1, query='?gender=F')
+        self.assertEqual(set(data), {'sentiment', 'total', 'responses', 'facets'})
+        self.assertEqual(data['sentiment']['values'], self.sentiments(gender='F'))
+        self.assertEqual(data['total'], Response.objects.filter(postid=1, gender='F').count())
+        newest = Response.objects.filter(postid=1, gender='F').order_by('-responsedate', '-responseid')
+        usernames = [response.username for response in newest]
+        self.assertIn(f'<strong>{usernames[0]}</strong>', data['responses'])
+        self.assertNotIn(f'<strong>{usernames[-1]}</strong>', data['responses'])
+
+        # Options are only sent again when they differ from the page's
+        facets = data['facets']
+        self.assertEqual(facets['genders'][0], ['F', 'Female'])
+        data = self.get('api_post_filtered', 1, query='?state=2&facets=' + facets['facets_digest'])
+        self.assertIsNone(data['facets'])
+        self.assertEqual(data['total'], Response.objects.filter(postid=1, stateid=2).count())
+        self.assertIsNotNone(self.get('api_post_filtered', 1, query='?facets=stale')['facets'])
+
+    def test_unknown_post(self):
+        self.assertEqual(self.client.get(reverse('api_post_sentiment', args=[404])).status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_post_sentiment', args=[1])).status_code, 403)
@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import tempfile
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from dashboard import archive, export, ingest, pagination, rollups, search, views
+from dashboard.filters import ResponseFilters
+from dashboard.models import Response, ResponseArchive, ResponseTopic, Topic
+
+from .utils import create_dataset, make_response
+
+CUTOFF = date(2025, 2, 1)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # January and February 2025
+        create_dataset(responses=400, days=59)
+        rollups.rebuild()
+
+    def listed(self, filters=ResponseFilters()):
+        page = pagination.paginate(views.filtered_responses(1, filters), None, 10 ** 6, 10 ** 6)
+        return [response.responseid for response in page]
+
+    def archive_before(self, cutoff=CUTOFF):
+        return sum(archive.archive_month(month) for month in archive.months_to_archive(cutoff))
+
+    def test_archived_responses_are_still_listed(self):
+        filtered = ResponseFilters(date_from='2025-01-20', date_to='2025-02-10', gender='F')
+        searched = ResponseFilters(q='kecewa')
+        before = self.listed(), self.listed(filtered), search.sentiment_counts(1, searched)
+        exported = b''.join(export.stream(1, ResponseFilters(), 'csv', chunk_size=7))
+        january = Response.objects.filter(responsedate__lt=CUTOFF).count()
+
+        self.assertEqual(self.archive_before(), january)
+        self.assertFalse(Response.objects.filter(responsedate__lt=CUTOFF).exists())
+        self.assertEqual(ResponseArchive.objects.count(), january)
+        self.assertEqual(archive.boundary(), CUTOFF)
+        self.assertEqual(rollups.verify(), [])
+        self.assertEqual((self.listed(), self.listed(filtered), search.sentiment_counts(1, searched)), before)
+        self.assertEqual(b''.join(export.stream(1, ResponseFilters(), 'csv', chunk_size=7)), exported)
+
+    def test_date_filters_skip_the_archive(self):
+        self.archive_before()
+        parts = views.filtered_responses(1, ResponseFilters(date_from='2025-02-01'))
+        self.assertEqual([part.model for part in parts], [Response])
+        # The hot table can hold late rows of archived months
+        parts = views.filtered_responses(1, ResponseFilters(date_to='2025-01-31'))
+        self.assertEqual([part.model for part in parts], [Response, ResponseArchive])
+
+    def test_late_rows_of_archived_months_are_listed(self):
+        self.archive_before()
+        pk = ResponseArchive.objects.order_by('-responseid').first().responseid + 1
+        late = make_response(pk, 1, date(2025, 1, 15), 'N')
+        late.save()
+        expected = sorted(
+            [*Response.objects.filter(postid=1), *ResponseArchive.objects.filter(postid=1)],
+            key=lambda response: (response.responsedate, response.responseid), reverse=True,
+        )
+        expected = [response.responseid for response in expected]
+        self.assertEqual(self.listed(), expected)
+        self.assertIn(pk, self.listed(ResponseFilters(date_to='2025-01-31')))
+        self.assertEqual(search.sentiment_counts(1, ResponseFilters())['N'],
+                         Response.objects.filter(postid=1, sentiment='N').count()
+                         + ResponseArchive.objects.filter(postid=1, sentiment='N').count())
+
+        # Paged forwards and back again across the late row
+        pages, cursor = [], None
+        while True:
+            page = pagination.paginate(views.filtered_responses(1, ResponseFilters()), cursor, 9, len(expected))
+            pages.append([response.responseid for response in page])
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sum(pages, []), expected)
+        for previous in reversed(pages[:-1]):
+            page = pagination.paginate(views.filtered_responses(1, ResponseFilters()), page.previous_cursor, 9,
+                                       len(expected))
+            self.assertEqual([response.responseid for response in page], previous)
+
+        rows = b''.join(export.stream(1, ResponseFilters(), 'jsonl', chunk_size=7)).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(row)['responseid'] for row in rows], expected[::-1])
+
+    def test_reingesting_archived_rows(self):
+        self.archive_before()
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as f:
+            for response in ResponseArchive.objects.order_by('responseid')[:5]:
+                f.write(json.dumps({
+                    'responseid': response.responseid, 'postid': response.postid_id,
+                    'responsedate': response.responsedate.isoformat(), 'responsemessage': response.responsemessage,
+                    'username': response.username, 'agegroupid': response.agegroupid_id,
+                    'gender': response.gender, 'stateid': response.stateid_id, 'sentiment': response.sentiment,
+                }) + '\n')
+
+        stats = ingest.ingest(path, 'responses')
+        self.assertEqual((stats['inserted'], stats['duplicates']), (0, 5))
+        self.assertEqual(rollups.verify(), [])
+        self.assertEqual(archive.months_to_archive(CUTOFF), [])
+        self.assertEqual(self.archive_before(), 0)
+
+    def test_hot_duplicates_of_archived_rows_are_dropped(self):
+        self.archive_before()
+        archived = ResponseArchive.objects.order_by('responseid').first()
+        # As written by an ingest that did not know about the archive
+        duplicate = make_response(archived.responseid, archived.postid_id, archived.responsedate, archived.sentiment)
+        Response.objects.bulk_create([duplicate])
+        rollups.record_responses([duplicate])
+
+        self.assertEqual(archive.months_to_archive(CUTOFF), [archive.month_start(archived.responsedate)])
+        self.assertEqual(self.archive_before(), 0)
+        self.assertFalse(Response.objects.filter(responseid=archived.responseid).exists())
+        self.assertEqual(rollups.verify(), [])
+
+    def test_archived_responses_keep_their_topic_until_a_refit(self):
+        def extract(**options):
+            call_command('extract_topics', workers=1, min_responses=1, topics=3, stdout=io.StringIO(), **options)
+
+        extract()
+        topic_of = dict(ResponseTopic.objects.filter(responseid__postid=1).values_list('responseid', 'topic'))
+        totals = dict(Topic.objects.values_list('id', 'total'))
+        self.archive_before()
+        archived = dict(ResponseArchive.objects.filter(postid=1).values_list('responseid', 'topicid'))
+        self.assertEqual(archived, {pk: topic_of[pk] for pk in archived})
+        extract()
+        self.assertEqual(dict(Topic.objects.values_list('id', 'total')), totals)
+
+        extract(refit=True, post=[1])
+        self.assertFalse(ResponseArchive.objects.filter(postid=1, topicid__isnull=False).exists())
+        self.assertTrue(ResponseArchive.objects.filter(postid=2, topicid__isnull=False).exists())
+
+    def test_command_dry_run(self):
+        stdout = io.StringIO()
+        call_command('archive_responses', keep_months=0, dry_run=True, stdout=stdout)
+        self.assertIn(f'2025-01: {Response.objects.filter(responsedate__lt=CUTOFF).count()} response(s)',
+                      stdout.getvalue())
+        self.assertFalse(ResponseArchive.objects.exists())
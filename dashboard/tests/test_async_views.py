@@ -0,0 +1,106 @@
+import re
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import path
+
+from dashboard import async_views, rollups, urls
+from dashboard.models import Post
+
+from .utils import create_dataset, plain_static_files
+
+
+# The dashboard's URLs with the analytics pages served by the async views,
+# as with ASYNC_VIEWS on
+ASYNC_PAGES = {
+    'dashboard': async_views.dashboard,
+    'sentiment_analysis': async_views.sentiment_analysis,
+    'cluster_analysis': async_views.cluster_analysis,
+    'demographic_analysis': async_views.demographic_analysis,
+    'compare_posts': async_views.compare_posts,
+}
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_PAGES[pattern.name], name=pattern.name) if pattern.name in ASYNC_PAGES
+    else pattern
+    for pattern in urls.urlpatterns
+]
+
+
+class InThreadTests(TransactionTestCase):
+    def test_runs_in_a_worker_thread_with_its_own_connection(self):
+        def work():
+            Post.objects.exists()
+            return threading.get_ident(), connections['default']
+
+        ident, worker_connection = async_to_sync(async_views.in_thread(work))()
+        self.assertNotEqual(ident, threading.get_ident())
+        self.assertIsNot(worker_connection, connections['default'])
+
+
+# Worker threads use their own connections, so the data must be committed
+@plain_static_files
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        create_dataset()
+        rollups.rebuild()
+        caches['charts'].clear()
+        self.user = get_user_model().objects.create(username='analyst')
+
+    def get(self, url, headers=None):
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def sync_get(self, url, headers=None):
+        with override_settings(ROOT_URLCONF='mysentkom.urls'):
+            return self.client.get(url, headers=headers)
+
+    def login(self):
+        self.client.force_login(self.user)
+        self.async_client.cookies = self.client.cookies
+
+    def test_login_required(self):
+        for url in ('/dashboard/', '/sentiment/?post=1', '/cluster/', '/demographic/?post=1'):
+            with self.subTest(url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 302)
+                self.assertTrue(response.url.startswith('/login/?next='))
+
+    def test_pages_match_the_sync_views(self):
+        self.login()
+        for url in ('/dashboard/', '/sentiment/', '/sentiment/?post=1', '/sentiment/?post=2&gender=F',
+                    '/cluster/', '/demographic/', '/demographic/?post=1', '/compare/?posts=1,2&cluster=1'):
+            with self.subTest(url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                expected = self.sync_get(url)
+                self.assertEqual(self.text(response), self.text(expected))
+
+    def test_responses_page(self):
+        self.login()
+        url = '/sentiment/?post=1&state=2'
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        response = self.get(url, headers)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(self.text(response), self.text(self.sync_get(url, headers)))
+
+    def test_not_modified(self):
+        self.login()
+        response = self.get('/sentiment/?post=1')
+        self.assertEqual(response['ETag'], self.sync_get('/sentiment/?post=1')['ETag'])
+        self.assertEqual(self.get('/sentiment/?post=1', {'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_unknown_post(self):
+        self.login()
+        self.assertEqual(self.get('/sentiment/?post=404').status_code, 404)
+        self.assertEqual(self.get('/demographic/?post=404').status_code, 404)
+
+    def text(self, response):
+        # Without the per-render CSRF token or the pagination cursors, which
+        # are signed with the current time
+        lines = response.content.decode().splitlines()
+        text = '\n'.join(line for line in lines if 'csrfmiddlewaretoken' not in line)
+        return re.sub(r'data-cursor=\\?"[^"\\]*', 'data-cursor="', text)
@@ -0,0 +1,78 @@
+from datetime import date
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from dashboard import rollups
+from dashboard.charts import cached_chart
+from dashboard.filters import ResponseFilters
+from dashboard.models import Cluster, Post
+
+from .utils import create_dataset, make_response
+
+
+class CachedChartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+
+    def setUp(self):
+        caches['charts'].clear()
+        self.builds = 0
+
+    def chart(self, post_id=1, filters=None):
+        def build():
+            self.builds += 1
+            return f'<div>{self.builds}</div>'
+        return cached_chart('sentiment', rollups.post_version(post_id), build, post_id=post_id, filters=filters)
+
+    def test_built_once_per_version(self):
+        first = self.chart()
+        self.assertEqual(self.chart(), first)
+        self.assertEqual(self.builds, 1)
+
+        make_response(10 ** 6, 1, date(2025, 3, 1)).save()
+        self.assertNotEqual(self.chart(), first)
+        self.assertEqual(self.builds, 2)
+
+    def test_keyed_by_post_and_filters(self):
+        self.chart()
+        self.chart(post_id=2)
+        self.chart(filters=ResponseFilters(gender='F'))
+        self.chart(filters=ResponseFilters(gender='F'))
+        self.assertEqual(self.builds, 3)
+
+    def test_writes_to_other_posts_keep_the_entry(self):
+        self.chart()
+        make_response(10 ** 6, 2, date(2025, 3, 1)).save()
+        self.chart()
+        self.assertEqual(self.builds, 1)
+
+
+class VersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+
+    def versions(self):
+        return rollups.post_version(1), rollups.global_version()
+
+    def test_bumped_by_writes(self):
+        writes = [
+            ('response', lambda: make_response(10 ** 6, 1, date(2025, 3, 1)).save(), True),
+            ('post edit', lambda: Post.objects.get(pk=1).save(), True),
+            ('cluster', lambda: Cluster.objects.create(clusterid=99, clustername='New'), False),
+            ('rebuild', rollups.rebuild, True),
+        ]
+        for name, write, bumps_post in writes:
+            with self.subTest(name):
+                post_before, global_before = self.versions()
+                write()
+                post_after, global_after = self.versions()
+                self.assertGreater(global_after, global_before)
+                if bumps_post:
+                    self.assertGreater(post_after, post_before)
+                else:
+                    self.assertEqual(post_after, post_before)
@@ -0,0 +1,92 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from dashboard import archive, classifier, rollups
+from dashboard.models import Response, ResponseArchive
+
+from .utils import create_dataset
+
+
+class TokenizeTests(SimpleTestCase):
+    def test_reduplication_and_suffixes(self):
+        self.assertEqual(classifier.tokenize('Baik-baik saja'), ['baik', 'saja'])
+        self.assertEqual(classifier.tokenize('Bagusnya! Terukkan lah'), ['bagus', 'teruk', 'lah'])
+        self.assertEqual(classifier.tokenize("Don't  worry, it's GOOD good"), ["don't", 'worry', "it's", 'good'])
+        self.assertEqual(classifier.tokenize(''), [])
+
+
+class ScoreBatchTests(SimpleTestCase):
+    def labels(self, *messages):
+        return classifier.score_batch(list(messages)).tolist()
+
+    def test_labels(self):
+        self.assertEqual(
+            self.labels('Great job, terbaik!', 'Sangat kecewa, teruk betul', 'Meeting at 3pm', '', None),
+            ['P', 'N', 'U', 'U', 'U'],
+        )
+
+    def test_no_lexicon_words(self):
+        self.assertEqual(self.labels('Meeting at 3pm', 'so-so'), ['U', 'U'])
+
+    def test_negation(self):
+        self.assertEqual(self.labels('not good', 'tak bagus langsung', 'not bad at all', 'not, good'),
+                         ['N', 'N', 'P', 'N'])
+        # A negator only flips the word right after it, in the same message
+        self.assertEqual(self.labels('not really good'), ['P'])
+        self.assertEqual(self.labels('good not', 'good', 'tak', 'tak tak bagus'), ['P', 'P', 'U', 'N'])
+
+    def test_length_normalization(self):
+        neutral_words = ' '.join('x' * length for length in range(1, 100))
+        self.assertEqual(self.labels(f'good {neutral_words}', 'good'), ['U', 'P'])
+
+    def test_matches_one_at_a_time(self):
+        messages = ['Good', 'bad bad', 'tak setuju', 'Syabas! Mantap-mantap', 'jangan marah', 'so-so'] * 5
+        self.assertEqual(self.labels(*messages), [self.labels(message)[0] for message in messages])
+
+
+class ClassifyResponsesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(responses=60)
+        Response.objects.filter(pk__lte=20).update(sentiment='')
+        Response.objects.filter(pk__gt=20, pk__lte=30).update(sentimentmodel='lexicon-old', sentiment='U',
+                                                              responsemessage='Terbaik!')
+        Response.objects.filter(pk=40).update(responsemessage='Terbaik!', sentiment='N')
+        rollups.rebuild()
+
+    def classify(self, *args):
+        call_command('classify_responses', '--workers', '1', '--chunk-size', '7', *args, stdout=StringIO())
+
+    def test_labels_blank_and_outdated_responses(self):
+        self.classify()
+        self.assertFalse(Response.objects.filter(sentiment='').exists())
+        self.assertEqual(Response.objects.filter(sentimentmodel=classifier.MODEL_VERSION).count(), 30)
+        self.assertEqual(set(Response.objects.filter(pk__gt=20, pk__lte=30).values_list('sentiment', flat=True)),
+                         {'P'})
+        # Manual labels are kept
+        self.assertEqual(Response.objects.get(pk=40).sentiment, 'N')
+        self.assertIsNone(Response.objects.get(pk=40).sentimentmodel)
+        self.assertEqual(rollups.verify(), [])
+
+        Response.objects.filter(pk=1).update(responsemessage='Terbaik!')
+        self.classify()
+        self.assertNotEqual(Response.objects.get(pk=1).sentiment, 'P')
+        self.classify('--force')
+        self.assertEqual(Response.objects.get(pk=1).sentiment, 'P')
+        self.assertEqual(rollups.verify(), [])
+
+    def test_labels_archived_responses(self):
+        for month in archive.months_to_archive(date(2025, 2, 1)):
+            archive.archive_month(month)
+        self.assertTrue(ResponseArchive.objects.filter(sentiment='').exists())
+        self.assertTrue(Response.objects.filter(sentiment='').exists())
+
+        self.classify()
+        both = [*Response.objects.all(), *ResponseArchive.objects.all()]
+        self.assertFalse([row for row in both if row.sentiment == ''])
+        self.assertEqual(len([row for row in both if row.sentimentmodel == classifier.MODEL_VERSION]), 30)
+        self.assertEqual({row.sentiment for row in both if 20 < row.pk <= 30}, {'P'})
+        self.assertEqual(rollups.verify(), [])
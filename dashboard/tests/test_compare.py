@@ -0,0 +1,74 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from dashboard import charts, rollups
+from dashboard.models import Response
+
+from .utils import create_dataset, plain_static_files
+
+
+@plain_static_files
+class CompareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(posts=6, clusters=2)
+        rollups.rebuild()
+        cls.user = get_user_model().objects.create(username='analyst')
+
+    def setUp(self):
+        caches['charts'].clear()
+        self.client.force_login(self.user)
+
+    def compare(self, query):
+        response = self.client.get(reverse('api_compare_posts') + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_payload(self):
+        # Cluster 2 holds posts 2, 4 and 6
+        data = self.compare('?posts=1,3&posts=2&cluster=2')
+        posts = [1, 2, 3, 4, 6]
+        self.assertEqual(data['posts'], posts)
+        self.assertEqual(data['labels'], [f'#{post}' for post in posts])
+        self.assertEqual(data['clusters'], ['Cluster 1', 'Cluster 2', 'Cluster 1', 'Cluster 2', 'Cluster 2'])
+        for index, post in enumerate(posts):
+            sentiments = Counter(Response.objects.filter(postid=post).values_list('sentiment', flat=True))
+            self.assertEqual(data['total'][index], sum(sentiments.values()))
+            self.assertEqual([data['positive'][index], data['negative'][index], data['neutral'][index]],
+                             [sentiments['P'], sentiments['N'], sentiments['U']])
+
+        genders = data['demographics']['gender']
+        self.assertEqual(genders['labels'], ['Male', 'Female', 'Others', 'Not Disclosed'])
+        self.assertEqual(genders['values'][1][0], Response.objects.filter(postid=1, gender='F').count())
+        states = data['demographics']['state']
+        self.assertEqual(len(states['values']), len(states['labels']))
+        self.assertEqual(sum(values[0] for values in states['values']),
+                         Response.objects.filter(postid=1, stateid__gt=0).count())
+        self.assertEqual(data['demographics']['agegroup']['labels'], ['Group 1', 'Group 2', 'Group 3'])
+
+    def test_queries_do_not_grow_with_posts(self):
+        with self.assertNumQueries(7):
+            charts.comparison_data([1, 2])
+        caches['charts'].clear()
+        with self.assertNumQueries(7):
+            charts.comparison_data([1, 2, 3, 4, 5, 6])
+
+    def test_bad_selections(self):
+        for query in ('?posts=1,x', '?cluster=abc', '?posts=' + ','.join(map(str, range(1, 502)))):
+            with self.subTest(query):
+                response = self.client.get(reverse('api_compare_posts') + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('posts', response.json())
+        self.assertEqual(self.compare('')['posts'], [])
+
+    def test_page(self):
+        response = self.client.get(reverse('compare_posts') + '?posts=1&cluster=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<option value="1" selected>')
+        self.assertContains(response, reverse('api_compare_posts'))
+        self.assertEqual(self.client.get(reverse('compare_posts') + '?posts=1&cluster=2',
+                                         headers={'If-None-Match': response['ETag']}).status_code, 304)
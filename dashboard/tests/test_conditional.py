@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from dashboard import conditional, rollups
+from dashboard.models import Response
+
+from .utils import create_dataset, make_response, plain_static_files
+
+
+@plain_static_files
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+        cls.user = get_user_model().objects.create(username='analyst')
+
+    def setUp(self):
+        caches['charts'].clear()
+        self.client.force_login(self.user)
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+        self.assertIn('no-cache', first['Cache-Control'])
+        second = self.client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        return first['ETag']
+
+    def test_api_not_modified_until_the_post_changes(self):
+        url = reverse('api_post_sentiment', args=[1])
+        etag = self.revalidate(url)
+        other = self.revalidate(reverse('api_post_sentiment', args=[2]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_response(10 ** 6, 1, date(2025, 3, 1)).save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['total'], Response.objects.filter(postid=1).count())
+        # Other posts' data is still current
+        self.assertEqual(
+            self.client.get(reverse('api_post_sentiment', args=[2]), headers={'If-None-Match': other}).status_code,
+            304,
+        )
+
+    def test_pages(self):
+        etag = self.revalidate(reverse('sentiment_analysis') + '?post=1')
+        self.revalidate(reverse('dashboard'))
+
+        make_response(10 ** 6, 1, date(2025, 3, 1)).save()
+        response = self.client.get(reverse('sentiment_analysis') + '?post=1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Another user gets their own validator
+        self.client.force_login(get_user_model().objects.create(username='other'))
+        response = self.client.get(reverse('sentiment_analysis') + '?post=1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_validator_for_unknown_posts(self):
+        response = self.client.get(reverse('sentiment_analysis') + '?post=404')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_no_validator_with_pending_messages(self):
+        request = RequestFactory().get(reverse('dashboard'))
+        request.user, request.is_admin, request.session = self.user, False, {}
+        request._messages = FallbackStorage(request)
+        self.assertIsNotNone(conditional.dashboard_etag(request))
+        messages.success(request, 'Post updated.')
+        self.assertIsNone(conditional.dashboard_etag(request))
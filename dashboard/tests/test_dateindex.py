@@ -0,0 +1,117 @@
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from dashboard import cube, dateindex, rollups
+from dashboard.dateindex import DateIndex, FenwickTree
+from dashboard.filters import ResponseFilters
+from dashboard.models import Response
+
+from .utils import create_dataset, make_response
+
+
+class FenwickTreeTests(SimpleTestCase):
+    def test_prefix_and_range_match_sums(self):
+        rng = random.Random(0)
+        values = [rng.randint(0, 20) for _ in range(100)]
+        tree = FenwickTree(values)
+        for _ in range(200):
+            start = rng.randint(0, 100)
+            stop = rng.randint(start, 100)
+            self.assertEqual(tree.range(start, stop), sum(values[start:stop]))
+        for _ in range(50):
+            index, amount = rng.randrange(100), rng.randint(-3, 3)
+            tree.add(index, amount)
+            values[index] += amount
+        self.assertEqual(tree.values(), values)
+        self.assertEqual(tree.prefix(100), sum(values))
+
+
+class DateIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        start = date(2025, 1, 1)
+        self.daily = Counter()
+        for _ in range(300):
+            self.daily[start + timedelta(days=rng.randrange(60)), rng.choice('PNU')] += 1
+        self.index = DateIndex(dict(self.daily), version=0)
+
+    def plain_counts(self, date_from=None, date_to=None):
+        counts = Counter()
+        for (day, sentiment), count in self.daily.items():
+            if (date_from is None or day >= date_from) and (date_to is None or day <= date_to):
+                counts[sentiment] += count
+        return counts
+
+    def assertCountsMatch(self, date_from=None, date_to=None):
+        self.assertEqual(+self.index.counts(date_from, date_to), self.plain_counts(date_from, date_to))
+
+    def test_counts_match_a_plain_count(self):
+        self.assertCountsMatch()
+        self.assertCountsMatch(date(2025, 1, 10), date(2025, 1, 20))
+        self.assertCountsMatch(date(2024, 12, 1), date(2025, 1, 5))
+        self.assertCountsMatch(date(2025, 2, 20), None)
+        self.assertCountsMatch(None, date(2025, 1, 1))
+        self.assertCountsMatch(date(2026, 1, 1), None)
+        self.assertCountsMatch(date(2025, 1, 20), date(2025, 1, 10))
+
+    def test_add_outside_the_allocated_days(self):
+        for day in (date(2024, 11, 30), date(2025, 8, 1), date(2025, 1, 15)):
+            self.index.add(day, 'N', 2)
+            self.daily[day, 'N'] += 2
+        self.assertCountsMatch()
+        self.assertCountsMatch(date(2024, 11, 30), date(2024, 11, 30))
+        self.assertCountsMatch(date(2025, 3, 1), None)
+
+    def test_empty(self):
+        index = DateIndex({}, version=0)
+        self.assertEqual(index.counts(), Counter())
+        index.add(date(2025, 1, 1), 'P', 1)
+        self.assertEqual(index.counts(), Counter(P=1))
+
+
+class SentimentCountsTests(TestCase):
+    FILTERS = [
+        ResponseFilters(),
+        ResponseFilters(date_from='2025-01-10', date_to='2025-02-01'),
+        ResponseFilters(gender='F', date_from='2025-01-20'),
+        ResponseFilters(state='3', agegroup='2', date_to='2025-01-31'),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(responses=400)
+        rollups.rebuild()
+
+    def setUp(self):
+        dateindex.clear()
+
+    def assertMatchesCube(self):
+        for filters in self.FILTERS:
+            with self.subTest(filters.as_dict()):
+                self.assertEqual(+dateindex.sentiment_counts(1, filters), +cube.sentiment_counts(1, filters))
+
+    def test_matches_the_cube_after_writes(self):
+        self.assertMatchesCube()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_response(10 ** 6, 1, date(2025, 1, 15)).save()
+            make_response(10 ** 6 + 1, 1, date(2026, 6, 1), sentiment='N').save()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = Response.objects.filter(postid=1).order_by('responseid').first()
+            response.gender = 'F'
+            response.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Response.objects.filter(postid=1).order_by('responseid').last().delete()
+        self.assertMatchesCube()
+
+    def test_writes_from_other_processes(self):
+        self.assertMatchesCube()
+        # Not applied to the index in this process: the version check catches it
+        make_response(10 ** 6, 1, date(2025, 1, 15)).save()
+        with override_settings(DATE_INDEX_TTL=0):
+            self.assertMatchesCube()
+
+    def test_bad_dates(self):
+        self.assertIsNone(dateindex.sentiment_counts(1, ResponseFilters(date_from='yesterday')))
@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from dashboard import export
+from dashboard.filters import ResponseFilters
+from dashboard.models import Response
+
+from .utils import create_dataset
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(responses=800, days=20)
+        cls.user = get_user_model().objects.create(username='analyst')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def expected(self, **filters):
+        return list(
+            Response.objects.filter(postid=1, **filters).order_by('responsedate', 'responseid')
+            .values_list('responseid', flat=True)
+        )
+
+    def download(self, **params):
+        response = self.client.get(reverse('export_responses'), {'post': 1, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.download()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('post-1-responses.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8'))))
+        self.assertEqual(tuple(rows[0]), export.COLUMNS)
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.expected())
+        first = Response.objects.get(responseid=rows[1][0])
+        self.assertEqual(rows[1][2], first.responsedate.isoformat())
+        self.assertEqual(rows[1][-1], first.responsemessage)
+
+    def test_jsonl_with_filters(self):
+        response, content = self.download(format='jsonl', gender='F', state=2)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual([record['responseid'] for record in records], self.expected(gender='F', stateid=2))
+        self.assertEqual(set(records[0]), set(export.COLUMNS))
+
+    def test_resume_after_position(self):
+        expected = self.expected()
+        first = Response.objects.get(responseid=expected[99])
+        _, content = self.download(after=f'{first.responsedate.isoformat()}:{first.responseid}')
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8'))))
+        # No header on a resumed CSV: it is appended to the earlier download
+        self.assertEqual([int(row[0]) for row in rows], expected[100:])
+
+    @skipUnless(pq, 'Parquet export needs pyarrow')
+    def test_parquet_row_groups(self):
+        content = b''.join(export.stream(1, ResponseFilters(), 'parquet', chunk_size=40))
+        table = pq.read_table(io.BytesIO(content))
+        self.assertEqual(table.column('responseid').to_pylist(), self.expected())
+        self.assertIsInstance(table.column('responsedate')[0].as_py(), date)
+        groups = pq.ParquetFile(io.BytesIO(content)).metadata.num_row_groups
+        self.assertEqual(groups, -(-len(self.expected()) // 40))
+
+        response, content = self.download(format='parquet')
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertEqual(pq.read_table(io.BytesIO(content)).num_rows, len(self.expected()))
+
+    def test_chunks_stream_lazily(self):
+        read = []
+        chunks = export.stream(1, ResponseFilters(), 'csv', chunk_size=10,
+                               on_chunk=lambda rows, position: read.append(position))
+        next(chunks)
+        self.assertEqual(read, [])
+        next(chunks)
+        self.assertEqual(len(read), 1)
+
+    def test_bad_requests(self):
+        url = reverse('export_responses')
+        self.assertEqual(self.client.get(url, {'post': 1, 'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'post': 1, 'after': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'post': 999}).status_code, 404)
+
+    def test_command_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            full, partial = os.path.join(directory, 'full.csv'), os.path.join(directory, 'partial.csv')
+            call_command('export_responses', 1, output=full, chunk_size=40, stdout=io.StringIO())
+            with open(full, 'rb') as f:
+                expected = f.read()
+
+            # A run killed after two chunks, part way into writing the third
+            positions = []
+            chunks = export.stream(1, ResponseFilters(), 'csv', chunk_size=40,
+                                   on_chunk=lambda rows, position: positions.append(position))
+            written = next(chunks) + next(chunks)
+            next(chunks)
+            with open(partial, 'wb') as f:
+                f.write(written + b'123,half a row')
+            with open(partial + '.position', 'w', encoding='utf-8') as f:
+                json.dump({'position': positions[1], 'offset': len(written)}, f)
+
+            call_command('export_responses', 1, output=partial, chunk_size=40, resume=True, stdout=io.StringIO())
+            with open(partial, 'rb') as f:
+                self.assertEqual(f.read(), expected)
+            self.assertFalse(os.path.exists(partial + '.position'))
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from dashboard import geo
+
+
+class SimplifyTests(SimpleTestCase):
+    def test_collinear_points_are_dropped(self):
+        points = np.array([[0, 0], [1, 0.0001], [2, 0], [3, 1], [4, 0]], dtype=float)
+        self.assertEqual(geo._simplify(points, 0.01).tolist(), [[0, 0], [2, 0], [3, 1], [4, 0]])
+        self.assertEqual(len(geo._simplify(points, 0.00001)), 5)
+        self.assertEqual(geo._simplify(points, 10).tolist(), [[0, 0], [4, 0]])
+
+    def test_levels(self):
+        original = geo.load_states()['features']
+        sizes = []
+        for level in ('low', 'medium', 'high'):
+            content, digest = geo.variant(level)
+            features = json.loads(content)['features']
+            with self.subTest(level):
+                self.assertEqual([f['properties']['name'] for f in features],
+                                 [f['properties']['name'] for f in original])
+                for feature in features:
+                    polygons = feature['geometry']['coordinates']
+                    if feature['geometry']['type'] == 'Polygon':
+                        polygons = [polygons]
+                    for polygon in polygons:
+                        self.assertTrue(polygon)
+                        for ring in polygon:
+                            self.assertEqual(ring[0], ring[-1])
+            sizes.append(len(content))
+        self.assertLess(sizes[0], sizes[1])
+        self.assertLess(sizes[1], sizes[2])
+        self.assertLess(sizes[2], geo.GEOJSON_PATH.stat().st_size)
+
+    def test_level_for_zoom(self):
+        self.assertEqual([geo.level_for_zoom(zoom) for zoom in (3, 4.3, 6, 8)], ['low', 'low', 'medium', 'high'])
+
+
+class GeoJSONViewTests(SimpleTestCase):
+    def test_served_with_etag_and_immutable_caching(self):
+        url = reverse('malaysia_geojson', args=['medium'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, geo.variant('medium')[0])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(geo.variant('medium')[1], geo.variant_url('medium'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_level(self):
+        self.assertEqual(self.client.get(reverse('malaysia_geojson', args=['huge'])).status_code, 404)
@@ -0,0 +1,112 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from dashboard import ingest, rollups
+from dashboard.models import Post, Response
+
+from .utils import create_dataset
+
+
+FIELDS = ['responseid', 'postid', 'responsedate', 'responsemessage', 'username', 'agegroupid', 'gender',
+          'stateid', 'sentiment']
+
+
+def row(responseid, postid=1, **changes):
+    values = {
+        'responseid': responseid, 'postid': postid, 'responsedate': '2025-03-01',
+        'responsemessage': 'Good move by the ministry.', 'username': f'user{responseid}',
+        'agegroupid': 2, 'gender': 'F', 'stateid': 3, 'sentiment': 'P',
+    }
+    values.update(changes)
+    return values
+
+
+class IngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(responses=50)
+        rollups.rebuild()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_jsonl(self, rows, name='responses.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for values in rows:
+                f.write(json.dumps(values) + '\n')
+        return path
+
+    def write_csv(self, rows, name='responses.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def test_jsonl_and_csv(self):
+        stats = ingest.ingest(self.write_jsonl([row(1001), row(1002, sentiment='N')]), 'responses')
+        self.assertEqual((stats['rows'], stats['inserted'], stats['rejected']), (2, 2, 0))
+        stats = ingest.ingest(self.write_csv([row(1003, postid=2)]), 'responses')
+        self.assertEqual(stats['inserted'], 1)
+        self.assertEqual(Response.objects.get(pk=1003).postid_id, 2)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_invalid_rows_are_rejected(self):
+        rejected = []
+        rows = [
+            row(1001, postid=404), row(1002, gender='X'), row(1003, responsedate='yesterday'),
+            row(1004, sentiment='X'), row(1005, agegroupid='', stateid='', gender=''),
+            # Left for classify_responses
+            row(1006, sentiment=''),
+        ]
+        stats = ingest.ingest(self.write_jsonl(rows), 'responses',
+                              on_reject=lambda values, error: rejected.append(str(error)))
+        self.assertEqual((stats['inserted'], stats['rejected']), (2, 4))
+        self.assertEqual(len(rejected), 4)
+        self.assertIn('unknown postid 404', rejected)
+        response = Response.objects.get(pk=1005)
+        self.assertEqual((response.agegroupid_id, response.stateid_id, response.gender), (0, 0, 'N'))
+
+    def test_rerunning_a_file_inserts_nothing(self):
+        path = self.write_jsonl([row(1001), row(1002), row(1001, sentiment='N'), row(1)])
+        stats = ingest.ingest(path, 'responses')
+        self.assertEqual((stats['inserted'], stats['duplicates']), (2, 2))
+        self.assertEqual(Response.objects.get(pk=1001).sentiment, 'P')
+        stats = ingest.ingest(path, 'responses')
+        self.assertEqual((stats['inserted'], stats['duplicates']), (0, 4))
+        self.assertEqual(rollups.verify(), [])
+
+    def test_resume_from_checkpoint(self):
+        path = self.write_jsonl([row(1000 + i) for i in range(10)])
+        checkpoint = ingest.Checkpoint(path + '.checkpoint')
+
+        def stop_after_two(stats):
+            if stats['rows'] == 4:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            ingest.ingest(path, 'responses', batch_size=2, checkpoint=checkpoint, on_batch=stop_after_two)
+        self.assertEqual(checkpoint.load()['rows'], 4)
+
+        stats = ingest.ingest(path, 'responses', batch_size=2, checkpoint=checkpoint, resume=True)
+        self.assertEqual((stats['rows'], stats['inserted'], stats['duplicates']), (10, 10, 0))
+        self.assertIsNone(checkpoint.load())
+        self.assertEqual(Response.objects.filter(pk__gte=1000).count(), 10)
+
+    def test_posts(self):
+        path = self.write_jsonl([
+            {'postid': 10, 'clusterid': 1, 'postdate': '2025-03-01', 'postlink': 'https://example.com/10', 'postmessage': 'New'},
+            {'postid': 11, 'clusterid': 404, 'postdate': '2025-03-01', 'postlink': 'https://example.com/10', 'postmessage': 'New'},
+        ], name='posts.jsonl')
+        stats = ingest.ingest(path, 'posts')
+        self.assertEqual((stats['inserted'], stats['rejected']), (1, 1))
+        self.assertTrue(Post.objects.filter(pk=10).exists())
+        self.assertEqual(rollups.verify(), [])
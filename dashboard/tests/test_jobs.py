@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard import jobs, roles, rollups
+from dashboard.models import AppUser, Cluster, Job, Post, Response
+
+from .utils import create_dataset, plain_static_files
+
+
+@jobs.task('test_fails', max_attempts=2)
+def _failing_task(job):
+    raise RuntimeError('always fails')
+
+
+@jobs.task('test_succeeds')
+def _succeeding_task(job, value):
+    return {'value': value}
+
+
+class JobTests(TestCase):
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+
+    def test_success(self):
+        job = Job.objects.create(task='test_succeeds', arguments={'value': 3}, max_attempts=3,
+                                 run_after=timezone.now())
+        claimed = jobs.claim('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(jobs.claim('worker-2'))
+        self.assertTrue(jobs.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.DONE, {'value': 3}, 1))
+
+    def test_retry_then_failure(self):
+        job = Job.objects.create(task='test_fails', max_attempts=2, run_after=timezone.now())
+        claimed = jobs.claim('worker-1')
+        self.assertFalse(jobs.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('always fails', job.error)
+        # Not due again until the backoff has passed
+        self.assertIsNone(jobs.claim('worker-1'))
+
+        self.make_due(job)
+        claimed = jobs.claim('worker-1')
+        jobs.finish(claimed, error='still failing', retry=claimed.attempts < claimed.max_attempts)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.FAILED, 2, 'still failing'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_finish_ignores_jobs_claimed_by_another_worker(self):
+        job = Job.objects.create(task='test_succeeds', arguments={'value': 1}, max_attempts=3,
+                                 run_after=timezone.now())
+        claimed = jobs.claim('worker-1')
+        Job.objects.filter(pk=job.pk).update(worker='worker-2')
+        jobs.finish(claimed, result={'value': 1})
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+
+    def test_stale_jobs_are_requeued(self):
+        job = Job.objects.create(task='test_succeeds', arguments={'value': 1}, max_attempts=3,
+                                 run_after=timezone.now())
+        jobs.claim('worker-1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+
+@plain_static_files
+class JobViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+        AppUser.objects.create(username='admin', passwrd='secret', usertype=roles.ADMIN_USERTYPE)
+        AppUser.objects.create(username='analyst', passwrd='secret', usertype=2)
+
+    def login(self, username):
+        self.client.post(reverse('login'), {'username': username, 'password': 'secret'})
+
+    def test_delete_runs_inline_without_workers(self):
+        self.login('admin')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('delete_post', args=[1]), follow=True)
+        self.assertContains(response, 'Post deleted.')
+        self.assertNotContains(response, 'queued')
+        self.assertFalse(Post.objects.filter(pk=1).exists())
+        self.assertFalse(Response.objects.filter(postid=1).exists())
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(rollups.verify(), [])
+
+    @override_settings(BACKGROUND_JOBS=True)
+    def test_delete_is_left_to_a_worker(self):
+        self.login('admin')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('delete_cluster', args=[2]), follow=True)
+        self.assertTrue(Cluster.objects.filter(pk=2).exists())
+        job = Job.objects.get()
+        self.assertContains(response, f'Cluster deletion queued as job #{job.pk}.')
+        self.assertEqual((job.status, job.priority, job.username), (Job.QUEUED, 10, 'admin'))
+
+        self.assertTrue(jobs.run(jobs.claim('worker-1')))
+        self.assertFalse(Cluster.objects.filter(pk=2).exists())
+        self.assertFalse(Post.objects.filter(clusterid=2).exists())
+        self.assertEqual(rollups.verify(), [])
+
+    def test_job_status_api(self):
+        job = jobs.enqueue('test_succeeds', username='analyst', value=1)
+        url = reverse('api_job_status', args=[job.pk])
+        self.login('analyst')
+        data = self.client.get(url).json()
+        self.assertEqual((data['id'], data['status']), (job.pk, Job.QUEUED))
+
+        other = jobs.enqueue('test_succeeds', username='admin', value=2)
+        self.assertEqual(self.client.get(reverse('api_job_status', args=[other.pk])).status_code, 403)
+        self.login('admin')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(BACKGROUND_JOBS=True, JOB_STALE_SECONDS=60)
+    def test_unclaimed_jobs_warning(self):
+        self.login('admin')
+        job = jobs.enqueue('test_succeeds', value=1)
+        self.assertNotContains(self.client.get(reverse('manage_jobs')), 'without a worker')
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now() - timedelta(minutes=5))
+        self.assertContains(self.client.get(reverse('manage_jobs')), '1 job has been waiting without a worker')
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from dashboard import metrics, roles, rollups
+from dashboard.models import AppUser
+
+from .utils import create_dataset
+
+
+def samples():
+    """The current samples of every registered metric, by series."""
+    values = {}
+    for line in metrics.expose().splitlines():
+        if not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            values[series] = float(value)
+    return values
+
+
+class RegistryTests(SimpleTestCase):
+    def test_counter(self):
+        counter = metrics.Counter('test_total', 'Help.', ['chart', 'result'])
+        counter.inc('sentiment', 'hit')
+        counter.inc('sentiment', 'hit', amount=2)
+        counter.inc('gender', 'miss')
+        self.assertEqual(list(counter.samples()), [
+            'test_total{chart="gender",result="miss"} 1',
+            'test_total{chart="sentiment",result="hit"} 3',
+        ])
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('test_seconds', 'Help.', ['view'], (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe('home', value=value)
+        self.assertEqual(list(histogram.samples()), [
+            'test_seconds_bucket{view="home",le="0.1"} 2',
+            'test_seconds_bucket{view="home",le="1.0"} 3',
+            'test_seconds_bucket{view="home",le="+Inf"} 4',
+            'test_seconds_sum{view="home"} 3.65',
+            'test_seconds_count{view="home"} 4',
+        ])
+
+    def test_label_values_are_escaped(self):
+        counter = metrics.Counter('test_total', 'Help.', ['view'])
+        counter.inc('a "quoted"\\view\n')
+        self.assertEqual(list(counter.samples()), ['test_total{view="a \\"quoted\\"\\\\view\\n"} 1'])
+
+
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+        AppUser.objects.create(username='admin', passwrd='secret', usertype=roles.ADMIN_USERTYPE)
+        AppUser.objects.create(username='analyst', passwrd='secret', usertype=2)
+        get_user_model().objects.create(username='admin')
+        get_user_model().objects.create(username='analyst')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username):
+        self.client.post(reverse('login'), {'username': username, 'password': 'secret'})
+
+    def test_requests_are_recorded(self):
+        self.login('analyst')
+        series = 'dashboard_request_duration_seconds_count{view="api_post_sentiment"}'
+        queries = 'dashboard_sql_queries_count{view="api_post_sentiment"}'
+        before = samples()
+        response = self.client.get(reverse('api_post_sentiment', args=[1]))
+        after = samples()
+        self.assertEqual(after[series] - before.get(series, 0), 1)
+        self.assertEqual(after[queries] - before.get(queries, 0), 1)
+        self.assertGreater(after['dashboard_sql_queries_sum{view="api_post_sentiment"}'],
+                           before.get('dashboard_sql_queries_sum{view="api_post_sentiment"}', 0))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_server_timing_for_admins(self):
+        self.login('admin')
+        response = self.client.get(reverse('api_post_sentiment', args=[1]))
+        self.assertRegex(response['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ queries", chart;dur=')
+        with override_settings(METRICS_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('api_post_sentiment', args=[1])))
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_endpoint_is_for_admins_and_allowed_ips(self):
+        url = reverse('metrics')
+        self.assertEqual(url, '/metrics/')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.6').status_code, 403)
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE dashboard_request_duration_seconds histogram', response.content.decode())
+
+        self.login('analyst')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.6').status_code, 403)
+        self.client.logout()
+        self.login('admin')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.6').status_code, 200)
@@ -0,0 +1,68 @@
+from django.core import signing
+from django.test import TestCase
+
+from dashboard import pagination
+from dashboard.models import Response
+
+from .utils import create_dataset
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Many responses share a day, so the responseid tie-break matters
+        create_dataset(responses=300, days=20)
+
+    def setUp(self):
+        self.expected = list(
+            Response.objects.filter(postid=1).order_by('-responsedate', '-responseid')
+            .values_list('responseid', flat=True)
+        )
+        self.total = len(self.expected)
+
+    def page(self, cursor, per_page=7):
+        return pagination.paginate([Response.objects.filter(postid=1)], cursor, per_page, self.total)
+
+    def ids(self, page):
+        return [response.responseid for response in page]
+
+    def test_forward_and_back(self):
+        seen, cursor, starts = [], None, []
+        while True:
+            page = self.page(cursor)
+            starts.append(page.start_index)
+            seen += self.ids(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(starts, list(range(1, self.total + 1, 7)))
+        self.assertEqual(page.number, page.num_pages)
+
+        seen, cursor = [], page.last_cursor
+        while True:
+            page = self.page(cursor)
+            seen = self.ids(page) + seen
+            if not page.has_previous:
+                break
+            cursor = page.previous_cursor
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(page.start_index, 1)
+
+    def test_last_page(self):
+        page = self.page(self.page(None).last_cursor)
+        size = self.total % 7 or 7
+        self.assertEqual(self.ids(page), self.expected[-size:])
+        self.assertEqual(page.start_index, self.total - size + 1)
+        self.assertFalse(page.has_next)
+
+    def test_tampered_cursor_means_first_page(self):
+        token = self.page(None, per_page=5).next_cursor
+        self.assertEqual(pagination.decode_cursor(token)['start'], 6)
+        forged = signing.dumps({'after': ['2000-01-01', 0], 'start': 6}, salt='another salt')
+        for bad in (token[:-2] + 'xx', forged, 'garbage'):
+            self.assertEqual(pagination.decode_cursor(bad), {})
+            page = self.page(bad, per_page=5)
+            self.assertEqual(self.ids(page), self.expected[:5])
+            self.assertEqual(page.start_index, 1)
+            self.assertFalse(page.has_previous)
@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase, TestCase
+
+from dashboard import benchmark, queryplans, synthetic
+
+from .utils import plain_static_files
+
+
+class PlanProblemsTests(SimpleTestCase):
+    SQL = 'SELECT * FROM "response" WHERE "response"."postid" = 1 ORDER BY "response"."responsedate" DESC'
+
+    def test_sqlite(self):
+        self.assertEqual(queryplans.plan_problems(self.SQL, [
+            'SEARCH response USING INDEX response_post_date_idx (postid=?)',
+        ]), [])
+        self.assertEqual(queryplans.plan_problems(self.SQL, ['SCAN response', 'USE TEMP B-TREE FOR ORDER BY']), [
+            'full scan: SCAN response', 'filesort: USE TEMP B-TREE FOR ORDER BY',
+        ])
+
+    def test_mysql(self):
+        self.assertEqual(queryplans.plan_problems(self.SQL, [{'table': 'response', 'type': 'ref', 'Extra': None}]), [])
+        self.assertEqual(len(queryplans.plan_problems(self.SQL, [
+            {'table': 'response', 'type': 'ALL', 'Extra': 'Using where; Using filesort'},
+        ])), 2)
+
+    def test_small_tables_are_not_checked(self):
+        self.assertEqual(queryplans.plan_problems('SELECT * FROM "post"', ['SCAN post']), [])
+
+
+@plain_static_files
+class QueryPlanTests(TestCase):
+    # A smaller dataset than `manage.py check_query_plans` loads, but large
+    # enough for the planner to prefer the indexes it should
+    @classmethod
+    def setUpTestData(cls):
+        synthetic.generate(20000, posts=10, seed=0)
+        queryplans.analyze()
+
+    def test_analytics_queries_use_indexes(self):
+        for name, queries, problems in queryplans.check(benchmark.busiest_post()):
+            with self.subTest(name):
+                self.assertEqual(problems, [])
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from dashboard import roles
+from dashboard.authentication import AppUserBackend
+from dashboard.models import AppUser
+
+from .utils import plain_static_files
+
+
+@plain_static_files
+class RoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        AppUser.objects.create(username='admin', passwrd='secret', usertype=roles.ADMIN_USERTYPE)
+        AppUser.objects.create(username='analyst', passwrd='secret', usertype=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username):
+        response = self.client.post(reverse('login'), {'username': username, 'password': 'secret'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+    def can_manage(self):
+        response = self.client.get(reverse('manage_clusters'))
+        return response.status_code == 200
+
+    def session_request(self):
+        request = RequestFactory().get('/')
+        request.user = get_user_model().objects.get(username='admin')
+        request.session = self.client.session
+        return request
+
+    def test_login_checks_the_password(self):
+        response = self.client.post(reverse('login'), {'username': 'admin', 'password': 'wrong'})
+        self.assertContains(response, 'Invalid credentials')
+
+    def test_role_comes_from_the_session(self):
+        self.login('admin')
+        self.assertTrue(self.can_manage())
+        request = self.session_request()
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.is_admin(request))
+
+        self.client.logout()
+        self.login('analyst')
+        self.assertFalse(self.can_manage())
+
+    def test_revoked_role_rejects_the_existing_session(self):
+        self.login('admin')
+        self.assertTrue(self.can_manage())
+        AppUser.objects.filter(username='admin').update(usertype=2)
+        # Edits that bypass the signals only take effect once the epoch is dropped
+        self.assertTrue(self.can_manage())
+        roles.invalidate('admin')
+        self.assertFalse(self.can_manage())
+
+        admin = AppUser.objects.get(username='admin')
+        admin.usertype = roles.ADMIN_USERTYPE
+        admin.save()
+        self.assertTrue(self.can_manage())
+
+    def test_deleted_appuser(self):
+        self.login('admin')
+        AppUser.objects.filter(username='admin').get().delete()
+        self.assertFalse(self.can_manage())
+
+    def test_cached_user_is_evicted_on_save(self):
+        user = get_user_model().objects.create(username='someone')
+        backend = AppUserBackend()
+        self.assertEqual(backend.get_user(user.pk).username, 'someone')
+        with self.assertNumQueries(0):
+            backend.get_user(user.pk)
+        user.is_active = False
+        user.save()
+        self.assertFalse(backend.get_user(user.pk).is_active)
+
+
+class SharedCacheCheckTests(TestCase):
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_warns_about_a_process_local_cache(self):
+        self.assertEqual([warning.id for warning in roles.check_shared_cache(None)], ['dashboard.W001'])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                           'LOCATION': 'redis://127.0.0.1:6379/0'}})
+    def test_shared_cache(self):
+        self.assertEqual(roles.check_shared_cache(None), [])
@@ -0,0 +1,75 @@
+from datetime import date
+
+from django.test import TestCase
+
+from dashboard import rollups
+from dashboard.models import Cluster, ClusterDaily, ClusterRollup, GlobalRollup, Post, PostRollup, Response
+
+from .utils import create_dataset, make_response
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset()
+        rollups.rebuild()
+
+    def assertConsistent(self):
+        self.assertEqual(rollups.verify(), [])
+
+    def test_rebuild_matches_the_responses(self):
+        self.assertConsistent()
+        self.assertEqual(GlobalRollup.objects.get().total, Response.objects.count())
+
+    def test_create_update_delete(self):
+        response = make_response(10 ** 6, 1, date(2025, 3, 1))
+        response.save()
+        self.assertConsistent()
+
+        response.sentiment = 'N'
+        response.postid_id = 2
+        response.save()
+        self.assertConsistent()
+
+        response.delete()
+        self.assertConsistent()
+
+    def test_queryset_delete(self):
+        ids = list(Response.objects.filter(postid=1).values_list('responseid', flat=True)[:5])
+        Response.objects.filter(responseid__in=ids).delete()
+        self.assertConsistent()
+
+    def test_new_post_and_cluster(self):
+        cluster = Cluster.objects.create(clusterid=99, clustername='New')
+        Post.objects.create(postid=99, clusterid=cluster, postdate=date(2025, 3, 1), postlink='', postmessage='New')
+        make_response(10 ** 6, 99, date(2025, 3, 1)).save()
+        self.assertConsistent()
+        self.assertEqual(PostRollup.objects.get(pk=99).total, 1)
+
+    def test_move_post(self):
+        post = Post.objects.get(pk=1)
+        post.clusterid_id = 2
+        post.save()
+        self.assertConsistent()
+        self.assertEqual(PostRollup.objects.get(pk=1).clusterid_id, 2)
+        self.assertEqual(ClusterRollup.objects.get(pk=1).posts, 1)
+        self.assertEqual(ClusterRollup.objects.get(pk=1).total, Response.objects.filter(postid=3).count())
+        self.assertEqual(
+            sum(ClusterDaily.objects.filter(clusterid=2).values_list('total', flat=True)),
+            Response.objects.filter(postid__in=[1, 2, 4]).count(),
+        )
+
+        # Responses written after the move are counted in the new cluster
+        make_response(10 ** 6, 1, date(2025, 3, 1)).save()
+        self.assertConsistent()
+
+    def test_delete_post_and_cluster(self):
+        Post.objects.get(pk=1).delete()
+        self.assertConsistent()
+        Cluster.objects.get(pk=2).delete()
+        self.assertConsistent()
+        self.assertEqual(GlobalRollup.objects.get().posts, 1)
+
+    def test_verify_reports_drift(self):
+        PostRollup.objects.filter(pk=1).update(total=0)
+        self.assertTrue(any(mismatch.startswith('post 1: total') for mismatch in rollups.verify()))
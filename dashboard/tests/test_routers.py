@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from dashboard import routers
+from dashboard.middleware import ReplicaPinMiddleware
+from dashboard.models import Post
+
+REPLICAS = ['replica1', 'replica2']
+
+
+# SimpleTestCase: TestCase wraps each test in a transaction, which reads the primary
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    # For transaction.atomic() in test_primary_reads
+    databases = {'default'}
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def read(self, model=Post):
+        return self.router.db_for_read(model)
+
+    def write(self):
+        return self.router.db_for_write(Post)
+
+    def test_outside_a_scope_everything_is_primary(self):
+        self.assertEqual(self.read(), 'default')
+        self.assertEqual(self.write(), 'default')
+        # Nothing is left behind for later reads in this context
+        self.assertIsNone(routers._pin.get())
+
+    def test_one_replica_per_scope(self):
+        chosen = set()
+        for _ in range(20):
+            with routers.scope():
+                reads = {self.read() for _ in range(5)}
+            self.assertEqual(len(reads), 1)
+            chosen |= reads
+        self.assertEqual(chosen, set(REPLICAS))
+        self.assertIsNone(routers._pin.get())
+
+    def test_primary_after_a_write(self):
+        with routers.scope() as pin:
+            self.assertIn(self.read(), REPLICAS)
+            self.assertEqual(self.write(), 'default')
+            self.assertEqual(self.read(), 'default')
+        self.assertTrue(pin.wrote)
+        with routers.scope() as pin:
+            self.assertIn(self.read(), REPLICAS)
+        self.assertFalse(pin.wrote)
+
+    def test_primary_reads(self):
+        with routers.scope(primary=True):
+            self.assertEqual(self.read(), 'default')
+        with routers.scope(), transaction.atomic():
+            self.assertEqual(self.read(), 'default')
+        with routers.primary():
+            self.assertEqual(self.read(), 'default')
+            # Scopes opened inside the block read the primary too
+            with routers.scope():
+                self.assertEqual(self.read(), 'default')
+
+    def test_other_apps_are_not_routed(self):
+        with routers.scope():
+            self.assertIsNone(self.read(get_user_model()))
+        self.assertFalse(self.router.allow_migrate('replica1', 'dashboard'))
+        self.assertIsNone(self.router.allow_migrate('default', 'dashboard'))
+
+    def test_carry(self):
+        def reads():
+            for _ in range(3):
+                yield self.read()
+
+        with routers.scope() as pin:
+            body = routers.carry(reads())
+        # Read after the scope ended, from the scope's replica
+        self.assertEqual(list(body), [pin.replica] * 3)
+        self.assertIsNone(routers._pin.get())
+        self.assertEqual(list(routers.carry(reads())), ['default'] * 3)
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=5)
+class ReplicaPinMiddlewareTests(SimpleTestCase):
+    def request(self, method='get', cookies=None, write=False):
+        reads = []
+
+        def view(request):
+            reads.append(routers.ReplicaRouter().db_for_read(Post))
+            if write:
+                routers.ReplicaRouter().db_for_write(Post)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaPinMiddleware(view)(request)
+        return reads[0], response
+
+    def test_reads_and_pin_cookie(self):
+        read, response = self.request()
+        self.assertIn(read, REPLICAS)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+        read, response = self.request('post', write=True)
+        self.assertEqual(read, 'default')
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], 5)
+
+        read, response = self.request(cookies={routers.PIN_COOKIE: '1'})
+        self.assertEqual(read, 'default')
+        self.assertIsNone(routers._pin.get())
+
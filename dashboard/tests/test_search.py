@@ -0,0 +1,62 @@
+from collections import Counter
+
+from django.test import SimpleTestCase, TestCase
+
+from dashboard import search
+from dashboard.filters import ResponseFilters
+from dashboard.models import Response
+
+from .utils import create_dataset
+
+
+class SearchParseTests(SimpleTestCase):
+    def test_words_and_phrases(self):
+        self.assertEqual(search.parse('good money'), [['good'], ['money']])
+        self.assertEqual(search.parse('"waste of public" money'), [['waste', 'of', 'public'], ['money']])
+        self.assertEqual(search.parse('well-done, "Tak  setuju!"'), [['well'], ['done'], ['Tak', 'setuju']])
+
+    def test_blank_queries(self):
+        self.assertEqual(search.parse(''), [])
+        self.assertEqual(search.parse('   ""  "!!" ,'), [])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(responses=200)
+
+    def matching(self, phrase, **filters):
+        return sorted(
+            response.responseid for response in Response.objects.filter(**filters)
+            if all(word in response.responsemessage.lower() for word in phrase.split('|'))
+        )
+
+    def search(self, query, **filters):
+        queryset = ResponseFilters(q=query).apply(Response.objects.filter(**filters))
+        return sorted(queryset.values_list('responseid', flat=True))
+
+    def test_words_and_phrases(self):
+        self.assertEqual(self.search('kecewa'), self.matching('kecewa'))
+        self.assertEqual(self.search('"waste of public"'), self.matching('waste of public'))
+        self.assertEqual(self.search('money setuju'), self.matching('money|setuju'))
+        self.assertEqual(self.search('"public waste"'), [])
+        self.assertTrue(self.search('MONEY'))
+
+    def test_blank_query_matches_everything(self):
+        self.assertEqual(len(self.search('  ')), Response.objects.count())
+
+    def test_index_follows_writes(self):
+        response = Response.objects.filter(postid=1).first()
+        response.responsemessage = 'Jambatan baru sudah siap'
+        response.save()
+        self.assertEqual(self.search('jambatan'), [response.responseid])
+        response.delete()
+        self.assertEqual(self.search('jambatan'), [])
+
+    def test_sentiment_counts(self):
+        for query, phrase in (('kecewa', 'kecewa'), ('"waste of public"', 'waste of public')):
+            expected = Counter(
+                Response.objects.filter(responseid__in=self.matching(phrase, postid=1))
+                .values_list('sentiment', flat=True)
+            )
+            self.assertEqual(search.sentiment_counts(1, ResponseFilters(q=query)), expected)
@@ -0,0 +1,86 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from dashboard import staticfiles
+
+STYLESHEET = 'body { color: #333; }\n' * 200
+
+
+class ServeTests(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        with open(os.path.join(self.source, 'site.css'), 'w') as f:
+            f.write(STYLESHEET)
+        with open(os.path.join(self.source, 'tiny.css'), 'w') as f:
+            f.write('p {}\n')
+
+        settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'dashboard.staticfiles.CompressedManifestStaticFilesStorage'},
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        staticfiles._hashed_names.cache_clear()
+        self.addCleanup(staticfiles._hashed_names.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name('site.css')
+
+    def serve(self, path, accept_encoding=None):
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding is not None else {}
+        response = staticfiles.serve(RequestFactory().get('/static/' + path, **headers), path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_compressed_variants_are_written(self):
+        path = os.path.join(self.root, self.hashed)
+        with open(path + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), STYLESHEET)
+        tiny = staticfiles_storage.stored_name('tiny.css')
+        self.assertFalse(os.path.exists(os.path.join(self.root, tiny + '.gz')))
+
+    @skipUnless(staticfiles.brotli, 'Brotli is not installed')
+    def test_encoding_follows_accept_encoding(self):
+        cases = (
+            ('gzip, deflate, br', 'br'),
+            ('gzip', 'gzip'),
+            ('br;q=0, gzip;q=0.5', 'gzip'),
+            ('identity', None),
+            (None, None),
+        )
+        for accept_encoding, expected in cases:
+            with self.subTest(accept_encoding):
+                response = self.serve(self.hashed, accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), expected)
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertIn('Accept-Encoding', response['Vary'])
+                content = b''.join(response.streaming_content)
+                if expected == 'gzip':
+                    content = gzip.decompress(content)
+                elif expected == 'br':
+                    content = staticfiles.brotli.decompress(content)
+                self.assertEqual(content.decode(), STYLESHEET)
+
+    def test_cache_headers(self):
+        self.assertEqual(self.serve(self.hashed)['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(self.serve('site.css')['Cache-Control'], 'public, max-age=300')
+
+    def test_missing_and_outside_files(self):
+        for path in ('missing.css', '../' + os.path.basename(self.source) + '/site.css'):
+            with self.subTest(path), self.assertRaises(Http404):
+                self.serve(path)
@@ -0,0 +1,18 @@
+from django.test import TestCase
+
+from dashboard import rollups, synthetic
+from dashboard.models import Post, Response
+
+
+class GenerateTests(TestCase):
+    def test_appends_a_consistent_dataset(self):
+        synthetic.generate(1000, posts=5, clusters=2, seed=1)
+        self.assertEqual((Response.objects.count(), Post.objects.count()), (1000, 5))
+        first = list(Response.objects.order_by('responseid').values_list('postid', 'responsedate', 'sentiment'))
+
+        synthetic.generate(1000, posts=5, clusters=2, seed=1)
+        self.assertEqual((Response.objects.count(), Post.objects.count()), (2000, 5 * 2))
+        self.assertEqual(rollups.verify(), [])
+        # Same seed, same shape, new ids
+        second = list(Response.objects.order_by('responseid').values_list('responsedate', 'sentiment')[1000:])
+        self.assertEqual(second, [(day, sentiment) for postid, day, sentiment in first])
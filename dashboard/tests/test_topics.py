@@ -0,0 +1,93 @@
+import io
+from collections import Counter, defaultdict
+from datetime import date
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from dashboard import rollups, topics
+from dashboard.classifier import tokenize
+from dashboard.models import Response, ResponseTopic, Topic, TopicFit
+
+from .utils import create_dataset, make_response
+
+
+class TopicModelTests(SimpleTestCase):
+    def setUp(self):
+        messages = ['jalan raya rosak teruk'] * 20 + ['harga minyak naik lagi'] * 20 + ['sekolah guru murid'] * 20
+        self.documents = [tokenize(message) for message in messages]
+        self.terms, self.idf = topics.fit_vocabulary(self.documents)
+        self.rows = topics.vectorize(self.documents, self.terms, self.idf)
+
+    def test_vocabulary_and_rows(self):
+        self.assertNotIn('lagi', self.terms)  # stopword
+        self.assertIn('minyak', self.terms)
+        self.assertEqual(len(self.rows), 60)
+        row = self.rows.take([0])
+        self.assertAlmostEqual(float(np.sum(row.data ** 2)), 1.0)
+
+    def test_kmeans_separates_topics(self):
+        centroids = topics.mini_batch_kmeans(self.rows, 3, seed=0)
+        labels = topics.assign(self.rows, centroids)
+        self.assertEqual([len(set(labels[i:i + 20])) for i in (0, 20, 40)], [1, 1, 1])
+        self.assertEqual(len(set(labels)), 3)
+        self.assertEqual(set(topics.top_terms(centroids[labels[20]], self.terms)), {'harga', 'minyak', 'naik'})
+
+    def test_rows_without_known_terms(self):
+        rows = topics.vectorize([tokenize('tiada kaitan langsung')], self.terms, self.idf)
+        centroids = topics.mini_batch_kmeans(self.rows, 3, seed=0)
+        self.assertEqual(topics.assign(rows, centroids).tolist(), [-1])
+
+
+class ExtractTopicsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_dataset(responses=400)
+        rollups.rebuild()
+
+    def extract(self, **options):
+        call_command('extract_topics', workers=1, min_responses=1, topics=4, stdout=io.StringIO(), **options)
+
+    def topic_of(self):
+        return dict(ResponseTopic.objects.values_list('responseid', 'topic'))
+
+    def test_fit_assigns_every_response(self):
+        self.extract()
+        self.assertEqual(TopicFit.objects.count(), 4)
+        assigned = self.topic_of()
+        self.assertEqual(set(assigned), set(Response.objects.values_list('responseid', flat=True)))
+
+        # The same message always lands in the same topic of its post
+        by_message = defaultdict(set)
+        for response in Response.objects.all():
+            by_message[response.postid_id, response.responsemessage].add(assigned[response.responseid])
+        self.assertTrue(all(len(found) == 1 for found in by_message.values()))
+
+        for topic in Topic.objects.all():
+            labels = Counter(
+                Response.objects.filter(topic_assignment__topic=topic).values_list('sentiment', flat=True)
+            )
+            self.assertEqual((topic.total, topic.positive, topic.negative, topic.neutral),
+                             (sum(labels.values()), labels['P'], labels['N'], labels['U']))
+        sizes = list(Topic.objects.filter(postid=1).order_by('number').values_list('total', flat=True))
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+
+    def test_later_runs_only_assign_new_responses(self):
+        self.extract()
+        topic_ids = set(Topic.objects.values_list('id', flat=True))
+        before = self.topic_of()
+        same = Response.objects.filter(postid=1).first()
+        make_response(10 ** 6, 1, date(2025, 3, 1)).save()
+        Response.objects.filter(responseid=10 ** 6).update(responsemessage=same.responsemessage)
+
+        self.extract()
+        self.assertEqual(set(Topic.objects.values_list('id', flat=True)), topic_ids)
+        after = self.topic_of()
+        self.assertEqual(after[10 ** 6], before[same.responseid])
+        del after[10 ** 6]
+        self.assertEqual(after, before)
+
+        self.extract(refit=True)
+        self.assertFalse(topic_ids & set(Topic.objects.values_list('id', flat=True)))
+        self.assertIn(10 ** 6, self.topic_of())
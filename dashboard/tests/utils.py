@@ -0,0 +1,62 @@
+import random
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.test import override_settings
+
+from dashboard.models import AgeGroup, Cluster, Post, Response, State
+
+
+MESSAGES = [
+    'Great initiative, well done!',
+    'Sangat kecewa dengan keputusan ini.',
+    'This is a waste of public money.',
+    'Tak setuju, the money could go elsewhere.',
+    'Good move by the ministry.',
+    'Not sure what to think yet.',
+]
+
+# The manifest storage only knows assets once collectstatic has run; pages
+# rendered in tests link them under their plain names instead
+plain_static_files = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def create_code_tables():
+    # AgeGroup is unmanaged, so TransactionTestCase does not empty it
+    if not AgeGroup.objects.exists():
+        AgeGroup.objects.bulk_create([AgeGroup(agegroupid=i, agegroup=f'Group {i}') for i in range(4)])
+    if not State.objects.exists():
+        State.objects.bulk_create([State(stateid=i, statename=f'State {i}') for i in range(6)])
+
+
+def create_dataset(posts=4, clusters=2, responses=200, start=date(2025, 1, 1), days=60, seed=0):
+    """Clusters, posts and `responses` responses spread over them, without going through the signals.
+
+    Callers that need the rollups rebuild them afterwards.
+    """
+    rng = random.Random(seed)
+    create_code_tables()
+    Cluster.objects.bulk_create([Cluster(clusterid=i, clustername=f'Cluster {i}') for i in range(1, clusters + 1)])
+    Post.objects.bulk_create([
+        Post(postid=i, clusterid_id=(i - 1) % clusters + 1, postdate=start, postlink=f'https://example.com/{i}',
+             postmessage=f'Post {i}')
+        for i in range(1, posts + 1)
+    ])
+    Response.objects.bulk_create([
+        Response(
+            responseid=i, postid_id=rng.randint(1, posts), responsedate=start + timedelta(days=rng.randrange(days)),
+            responsemessage=rng.choice(MESSAGES), username=f'user{i}', agegroupid_id=rng.randrange(4),
+            gender=rng.choice('MFON'), stateid_id=rng.randrange(6), sentiment=rng.choice('PNU'),
+        )
+        for i in range(1, responses + 1)
+    ])
+
+
+def make_response(responseid, postid, day, sentiment='P', gender='F'):
+    return Response(
+        responseid=responseid, postid_id=postid, responsedate=day, responsemessage=MESSAGES[0],
+        username=f'user{responseid}', agegroupid_id=1, gender=gender, stateid_id=4, sentiment=sentiment,
+    )
@@ -0,0 +1,230 @@
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .classifier import NEGATORS, tokenize
+
+
+# Offline topic extraction for `manage.py extract_topics`. The responses of
+# a post are turned into L2-normalised TF-IDF rows over the post's own
+# vocabulary and grouped by spherical mini-batch k-means; each topic is
+# described by the heaviest terms of its centroid. The vocabulary, IDF
+# weights and centroids are stored, so responses added later are assigned
+# to the nearest existing topic without refitting. Posts are fitted in
+# parallel across a process pool. No database access happens here.
+
+TOPICS = 8
+MAX_FEATURES = 5000
+# Terms must appear in at least MIN_DF responses and at most MAX_DF of them
+MIN_DF = 3
+MAX_DF = 0.5
+MIN_TERM_LENGTH = 3
+BATCH_SIZE = 1024
+MAX_BATCHES = 200
+INIT_SAMPLE = 1000
+TOP_TERMS = 5
+
+STOPWORDS = frozenset({
+    # English
+    'the', 'and', 'for', 'are', 'but', 'you', 'all', 'any', 'can', 'had', 'her', 'was', 'one',
+    'our', 'out', 'his', 'has', 'have', 'this', 'that', 'with', 'they', 'from', 'what', 'will',
+    'your', 'there', 'their', 'them', 'then', 'than', 'been', 'were', 'would', 'could', 'should',
+    'about', 'just', 'very', 'more', 'some', 'into', 'also', 'only', 'who', 'how', 'why', 'when',
+    'its', "it's", "i'm", 'yes', 'now', 'get', 'got', 'too', 'she', 'him', 'did', 'does', 'which',
+    # Malay
+    'yang', 'dan', 'ini', 'itu', 'dengan', 'untuk', 'pada', 'dalam', 'ada', 'akan', 'saya', 'kita',
+    'kami', 'mereka', 'dia', 'aku', 'kau', 'awak', 'lagi', 'juga', 'sudah', 'dah', 'pun', 'kat',
+    'apa', 'atau', 'oleh', 'dari', 'bagi', 'kerana', 'sebab', 'macam', 'nak', 'buat', 'boleh',
+    'bila', 'sini', 'sana', 'semua', 'orang', 'jadi', 'mana', 'hanya', 'masih', 'sangat', 'lebih',
+    'tapi', 'tetapi', 'sahaja', 'jer', 'lah', 'nya', 'kan',
+}) | NEGATORS
+
+
+class SparseRows:
+    """Rows of a sparse matrix in CSR form: row i has values data[indptr[i]:indptr[i + 1]]
+    in the columns indices[indptr[i]:indptr[i + 1]]."""
+
+    def __init__(self, indptr, indices, data, columns):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def nonempty(self):
+        return np.flatnonzero(np.diff(self.indptr))
+
+    def take(self, rows):
+        starts, lengths = self.indptr[rows], np.diff(self.indptr)[rows]
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        positions = np.arange(indptr[-1]) - np.repeat(indptr[:-1], lengths) + np.repeat(starts, lengths)
+        return SparseRows(indptr, self.indices[positions], self.data[positions], self.columns)
+
+    def dot(self, dense):
+        """Products of every row with each row of `dense` (n x columns), as a len(self) x n array."""
+        row_of = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        products = self.data[:, None] * dense.T[self.indices]
+        return np.column_stack([
+            np.bincount(row_of, weights=products[:, j], minlength=len(self)) for j in range(len(dense))
+        ])
+
+    def sum(self):
+        """Sum of the rows as a dense vector."""
+        return np.bincount(self.indices, weights=self.data, minlength=self.columns)
+
+
+def fit_vocabulary(documents):
+    """Return (terms, idf) for lists of tokens: the MAX_FEATURES most common useful terms."""
+    df = Counter()
+    for tokens in documents:
+        df.update(set(tokens))
+    max_df = MAX_DF * len(documents)
+    candidates = sorted(
+        (-count, term) for term, count in df.items()
+        if MIN_DF <= count <= max_df and len(term) >= MIN_TERM_LENGTH and term not in STOPWORDS
+    )[:MAX_FEATURES]
+    terms = [term for count, term in candidates]
+    counts = np.array([-count for count, term in candidates], dtype=np.float64)
+    idf = np.log((1 + len(documents)) / (1 + counts)) + 1
+    return terms, idf.astype(np.float32)
+
+
+def vectorize(documents, terms, idf):
+    """L2-normalised TF-IDF rows (sublinear term frequency) of lists of tokens."""
+    vocabulary = {term: index for index, term in enumerate(terms)}
+    indptr, indices, data = [0], [], []
+    for tokens in documents:
+        counts = Counter(vocabulary[token] for token in tokens if token in vocabulary)
+        if counts:
+            columns = np.fromiter(counts, dtype=np.int64, count=len(counts))
+            weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * idf[columns]
+            indices.extend(columns.tolist())
+            data.extend((weights / np.linalg.norm(weights)).tolist())
+        indptr.append(len(indices))
+    return SparseRows(
+        np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64),
+        np.array(data, dtype=np.float64), len(terms),
+    )
+
+
+def _normalized(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _initial_centroids(rows, k, rng):
+    # k-means++ seeding on a sample, with cosine distance
+    sample = rows.take(rng.choice(len(rows), min(len(rows), INIT_SAMPLE), replace=False))
+    centroids = [sample.take([rng.integers(len(sample))]).sum()]
+    best = sample.dot(np.array(centroids))[:, 0]
+    for _ in range(1, k):
+        distance = np.clip(1 - best, 0, None)
+        if distance.sum() > 0:
+            chosen = rng.choice(len(sample), p=distance / distance.sum())
+        else:
+            chosen = rng.integers(len(sample))
+        centroids.append(sample.take([chosen]).sum())
+        best = np.maximum(best, sample.dot(np.array(centroids[-1:]))[:, 0])
+    return np.array(centroids)
+
+
+def mini_batch_kmeans(rows, k, seed=0):
+    """Unit-length centroids (k x columns) of spherical mini-batch k-means over non-empty `rows`.
+
+    Each batch moves a centroid towards the mean of the rows assigned to it
+    by the share of all rows it has been assigned so far (Sculley, 2010).
+    """
+    rng = np.random.default_rng(seed)
+    nonempty = rows.take(rows.nonempty())
+    k = min(k, len(nonempty))
+    if k == 0:
+        return np.zeros((0, rows.columns))
+    centroids = _initial_centroids(nonempty, k, rng)
+    seen = np.zeros(k)
+    batch_size = min(BATCH_SIZE, len(nonempty))
+    batches = min(MAX_BATCHES, max(20, 3 * math.ceil(len(nonempty) / batch_size)))
+    for _ in range(batches):
+        batch = nonempty.take(rng.choice(len(nonempty), batch_size, replace=False))
+        labels = batch.dot(centroids).argmax(axis=1)
+        for j in np.unique(labels):
+            members = np.flatnonzero(labels == j)
+            seen[j] += len(members)
+            rate = len(members) / seen[j]
+            mean = batch.take(members).sum() / len(members)
+            centroids[j] = _normalized((1 - rate) * centroids[j] + rate * mean)
+    return centroids
+
+
+def assign(rows, centroids, block=4096):
+    """Index of the nearest centroid of every row, or -1 for rows with no known terms."""
+    labels = np.full(len(rows), -1, dtype=np.int64)
+    if not len(centroids):
+        return labels
+    nonempty = rows.nonempty()
+    for start in range(0, len(nonempty), block):
+        chosen = nonempty[start:start + block]
+        labels[chosen] = rows.take(chosen).dot(centroids).argmax(axis=1)
+    return labels
+
+
+def top_terms(centroid, terms, n=TOP_TERMS):
+    return [terms[i] for i in np.argsort(-centroid)[:n] if centroid[i] > 0]
+
+
+def fit_post(job):
+    """Fit the topics of one post.
+
+    `job` is (postid, responseids, messages, topics, seed). Returns
+    (postid, terms, idf, centroids, responseids, labels, cpu_seconds) with
+    topics ordered largest first and labels indexing them (-1: no topic).
+    """
+    postid, ids, messages, k, seed = job
+    started = time.process_time()
+    documents = [tokenize(message or '') for message in messages]
+    terms, idf = fit_vocabulary(documents)
+    rows = vectorize(documents, terms, idf)
+    centroids = mini_batch_kmeans(rows, k, seed)
+    labels = assign(rows, centroids)
+
+    sizes = np.bincount(labels[labels >= 0], minlength=len(centroids))
+    order = [j for j in np.argsort(-sizes, kind='stable') if sizes[j]]
+    renumber = np.full(len(centroids) + 1, -1, dtype=np.int64)
+    renumber[order] = np.arange(len(order))
+    labels = renumber[labels]
+    return postid, terms, idf, centroids[order].astype(np.float32), ids, labels.tolist(), time.process_time() - started
+
+
+def assign_post(job):
+    """Assign new responses of a post to its existing topics.
+
+    `job` is (postid, responseids, messages, terms, idf, centroids). Returns
+    (postid, responseids, labels, cpu_seconds).
+    """
+    postid, ids, messages, terms, idf, centroids = job
+    started = time.process_time()
+    rows = vectorize([tokenize(message or '') for message in messages], terms, idf)
+    labels = assign(rows, centroids.astype(np.float64))
+    return postid, ids, labels.tolist(), time.process_time() - started
+
+
+def run(func, jobs, workers=None, max_pending=None):
+    """Run `func` over `jobs` across a process pool, as classifier.classify_chunks.
+
+    Yields results in submission order, consuming `jobs` lazily.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for job in jobs:
+            pending.append(pool.submit(func, job))
+            if len(pending) >= max_pending:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
@@ -1,14 +1,33 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+analytics = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.user_login, name='login'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
-    path('sentiment/', views.sentiment_analysis, name='sentiment_analysis'),
-    path('cluster/', views.cluster_analysis, name='cluster_analysis'),
-    path('demographic/', views.demographic_analysis, name='demographic_analysis'),
+    path('dashboard/', analytics.dashboard, name='dashboard'),
+    path('sentiment/', analytics.sentiment_analysis, name='sentiment_analysis'),
+    path('cluster/', analytics.cluster_analysis, name='cluster_analysis'),
+    path('demographic/', analytics.demographic_analysis, name='demographic_analysis'),
+    path('compare/', analytics.compare_posts, name='compare_posts'),
+    path('geojson/malaysia/<str:level>.json', views.malaysia_geojson, name='malaysia_geojson'),
+    path('export/', views.export_responses, name='export_responses'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
+
+    # Chart data API
+    path('api/posts/<int:post_id>/sentiment/', api.post_sentiment, name='api_post_sentiment'),
+    path('api/posts/<int:post_id>/filtered/', api.post_filtered, name='api_post_filtered'),
+    path('api/posts/<int:post_id>/gender/', api.post_gender, name='api_post_gender'),
+    path('api/posts/<int:post_id>/agegroups/', api.post_agegroups, name='api_post_agegroups'),
+    path('api/posts/<int:post_id>/states/', api.post_states, name='api_post_states'),
+    path('api/clusters/posts/', api.cluster_posts, name='api_cluster_posts'),
+    path('api/clusters/sentiment/', api.cluster_sentiment, name='api_cluster_sentiment'),
+    path('api/clusters/trends/', api.cluster_trends, name='api_cluster_trends'),
+    path('api/compare/', api.compare_posts, name='api_compare_posts'),
+    path('api/jobs/<int:job_id>/', api.job_status, name='api_job_status'),
     
     # Management URLs
     path('manage/clusters/', views.manage_clusters, name='manage_clusters'),
@@ -19,4 +38,5 @@ urlpatterns = [
     path('manage/posts/add/', views.add_post, name='add_post'),
     path('manage/posts/edit/<int:post_id>/', views.edit_post, name='edit_post'),
     path('manage/posts/delete/<int:post_id>/', views.delete_post, name='delete_post'),
+    path('manage/jobs/', views.manage_jobs, name='manage_jobs'),
 ]
\ No newline at end of file
@@ -1,27 +1,37 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_http_methods
-from django.db.models import Count, Q, Min, Max
+from django.views.decorators.http import condition, require_http_methods
+from django.utils.cache import patch_cache_control
+from django.db import transaction
+from django.db.models import Count, Q
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
 from django.template.loader import render_to_string
-from django.core.paginator import Paginator
-import plotly.graph_objects as go
-from plotly.offline import plot
-import plotly.express as px
-import pandas as pd
-import requests
+import hashlib
 import json
-from .models import Cluster, Post, Response, AgeGroup, AppUser, State
+from .models import Cluster, Job, Post, Response, ResponseArchive, AgeGroup, State, Topic
+from . import archive, charts, cube, export, geo, jobs, metrics, roles, rollups, routers
+from .conditional import conditional, cluster_page_etag, compare_page_etag, dashboard_etag, post_page_etag
+from .filters import ResponseFilters
+from .pagination import paginate
 
 
-def is_admin(user):
-    try:
-        app_user = AppUser.objects.get(username=user.username)
-        return app_user.usertype == 1
-    except AppUser.DoesNotExist:
-        return False
+RESPONSES_PER_PAGE = 5
+JOBS_PER_PAGE = 50
+MAX_COMPARED_POSTS = 500
+
+# Maintenance tasks admins can start from the jobs page
+MANUAL_TASKS = {
+    'rebuild_rollups': 'Rebuild rollups',
+    'extract_topics': 'Extract topics',
+    'archive_responses': 'Archive old responses',
+}
+# Deletes requested from the management pages run ahead of maintenance
+DELETE_PRIORITY = 10
 
 
 @require_http_methods(["GET", "POST"])
@@ -30,21 +40,13 @@ def user_login(request):
         username = request.POST.get('username')
         password = request.POST.get('password')
         
-        try:
-            app_user = AppUser.objects.get(username=username)
-            if app_user.passwrd == password:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                user, created = User.objects.get_or_create(
-                    username=username,
-                    defaults={'email': f'{username}@sentiment.local'}
-                )
-                login(request, user)
-                return redirect('dashboard')
-            else:
-                return render(request, 'login.html', {'error': 'Invalid credentials'})
-        except AppUser.DoesNotExist:
-            return render(request, 'login.html', {'error': 'Invalid credentials'})
+        user = authenticate(request, username=username, password=password)
+        if user is not None:
+            login(request, user)
+            # Resolve the role once; AppUserRoleMiddleware reads it from the session
+            roles.remember(request, user.usertype)
+            return redirect('dashboard')
+        return render(request, 'login.html', {'error': 'Invalid credentials'})
     
     return render(request, 'login.html')
 
@@ -54,23 +56,18 @@ def user_logout(request):
     return redirect('login')
 
 
-@login_required(login_url='login')
-def dashboard(request):
-    posts = Post.objects.select_related('clusterid').all().order_by('-postdate')
+def dashboard_rows():
+    posts = Post.objects.select_related('clusterid', 'rollup').all().order_by('-postdate')
     
     posts_data = []
     for post in posts:
-        responses = Response.objects.filter(postid=post.postid)
-        total = responses.count()
+        rollup = getattr(post, 'rollup', None)
+        total = rollup.total if rollup else 0
         
         if total > 0:
-            positive = responses.filter(sentiment='P').count()
-            negative = responses.filter(sentiment='N').count()
-            neutral = responses.filter(sentiment='U').count()
-            
-            positive_pct = round((positive / total) * 100, 1)
-            negative_pct = round((negative / total) * 100, 1)
-            neutral_pct = round((neutral / total) * 100, 1)
+            positive_pct = round((rollup.positive / total) * 100, 1)
+            negative_pct = round((rollup.negative / total) * 100, 1)
+            neutral_pct = round((rollup.neutral / total) * 100, 1)
         else:
             positive_pct = negative_pct = neutral_pct = 0
         
@@ -82,309 +79,209 @@ def dashboard(request):
             'negative_pct': negative_pct,
             'neutral_pct': neutral_pct,
         })
-    
-    context = {
-        'clusters_count': Cluster.objects.count(),
-        'posts_count': Post.objects.count(),
-        'responses_count': Response.objects.count(),
+    return posts_data
+
+
+def dashboard_context(request, posts_data, totals):
+    return {
+        'clusters_count': totals.clusters,
+        'posts_count': totals.posts,
+        'responses_count': totals.total,
         'posts_data': posts_data,
-        'is_admin': is_admin(request.user),
+        'is_admin': request.is_admin,
     }
+
+
+@login_required(login_url='login')
+@conditional(dashboard_etag)
+def dashboard(request):
+    context = dashboard_context(request, dashboard_rows(), rollups.global_totals())
     return render(request, 'dashboard.html', context)
 
 
+def post_choices():
+    return list(Post.objects.select_related('clusterid').all())
+
+
+def filtered_responses(post_id, filters):
+    """The post's responses matching `filters`, as archive.segments (newest first) for paginate()."""
+    related = ('agegroupid', 'stateid', 'postid')
+    return archive.segments(
+        filters,
+        Response.objects.filter(postid=post_id).select_related(*related),
+        ResponseArchive.objects.filter(postid=post_id).select_related(*related),
+    )
+
+
+def slicer_options(post_id, version=None):
+    """Slicer options and the date range slider of a post, from the cube.
+
+    Cached by post version. `facets_digest` identifies the options, so the
+    filter endpoint (api.post_filtered) only sends them when they changed.
+    """
+    def build():
+        post_facets = cube.facets(post_id)
+
+        # Map gender codes to labels
+        gender_map = {'M': 'Male', 'F': 'Female', 'O': 'Others', 'N': 'Not Disclosed'}
+        genders = [[code, gender_map.get(code, code)] for code in post_facets['genders']]
+
+        age_groups = AgeGroup.objects.filter(agegroupid__in=post_facets['agegroups']).order_by('agegroupid')
+        # Changed: Get all states including NA (stateid >= 0)
+        states = State.objects.filter(stateid__in=post_facets['states']).order_by('stateid')
+
+        options = {
+            'genders': genders,
+            'age_groups': list(age_groups.values('agegroupid', 'agegroup')),
+            'states': list(states.values('stateid', 'statename')),
+            'min_date': post_facets['min_date'],
+            'max_date': post_facets['max_date'],
+        }
+        encoded = json.dumps(options, sort_keys=True, default=str).encode('utf-8')
+        options['facets_digest'] = hashlib.sha1(encoded).hexdigest()
+        return options
+
+    if version is None:
+        version = rollups.post_version(post_id)
+    return charts.cached_chart('facets', version, build, post_id)
+
+
+def _pct(part, total):
+    return round(part / total * 100, 1) if total else 0
+
+
+def post_topics(post_id):
+    # Precomputed by `manage.py extract_topics`; nothing is tokenized here
+    topics = list(Topic.objects.filter(postid=post_id).order_by('number'))
+    assigned = sum(topic.total for topic in topics)
+    rows = []
+    for topic in topics:
+        rows.append({
+            'number': topic.number,
+            'terms': topic.terms,
+            'total': topic.total,
+            'share_pct': _pct(topic.total, assigned),
+            'positive': topic.positive,
+            'negative': topic.negative,
+            'neutral': topic.neutral,
+            'positive_pct': _pct(topic.positive, topic.total),
+            'negative_pct': _pct(topic.negative, topic.total),
+            'neutral_pct': _pct(topic.neutral, topic.total),
+        })
+    return rows
+
+
+def responses_list_html(post_id, responses_page, total_responses):
+    return render_to_string('responses_list.html', {
+        'responses_page': responses_page,
+        'selected_post_id': post_id,
+        'total_responses': total_responses,
+    })
+
+
+def responses_list_response(post_id, responses_page, total_responses):
+    html = responses_list_html(post_id, responses_page, total_responses)
+    return JsonResponse({'html': html, 'total_responses': total_responses})
+
+
+def filtered_update(post_id, filters, facets_digest=''):
+    """Everything the sentiment page redraws after a filter change, in one response.
+
+    The chart data, the filtered total, the first page of responses and
+    the slicer options, the last only if they differ from `facets_digest`.
+    """
+    version = rollups.post_version(post_id)
+    sentiment = charts.sentiment_data(post_id, filters, version)
+    total_responses = sentiment['total']
+    responses_page = paginate(filtered_responses(post_id, filters), None, RESPONSES_PER_PAGE, total_responses)
+    options = slicer_options(post_id, version)
+    return {
+        'sentiment': sentiment,
+        'total': total_responses,
+        'responses': responses_list_html(post_id, responses_page, total_responses),
+        'facets': None if options['facets_digest'] == facets_digest else options,
+    }
+
+
+def sentiment_context(request, posts, selected_post, post_id, filters, total_responses, responses_page, options,
+                      topics):
+    return {
+        'posts': posts,
+        'selected_post': selected_post,
+        'selected_post_id': post_id,
+        'total_responses': total_responses,
+        'responses_page': responses_page,
+        'gender_filter': filters.gender,
+        'agegroup_filter': filters.agegroup,
+        'state_filter': filters.state,
+        'date_from': filters.date_from,
+        'date_to': filters.date_to,
+        'search_query': filters.q,
+        'topics': topics,
+        'is_admin': request.is_admin,
+        **options,
+    }
+
+
 @login_required(login_url='login')
+@conditional(post_page_etag)
 def sentiment_analysis(request):
     post_id = request.GET.get('post', None)
-    page_number = request.GET.get('page', None)
-    
-    gender_filter = request.GET.get('gender', '')
-    agegroup_filter = request.GET.get('agegroup', '')
-    state_filter = request.GET.get('state', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
+    cursor = request.GET.get('cursor', None)
     
     if not post_id:
-        posts = Post.objects.select_related('clusterid').all()
         context = {
-            'posts': posts,
+            'posts': post_choices(),
             'selected_post': None,
-            'is_admin': is_admin(request.user),
+            'is_admin': request.is_admin,
         }
         return render(request, 'sentiment_analysis.html', context)
     
     selected_post = get_object_or_404(Post, postid=post_id)
-    responses = Response.objects.filter(postid=post_id).select_related('agegroupid', 'stateid', 'postid')
-    
-    if gender_filter:
-        responses = responses.filter(gender=gender_filter)
-    if agegroup_filter:
-        responses = responses.filter(agegroupid__agegroupid=agegroup_filter)
-    if state_filter:
-        responses = responses.filter(stateid__stateid=state_filter)
-    if date_from:
-        responses = responses.filter(responsedate__gte=date_from)
-    if date_to:
-        responses = responses.filter(responsedate__lte=date_to)
+    filters = ResponseFilters.from_request(request)
     
-    all_responses = Response.objects.filter(postid=post_id)
-    # Get min and max dates for the date range slider
-    date_range = all_responses.aggregate(
-        min_date=Min('responsedate'),
-        max_date=Max('responsedate')
-    )
-    min_date = date_range['min_date']
-    max_date = date_range['max_date']
-    
-    # Get distinct genders from responses
-    genders_list = all_responses.values_list('gender', flat=True).distinct().order_by('gender')
-    # Map gender codes to labels
-    gender_map = {'M': 'Male', 'F': 'Female', 'O': 'Others', 'N': 'Not Disclosed'}
-    genders = [(code, gender_map.get(code, code)) for code in genders_list]
-    
-    age_groups = AgeGroup.objects.filter(response__postid=post_id).distinct().order_by('agegroupid')
-    # Changed: Get all states including NA (stateid >= 0)
-    states = State.objects.filter(
-        stateid__in=all_responses.values_list('stateid__stateid', flat=True).distinct()
-    ).order_by('stateid')
-    
-    sentiment_data = responses.values('sentiment').annotate(count=Count('responseid'))
-    sentiments = {item['sentiment']: item['count'] for item in sentiment_data}
-    labels = ['Positive', 'Negative', 'Neutral']
-    values = [sentiments.get('P', 0), sentiments.get('N', 0), sentiments.get('U', 0)]
-    colors = ['#2ecc71', '#e74c3c', '#95a5a6']
-    
-    fig = go.Figure(data=[go.Pie(labels=labels, values=values, marker=dict(colors=colors), hole=0.3)])
-    fig.update_layout(title='Sentiment Distribution', height=500)
-    sentiment_chart = plot(fig, output_type='div', include_plotlyjs=False)
-    
-    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
-    
-    if is_ajax:
-        if page_number:
-            responses_list = responses.order_by('-responsedate')
-            paginator = Paginator(responses_list, 5)
-            
-            try:
-                page_number = int(page_number)
-            except (TypeError, ValueError):
-                page_number = 1
-            
-            try:
-                responses_page = paginator.page(page_number)
-            except:
-                responses_page = paginator.page(1)
-            
-            html = render_to_string('responses_list.html', {
-                'responses_page': responses_page,
-                'selected_post_id': post_id,
-                'total_responses': responses.count(),
-            })
-            return JsonResponse({'html': html})
-        else:
-            return JsonResponse({
-                'sentiment_chart': sentiment_chart,
-                'total_responses': responses.count()
-            })
-    
-    responses_list = responses.order_by('-responsedate')
-    paginator = Paginator(responses_list, 5)
-    
-    try:
-        page_num = int(page_number) if page_number else 1
-    except (TypeError, ValueError):
-        page_num = 1
-    
-    try:
-        responses_page = paginator.page(page_num)
-    except:
-        responses_page = paginator.page(1)
+    # The total comes from the (cached) cube, so turning a page never counts rows
+    total_responses = charts.sentiment_data(post_id, filters)['total']
+    responses_page = paginate(filtered_responses(post_id, filters), cursor, RESPONSES_PER_PAGE, total_responses)
     
-    posts = Post.objects.select_related('clusterid').all()
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return responses_list_response(post_id, responses_page, total_responses)
     
-    context = {
-        'sentiment_chart': sentiment_chart,
-        'posts': posts,
-        'selected_post': selected_post,
-        'selected_post_id': post_id,
-        'total_responses': responses.count(),
-        'responses_page': responses_page,
-        'genders': genders,
-        'age_groups': age_groups,
-        'states': states,
-        'gender_filter': gender_filter,
-        'agegroup_filter': agegroup_filter,
-        'state_filter': state_filter,
-        'date_from': date_from,
-        'date_to': date_to,
-        'min_date': min_date,
-        'max_date': max_date,
-        'is_admin': is_admin(request.user),
-    }
+    context = sentiment_context(
+        request, post_choices(), selected_post, post_id, filters, total_responses, responses_page,
+        slicer_options(post_id), post_topics(post_id),
+    )
     return render(request, 'sentiment_analysis.html', context)
 
 
 @login_required(login_url='login')
+@conditional(cluster_page_etag)
 def cluster_analysis(request):
-    clusters = Cluster.objects.annotate(post_count=Count('post'))
-    cluster_names = [c.clustername for c in clusters]
-    post_counts = [c.post_count for c in clusters]
-    
-    fig = go.Figure(data=[go.Bar(x=cluster_names, y=post_counts, marker=dict(color='#3498db'))])
-    fig.update_layout(title='Posts per Cluster', xaxis_title='Cluster', yaxis_title='Number of Posts', height=400)
-    cluster_chart = plot(fig, output_type='div', include_plotlyjs=False)
-    
     context = {
-        'cluster_chart': cluster_chart,
-        'is_admin': is_admin(request.user),
+        'is_admin': request.is_admin,
     }
     return render(request, 'cluster_analysis.html', context)
 
 
 @login_required(login_url='login')
+@conditional(post_page_etag)
 def demographic_analysis(request):
     post_id = request.GET.get('post', None)
-    posts = Post.objects.select_related('clusterid').all()
+    posts = post_choices()
 
     if not post_id:
         context = {
             'posts': posts,
             'selected_post': None,
-            'is_admin': is_admin(request.user),
+            'is_admin': request.is_admin,
         }
         return render(request, 'demographic_analysis.html', context)
 
     selected_post = get_object_or_404(Post, postid=post_id)
-    responses = Response.objects.filter(postid=post_id)
-
-    # ---------- State-wise sentiment distribution ----------
-    state_data = []
-    states = State.objects.filter(stateid__gt=0).order_by('statename')
-
-    for state in states:
-        state_responses = responses.filter(stateid=state)
-        total = state_responses.count()
 
-        if total > 0:
-            positive = state_responses.filter(sentiment='P').count()
-            negative = state_responses.filter(sentiment='N').count()
-            neutral = state_responses.filter(sentiment='U').count()
-
-            state_data.append({
-                'state': state.statename,
-                'total': total,
-                'positive': positive,
-                'negative': negative,
-                'neutral': neutral,
-                'positive_pct': round((positive / total) * 100, 1),
-                'negative_pct': round((negative / total) * 100, 1),
-                'neutral_pct': round((neutral / total) * 100, 1),
-            })
-
-    # ---------- Gender distribution ----------
-    gender_sentiment = responses.values('gender', 'sentiment').annotate(count=Count('responseid'))
-    genders = ['M', 'F', 'O', 'N']
-    gender_labels = ['Male', 'Female', 'Others', 'Not Disclosed']
-    positive = [0, 0, 0, 0]
-    negative = [0, 0, 0, 0]
-    neutral = [0, 0, 0, 0]
-
-    for item in gender_sentiment:
-        idx = genders.index(item['gender']) if item['gender'] in genders else -1
-        if idx >= 0:
-            if item['sentiment'] == 'P':
-                positive[idx] = item['count']
-            elif item['sentiment'] == 'N':
-                negative[idx] = item['count']
-            elif item['sentiment'] == 'U':
-                neutral[idx] = item['count']
-
-    fig = go.Figure()
-    fig.add_trace(go.Bar(name='Positive', x=gender_labels, y=positive, marker=dict(color='#2ecc71')))
-    fig.add_trace(go.Bar(name='Negative', x=gender_labels, y=negative, marker=dict(color='#e74c3c')))
-    fig.add_trace(go.Bar(name='Neutral', x=gender_labels, y=neutral, marker=dict(color='#95a5a6')))
-    fig.update_layout(title='Sentiment by Gender', barmode='group', height=400)
-    gender_chart = plot(fig, output_type='div', include_plotlyjs=False)
-
-    # ---------- Age group distribution ----------
-    age_sentiment = responses.exclude(agegroupid__agegroupid=0).values(
-        'agegroupid__agegroup', 'sentiment'
-    ).annotate(count=Count('responseid'))
-
-    age_groups_list = AgeGroup.objects.filter(agegroupid__gt=0).order_by('agegroupid')
-    age_labels = [ag.agegroup for ag in age_groups_list]
-    age_positive = [0] * len(age_labels)
-    age_negative = [0] * len(age_labels)
-    age_neutral = [0] * len(age_labels)
-
-    for item in age_sentiment:
-        try:
-            idx = age_labels.index(item['agegroupid__agegroup'])
-            if item['sentiment'] == 'P':
-                age_positive[idx] = item['count']
-            elif item['sentiment'] == 'N':
-                age_negative[idx] = item['count']
-            elif item['sentiment'] == 'U':
-                age_neutral[idx] = item['count']
-        except ValueError:
-            pass
-
-    age_fig = go.Figure()
-    age_fig.add_trace(go.Bar(name='Positive', x=age_labels, y=age_positive, marker=dict(color='#2ecc71')))
-    age_fig.add_trace(go.Bar(name='Negative', x=age_labels, y=age_negative, marker=dict(color='#e74c3c')))
-    age_fig.add_trace(go.Bar(name='Neutral', x=age_labels, y=age_neutral, marker=dict(color='#95a5a6')))
-    age_fig.update_layout(title='Sentiment by Age Group', barmode='group', height=400)
-    age_chart = plot(age_fig, output_type='div', include_plotlyjs=False)
-
-    # ---------- Malaysia State Map ----------
-    if state_data:
-        # Normalize names to match GeoJSON
-        name_map = {
-            "Penang": "Pulau Pinang",
-            "WP Kuala Lumpur": "Kuala Lumpur",
-            "WP Labuan": "Labuan",
-            "WP Putrajaya": "Putrajaya",
-        }
-        for s in state_data:
-            if s['state'] in name_map:
-                s['state'] = name_map[s['state']]
-
-        # Load GeoJSON for Malaysian states
-        geojson_url = "https://raw.githubusercontent.com/ragavijay/mysentkom/main/static/geojson/malaysia_states.geojson.geojson"
-        response = requests.get(geojson_url)
-        print(response.status_code)
-        #print(response.text[:500])
-        malaysia_geojson = response.json()
-
-        # Convert to DataFrame for Plotly Express
-        df = pd.DataFrame(state_data)
-
-        fig_map = px.choropleth_mapbox(
-            df,
-            geojson=malaysia_geojson,
-            locations='state',
-            color='total',
-            featureidkey="properties.name",
-            hover_name='state',
-            hover_data={
-                'total': True,
-                'positive': True,
-                'negative': True,
-                'neutral': True,
-                'positive_pct': True,
-                'negative_pct': True,
-                'neutral_pct': True,
-            },
-            color_continuous_scale="Viridis",
-            mapbox_style="carto-positron",
-            center={"lat": 4.2105, "lon": 101.9758},
-            zoom=4.3,
-            title="Response Distribution by Malaysian States"
-        )
-
-        map_chart = plot(fig_map, output_type='div', include_plotlyjs=True)
-    else:
-        map_chart = None
+    # Charts are drawn client-side from the chart data API (dashboard/api.py);
+    # only the state table is rendered here.
+    state_data = charts.state_rows(post_id)
 
     # ---------- Final context ----------
     context = {
@@ -392,18 +289,108 @@ def demographic_analysis(request):
         'selected_post': selected_post,
         'selected_post_id': post_id,
         'state_data': state_data,
-        'map_chart': map_chart,
-        'gender_chart': gender_chart,
-        'age_chart': age_chart,
-        'is_admin': is_admin(request.user),
+        'is_admin': request.is_admin,
     }
 
     return render(request, 'demographic_analysis.html', context)
 
 
+def cluster_choices():
+    return list(Cluster.objects.order_by('clustername'))
+
+
+def compared_posts(query):
+    """Ids of the posts to compare, from `posts=1,2,3` (or repeated `posts`) and `cluster=ID`.
+
+    Raises ValueError on a malformed id or more than MAX_COMPARED_POSTS posts.
+    """
+    try:
+        post_ids = {int(part) for value in query.getlist('posts') for part in value.split(',') if part.strip()}
+        cluster = int(query['cluster']) if query.get('cluster') else None
+    except ValueError:
+        raise ValueError('Post and cluster ids must be numbers.')
+    if cluster is not None:
+        post_ids.update(Post.objects.filter(clusterid=cluster).values_list('postid', flat=True))
+    if len(post_ids) > MAX_COMPARED_POSTS:
+        raise ValueError(f'At most {MAX_COMPARED_POSTS} posts can be compared at once.')
+    return sorted(post_ids)
+
+
+def comparison_context(request, posts, clusters):
+    return {
+        'posts': posts,
+        'clusters': clusters,
+        'selected_posts': {part for value in request.GET.getlist('posts') for part in value.split(',')},
+        'selected_cluster': request.GET.get('cluster', ''),
+        'query': request.GET.urlencode(),
+        'is_admin': request.is_admin,
+    }
+
+
+@login_required(login_url='login')
+@conditional(compare_page_etag)
+def compare_posts(request):
+    # The chart is drawn client-side from api.compare_posts
+    return render(request, 'compare_posts.html', comparison_context(request, post_choices(), cluster_choices()))
+
+
+@login_required(login_url='login')
+def export_responses(request):
+    """Stream every response matching the sentiment page filters as CSV, JSON Lines or Parquet.
+
+    An interrupted download can be resumed by passing the responsedate and
+    responseid of the last row received as `after=DATE:RESPONSEID`.
+    """
+    post_id = request.GET.get('post', '')
+    fmt = request.GET.get('format', 'csv')
+    after = request.GET.get('after', '')
+    if fmt not in export.FORMATS:
+        return HttpResponseBadRequest('Unknown export format')
+    if after:
+        try:
+            export.parse_position(after)
+        except ValueError:
+            return HttpResponseBadRequest('Invalid resume position')
+    selected_post = get_object_or_404(Post, postid=post_id)
+    filters = ResponseFilters.from_request(request)
+
+    try:
+        chunks = export.stream(selected_post.postid, filters, fmt, after=after or None, header=not after)
+    except ImportError:
+        return HttpResponse('Parquet export is not available on this server', status=501)
+
+    # The body is read after the view returns, outside the request's scope
+    response = StreamingHttpResponse(routers.carry(chunks), content_type=export.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="post-{selected_post.postid}-responses.{fmt}"'
+    return response
+
+
+def _geojson_etag(request, level):
+    if level in geo.LEVELS:
+        return geo.variant(level)[1]
+    return None
+
+
+@condition(etag_func=_geojson_etag)
+def malaysia_geojson(request, level):
+    if level not in geo.LEVELS:
+        raise Http404('Unknown detail level')
+    content, digest = geo.variant(level)
+    response = HttpResponse(content, content_type='application/json')
+    # URLs carry the content hash (see geo.variant_url), so they never go stale
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
+
+
+def prometheus_metrics(request):
+    if not (request.is_admin or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @login_required(login_url='login')
 def manage_clusters(request):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
@@ -417,7 +404,7 @@ def manage_clusters(request):
 
 @login_required(login_url='login')
 def add_cluster(request):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
@@ -434,7 +421,7 @@ def add_cluster(request):
 
 @login_required(login_url='login')
 def edit_cluster(request, cluster_id):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
@@ -457,14 +444,20 @@ def edit_cluster(request, cluster_id):
 
 @login_required(login_url='login')
 def delete_cluster(request, cluster_id):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
     cluster = get_object_or_404(Cluster, clusterid=cluster_id)
     if request.method == 'POST':
-        cluster.delete()
-        messages.success(request, 'Cluster deleted successfully!')
+        # Deleting every post and response of a cluster is slow; a job worker does it
+        job = jobs.enqueue('delete_cluster', priority=DELETE_PRIORITY, username=request.user.username,
+                           cluster_id=cluster.clusterid)
+        if settings.BACKGROUND_JOBS:
+            messages.success(request, f'Cluster deletion queued as job #{job.pk}.')
+        else:
+            # Already run inline, see jobs.enqueue
+            messages.success(request, 'Cluster deleted.')
         return redirect('manage_clusters')
     
     context = {
@@ -476,7 +469,7 @@ def delete_cluster(request, cluster_id):
 
 @login_required(login_url='login')
 def manage_posts(request):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
@@ -498,7 +491,7 @@ def manage_posts(request):
 
 @login_required(login_url='login')
 def add_post(request):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
@@ -526,7 +519,7 @@ def add_post(request):
 
 @login_required(login_url='login')
 def edit_post(request, post_id):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
@@ -544,7 +537,9 @@ def edit_post(request, post_id):
             post.postlink = postlink
             post.postmessage = postmessage
             post.postdate = postdate
-            post.save()
+            # The post and its move between cluster rollups commit together
+            with transaction.atomic():
+                post.save()
             messages.success(request, 'Post updated successfully!')
             return redirect('manage_posts')
         else:
@@ -561,18 +556,56 @@ def edit_post(request, post_id):
 
 @login_required(login_url='login')
 def delete_post(request, post_id):
-    if not is_admin(request.user):
+    if not request.is_admin:
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('dashboard')
     
     post = get_object_or_404(Post, postid=post_id)
     if request.method == 'POST':
-        post.delete()
-        messages.success(request, 'Post deleted successfully!')
+        job = jobs.enqueue('delete_post', priority=DELETE_PRIORITY, username=request.user.username,
+                           post_id=post.postid)
+        if settings.BACKGROUND_JOBS:
+            messages.success(request, f'Post deletion queued as job #{job.pk}.')
+        else:
+            messages.success(request, 'Post deleted.')
         return redirect('manage_posts')
     
     context = {
         'post': post,
         'is_admin': True,
     }
-    return render(request, 'delete_post.html', context)
\ No newline at end of file
+    return render(request, 'delete_post.html', context)
+
+
+@login_required(login_url='login')
+def manage_jobs(request):
+    if not request.is_admin:
+        messages.error(request, 'Access denied. Admin privileges required.')
+        return redirect('dashboard')
+
+    if request.method == 'POST':
+        task = request.POST.get('task')
+        if task in MANUAL_TASKS:
+            job = jobs.enqueue(task, username=request.user.username)
+            if settings.BACKGROUND_JOBS:
+                messages.success(request, f'{MANUAL_TASKS[task]} queued as job #{job.pk}.')
+            else:
+                messages.success(request, f'{MANUAL_TASKS[task]} finished as job #{job.pk}.')
+        return redirect('manage_jobs')
+
+    status = request.GET.get('status', '')
+    # Job rows change by the second; replicas could show them late
+    with routers.primary():
+        recent = Job.objects.order_by('-id')
+        if status:
+            recent = recent.filter(status=status)
+        counts = dict(Job.objects.values_list('status').annotate(count=Count('id')).order_by())
+        context = {
+            'jobs': list(recent[:JOBS_PER_PAGE]),
+            'statuses': [(code, label, counts.get(code, 0)) for code, label in Job.STATUS_CHOICES],
+            'selected_status': status,
+            'manual_tasks': MANUAL_TASKS,
+            'unclaimed': jobs.unclaimed() if settings.BACKGROUND_JOBS else 0,
+            'is_admin': True,
+        }
+    return render(request, 'manage_jobs.html', context)
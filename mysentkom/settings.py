@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from decouple import Csv, config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,11 +34,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.middleware.MetricsMiddleware',
+    'dashboard.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.middleware.AppUserRoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -46,7 +51,8 @@ ROOT_URLCONF = 'mysentkom.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render times reported to /metrics/
+        'BACKEND': 'dashboard.templating.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,18 +71,136 @@ WSGI_APPLICATION = 'mysentkom.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# Override with DB_* environment variables (or a .env file), e.g.
+# DB_ENGINE=django.db.backends.sqlite3 DB_NAME=bench.sqlite3 for benchmarks.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'mysentkom',
-        'USER': 'sqldev',
-        'PASSWORD': 'sqldev',
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.mysql'),
+        'NAME': config('DB_NAME', default='mysentkom'),
+        'USER': config('DB_USER', default='sqldev'),
+        'PASSWORD': config('DB_PASSWORD', default='sqldev'),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default='3306'),
+        # Keep connections open between requests, checking them before reuse.
+        # Under ASGI each worker thread holds its own (see dashboard/async_views.py).
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replicas, used for the dashboard's reads by dashboard/routers.py.
+# DB_REPLICAS lists their hosts ("host" or "host:port"); each becomes a
+# `replicaN` alias with the primary's other settings. With SQLite every
+# replica is another connection to the same file, which is enough to try
+# the routing locally, e.g. DB_REPLICAS=localhost.
+DATABASE_REPLICAS = []
+for number, address in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    host, _, port = address.partition(':')
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['dashboard.routers.ReplicaRouter']
+
+# After a request writes, the same browser reads from the primary for this
+# long, so replication lag cannot hide an admin's own edits.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 'default' holds sessions, cached users and role epochs (see
+# dashboard/authentication.py and dashboard/roles.py). It must be shared by
+# every worker process, or a role change made in one worker is not seen by
+# the others: set REDIS_URL (e.g. redis://127.0.0.1:6379/0) wherever more
+# than one process serves requests. Without it each process has its own
+# LocMemCache, which only suits a single process such as runserver.
+# 'charts' holds rendered chart fragments keyed by data version (see
+# dashboard/charts.py), so it can stay per process; LocMemCache evicts
+# least recently used entries once MAX_ENTRIES is reached.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'charts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'charts',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    },
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'dashboard.renderers.TimedJSONRenderer',
+    ],
 }
 
+# Sessions are read from the cache and only written through to the database;
+# the logged-in user and their AppUser role are cached too (see
+# dashboard/authentication.py and dashboard/roles.py), so an authenticated
+# request needs no auth queries.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+AUTHENTICATION_BACKENDS = [
+    'dashboard.authentication.AppUserBackend',
+]
+
+# Sentiment counts by date range are served from per-process indexes
+# (dashboard/dateindex.py). Writes made by other processes show up after at
+# most this many seconds.
+DATE_INDEX_TTL = config('DATE_INDEX_TTL', default=5, cast=int)
+
+# Request metrics (dashboard/metrics.py). /metrics/ is served to admins and to
+# scrapers connecting from METRICS_ALLOWED_IPS; admins also get a
+# Server-Timing breakdown of each of their requests.
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1', cast=Csv())
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=True, cast=bool)
+
+# Serve the analytics pages from dashboard/async_views.py, which run their
+# independent queries concurrently. Only worth it under ASGI (mysentkom/asgi.py,
+# e.g. `uvicorn mysentkom.asgi:application`); under WSGI every async view
+# would be run through an extra event loop.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Background jobs (dashboard/jobs.py): slow work such as deleting clusters is
+# queued in the database and run by `manage.py run_jobs` workers. Only turn
+# this on where such a worker is deployed; off, jobs run in the web process
+# instead, once queued. A running job whose worker has not sent a heartbeat
+# for JOB_STALE_SECONDS is retried; the jobs page warns when queued jobs
+# have waited that long without a worker claiming them.
+BACKGROUND_JOBS = config('BACKGROUND_JOBS', default=False, cast=bool)
+JOB_STALE_SECONDS = config('JOB_STALE_SECONDS', default=300, cast=int)
+
+# Responses older than this many whole months are moved to the archive table
+# by `manage.py archive_responses` (dashboard/archive.py); the rollups keep
+# counting them.
+RESPONSE_HOT_MONTHS = config('RESPONSE_HOT_MONTHS', default=12, cast=int)
+
+# Part of every analytics ETag (dashboard/conditional.py), next to a digest of
+# the templates and static files. Change it on a deploy that changes what the
+# views render without touching those, so browsers stop revalidating old pages.
+RELEASE = config('RELEASE', default='')
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 
@@ -123,4 +247,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
\ No newline at end of file
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic writes content-hashed copies of every asset, plus .gz and
+# .br variants, and plotly.js comes from the pinned plotly package (see
+# dashboard/staticfiles.py). PLOTLY_JS may point at a smaller custom
+# plotly.js bundle instead; the charts need the bar, pie, scatter and
+# choroplethmap traces.
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'dashboard.staticfiles.PlotlyFinder',
+]
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'dashboard.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+PLOTLY_JS = config('PLOTLY_JS', default='')
+
+# Serve STATIC_ROOT from Django, picking the precompressed variant and
+# sending far-future cache headers for hashed names. Turn on when nothing
+# in front of the app (e.g. nginx with gzip_static/brotli_static) does.
+SERVE_STATIC = config('SERVE_STATIC', default=False, cast=bool)
\ No newline at end of file
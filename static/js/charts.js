@@ -0,0 +1,130 @@
+/* ===== CLIENT-SIDE CHARTS =====
+ * Draws the analytics charts from the compact JSON returned by the chart
+ * data API (dashboard/api.py), with the plotly.js 3 bundle served from
+ * static/vendor (see dashboard/staticfiles.py).
+ */
+
+const SENTIMENT_COLORS = ['#2ecc71', '#e74c3c', '#95a5a6'];
+const SENTIMENT_LABELS = ['Positive', 'Negative', 'Neutral'];
+const PLOTLY_CONFIG = { responsive: true };
+
+function fetchChartData(url) {
+    return fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        });
+}
+
+function drawSentimentPie(element, data) {
+    const trace = {
+        type: 'pie',
+        labels: data.labels,
+        values: data.values,
+        marker: { colors: SENTIMENT_COLORS },
+        hole: 0.3
+    };
+    Plotly.react(element, [trace], { title: { text: 'Sentiment Distribution' }, height: 500 }, PLOTLY_CONFIG);
+}
+
+function drawGroupedBars(element, data, title) {
+    const traces = [
+        { type: 'bar', name: 'Positive', x: data.labels, y: data.positive, marker: { color: SENTIMENT_COLORS[0] } },
+        { type: 'bar', name: 'Negative', x: data.labels, y: data.negative, marker: { color: SENTIMENT_COLORS[1] } },
+        { type: 'bar', name: 'Neutral', x: data.labels, y: data.neutral, marker: { color: SENTIMENT_COLORS[2] } }
+    ];
+    Plotly.react(element, traces, { title: { text: title }, barmode: 'group', height: 400 }, PLOTLY_CONFIG);
+}
+
+function drawClusterBars(element, data, title = 'Posts per Cluster', yTitle = 'Number of Posts') {
+    const trace = { type: 'bar', x: data.labels, y: data.values, marker: { color: '#3498db' } };
+    const layout = {
+        title: { text: title },
+        xaxis: { title: { text: 'Cluster' } },
+        yaxis: { title: { text: yTitle } },
+        height: 400
+    };
+    Plotly.react(element, [trace], layout, PLOTLY_CONFIG);
+}
+
+function drawClusterTrends(element, data, series, title, yTitle) {
+    // One line per cluster; `series` is 'total' or 'net'
+    const traces = data.clusters.map(cluster => ({
+        type: 'scatter',
+        mode: 'lines',
+        name: cluster.name,
+        x: data.weeks,
+        y: cluster[series],
+        connectgaps: false
+    }));
+    const layout = {
+        title: { text: title },
+        xaxis: { title: { text: 'Week' } },
+        yaxis: { title: { text: yTitle } },
+        height: 400
+    };
+    Plotly.react(element, traces, layout, PLOTLY_CONFIG);
+}
+
+function drawComparison(element, data, dimension) {
+    // One group of bars per post: its sentiment mix, or its split by
+    // `dimension` (a key of data.demographics), in % of its responses
+    const pct = (values) => values.map((n, i) => data.total[i] ? Math.round(n / data.total[i] * 1000) / 10 : 0);
+    const hover = '<b>%{x}</b> (%{customdata[1]})<br>%{fullData.name}: %{y}% (%{customdata[0]})<extra></extra>';
+    const series = dimension === 'sentiment'
+        ? SENTIMENT_LABELS.map((label, i) => ({ label, values: data[label.toLowerCase()], color: SENTIMENT_COLORS[i] }))
+        : data.demographics[dimension].labels.map((label, i) => ({ label, values: data.demographics[dimension].values[i] }));
+    const traces = series.map(s => ({
+        type: 'bar',
+        name: s.label,
+        x: data.labels,
+        y: pct(s.values),
+        customdata: s.values.map((n, i) => [n, data.clusters[i]]),
+        hovertemplate: hover,
+        marker: s.color ? { color: s.color } : undefined
+    }));
+    const layout = {
+        title: { text: `${dimension === 'sentiment' ? 'Sentiment' : 'Responses'} by Post` },
+        barmode: 'group',
+        xaxis: { title: { text: 'Post' }, type: 'category' },
+        yaxis: { title: { text: '% of the post\'s responses' } },
+        height: 500
+    };
+    Plotly.react(element, traces, layout, PLOTLY_CONFIG);
+}
+
+function drawStateMap(element, data) {
+    const pct = (part, total) => total ? Math.round(part / total * 1000) / 10 : 0;
+    const trace = {
+        type: 'choroplethmap',
+        geojson: data.geojson,
+        featureidkey: 'properties.name',
+        locations: data.states,
+        z: data.total,
+        colorscale: 'Viridis',
+        customdata: data.states.map((state, i) => [
+            data.positive[i], data.negative[i], data.neutral[i],
+            pct(data.positive[i], data.total[i]),
+            pct(data.negative[i], data.total[i]),
+            pct(data.neutral[i], data.total[i])
+        ]),
+        hovertemplate: '<b>%{location}</b><br>total=%{z}' +
+            '<br>positive=%{customdata[0]} (%{customdata[3]}%)' +
+            '<br>negative=%{customdata[1]} (%{customdata[4]}%)' +
+            '<br>neutral=%{customdata[2]} (%{customdata[5]}%)<extra></extra>'
+    };
+    const layout = {
+        title: { text: 'Response Distribution by Malaysian States' },
+        map: { style: 'carto-positron', center: data.center, zoom: data.zoom },
+        margin: { t: 50, r: 0, b: 0, l: 0 },
+        height: 500
+    };
+    Plotly.react(element, [trace], layout, PLOTLY_CONFIG);
+}
+
+function showChartError(element) {
+    document.getElementById(element).innerHTML =
+        '<p class="text-danger text-center">Error loading chart. Please try again.</p>';
+}